@@ -4,7 +4,7 @@ from shutil import copytree
 
 from sourcetodoc.cli.ConfiguredParser import ConfiguredParser
 from sourcetodoc.common.Config import Config
-from sourcetodoc.docstring.cli import run_comment_converter
+from sourcetodoc.docstring.cli import run_comment_census, run_comment_converter
 from sourcetodoc.docgen.doc_gen import run_documentation_generation
 from sourcetodoc.testcoverage.cover_meson import *
 from sourcetodoc.testcoverage.cover_cmake import *
@@ -29,6 +29,15 @@ if __name__ == "__main__":
 
     t_setup: float = time()
 
+    # comment census
+    if config.args.cc_census is not None:
+        print("\nComment Census:\n")
+        try:
+            run_comment_census(parser, config)
+        except Exception as e:
+            error_in_cc = f"Exception occured while running the Comment Census:\n{e}"
+            print(error_in_cc)
+
     # docstring preprocessing
     if config.args.converter is not None:
         print("\nComment Conversion:\n")
@@ -0,0 +1,249 @@
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from re import Pattern
+from typing import Any, Iterable
+
+from .comment_parsing import find_comments_connected
+from .comment_style import CommentStyle
+from .conversions.prompt_budget import estimate_tokens
+
+# The code after a comment: at most one newline, then the start of a declaration (not "#", "}" or another comment)
+_FOLLOWING_CODE_REGEX = re.compile(r"[ \t]*(?:\r?\n)?[ \t]*(?P<code>[^\s#}/][^;{}]{0,500})")
+
+# A function declaration or definition, e.g. "static int f(void)" but not "if (x)" or "x = f(1)"
+_FUNCTION_REGEX = re.compile(r"(?!(?:if|for|while|switch|return|else|do|case|sizeof)\b)[^=(]*\w\s*\(")
+
+_COMMAND_REGEX = re.compile(r"[\\@]\w")
+
+_DOXYGEN_STYLES: frozenset[CommentStyle] = frozenset(style for style in CommentStyle if style.is_doxygen_style())
+
+
+@dataclass(frozen=True)
+class CensusOptions:
+    """Parameters to estimate the work of the converters."""
+    c_system_prompt: str = ""
+    c_user_prompt_template: str = "{}"
+    cxx_system_prompt: str = ""
+    cxx_user_prompt_template: str = "{}"
+    target_style: CommentStyle | None = None # --cc_style of the comment_style converter
+    find_pattern: Pattern[str] | None = None # --cc_find of the find_and_replace converter
+    find_rules_pattern: Pattern[str] | None = None # Combined rules of --cc_find_rules of the find_and_replace_rules converter
+
+
+@dataclass
+class CommentCensus:
+    """
+    Statistics of the comments in source files.
+
+    The comments are found by `find_comments_connected` without
+    libclang, so the association with declarations is a heuristic:
+    a comment is above a declaration if it starts its line and is
+    followed by code after at most one newline. Like the converters,
+    the estimated conversions only count comments above declarations.
+    """
+    files: int = 0
+    lines: int = 0
+    comments: int = 0
+    comment_bytes: int = 0
+    doxygen_comments: int = 0
+    above_declaration: int = 0
+    styles: Counter[str] = field(default_factory=Counter) # Number of comments by CommentStyle name
+    above_declaration_styles: Counter[str] = field(default_factory=Counter)
+    directory_bytes: Counter[str] = field(default_factory=Counter) # Comment bytes by directory
+    conversions: Counter[str] = field(default_factory=Counter) # Estimated number of conversions by converter name
+    llm_prompt_tokens: int = 0 # Estimated input tokens of function_comment_llm
+
+    def merge(self, other: "CommentCensus") -> None:
+        """Adds the statistics of `other` to this object."""
+        self.files += other.files
+        self.lines += other.lines
+        self.comments += other.comments
+        self.comment_bytes += other.comment_bytes
+        self.doxygen_comments += other.doxygen_comments
+        self.above_declaration += other.above_declaration
+        self.styles.update(other.styles)
+        self.above_declaration_styles.update(other.above_declaration_styles)
+        self.directory_bytes.update(other.directory_bytes)
+        self.conversions.update(other.conversions)
+        self.llm_prompt_tokens += other.llm_prompt_tokens
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "files": self.files,
+            "lines": self.lines,
+            "comments": self.comments,
+            "comment_bytes": self.comment_bytes,
+            "doxygen_comments": self.doxygen_comments,
+            "doxygen_share": self.doxygen_comments / self.comments if self.comments else 0.0,
+            "above_declaration": self.above_declaration,
+            "styles": dict(self.styles.most_common()),
+            "above_declaration_styles": dict(self.above_declaration_styles.most_common()),
+            "directory_bytes": dict(self.directory_bytes.most_common()),
+            "conversions": dict(self.conversions.most_common()),
+            "llm_prompt_tokens": self.llm_prompt_tokens,
+        }
+
+    def summary(self, directory_count: int = 10) -> str:
+        """Returns a plain text summary with the largest `directory_count` directories."""
+        doxygen_share = self.doxygen_comments / self.comments if self.comments else 0.0
+        lines = [
+            f"{self.files} files, {self.lines} lines, {self.comments} comments ({self.comment_bytes} bytes)",
+            f"{self.doxygen_comments} comments ({doxygen_share:.1%}) have a Doxygen style",
+            f"{self.above_declaration} comments are above declarations",
+            "",
+            "Comments by style (above declarations):",
+        ]
+        for style, count in self.styles.most_common():
+            lines.append(f"  {style:<28} {count:>8} ({self.above_declaration_styles[style]})")
+        lines += ["", f"Comment bytes by directory (largest {directory_count}):"]
+        for directory, size in self.directory_bytes.most_common(directory_count):
+            lines.append(f"  {size:>10}  {directory}")
+        lines += ["", "Estimated conversions by --converter:"]
+        for converter, count in self.conversions.most_common():
+            lines.append(f"  {converter:<28} {count:>8}")
+        lines.append(f"Estimated LLM prompt tokens (function_comment_llm): {self.llm_prompt_tokens}")
+        return "\n".join(lines)
+
+    def write(self, out_dir: Path) -> None:
+        """Writes "census.json" and "census.txt" to `out_dir`."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "census.json").write_text(json.dumps(self.to_dict(), indent=2))
+        (out_dir / "census.txt").write_text(self.summary() + "\n")
+
+
+def scan_code(code: str, is_cxx: bool, options: CensusOptions, directory: str = ".") -> CommentCensus:
+    """
+    Returns the statistics of the comments in `code`.
+
+    Parameters
+    ----------
+    code : str
+        The source code.
+    is_cxx : bool
+        True if `code` is C++ code, False if it is C code.
+    options : CensusOptions
+        The parameters of the converters.
+    directory : str, optional
+        The directory of the source file, by default ".".
+    """
+    census = CommentCensus(files=1, lines=code.count("\n") + 1)
+    if is_cxx:
+        system_prompt, user_prompt_template = options.cxx_system_prompt, options.cxx_user_prompt_template
+    else:
+        system_prompt, user_prompt_template = options.c_system_prompt, options.c_user_prompt_template
+    prompt_overhead = estimate_tokens(system_prompt) + estimate_tokens(user_prompt_template.replace("{}", ""))
+
+    for comment_range, style in find_comments_connected(code):
+        comment_text = code[comment_range.start:comment_range.end]
+        is_doxygen = style in _DOXYGEN_STYLES
+        census.comments += 1
+        census.comment_bytes += len(comment_text)
+        census.styles[style.name] += 1
+        if is_doxygen:
+            census.doxygen_comments += 1
+
+        # A comment above a declaration starts its line
+        line_start = code.rfind("\n", 0, comment_range.start) + 1
+        if code[line_start:comment_range.start].strip():
+            continue
+        following = _FOLLOWING_CODE_REGEX.match(code, comment_range.end)
+        if following is None:
+            continue
+        census.above_declaration += 1
+        census.above_declaration_styles[style.name] += 1
+
+        if options.find_pattern is not None and options.find_pattern.search(comment_text) is not None:
+            census.conversions["find_and_replace"] += 1
+        if options.find_rules_pattern is not None and options.find_rules_pattern.search(comment_text) is not None:
+            census.conversions["find_and_replace_rules"] += 1
+        if style is not options.target_style:
+            census.conversions["comment_style"] += 1
+        if is_doxygen:
+            if _COMMAND_REGEX.search(comment_text) is not None:
+                census.conversions["command_style"] += 1
+            continue
+        census.conversions["default"] += 1
+        symbol_text = following["code"]
+        if _FUNCTION_REGEX.match(symbol_text) is not None:
+            census.conversions["function_comment_llm"] += 1
+            # The prompt contains the comment and the symbol, see LLMConversionHelper
+            census.llm_prompt_tokens += prompt_overhead + estimate_tokens(comment_text) + estimate_tokens(symbol_text)
+
+    if census.comment_bytes:
+        census.directory_bytes[directory] = census.comment_bytes
+    return census
+
+
+def _scan_file(options: CensusOptions, root: Path, file_and_is_cxx: tuple[Path, bool]) -> CommentCensus:
+    file, is_cxx = file_and_is_cxx
+    try:
+        data = file.read_bytes()
+    except OSError:
+        return CommentCensus()
+    try: # Decode like Converter._read_code
+        code = data.decode("utf-8")
+    except UnicodeDecodeError:
+        code = data.decode("ISO-8859-1")
+    if "\r" in code:
+        code = code.replace("\r\n", "\n").replace("\r", "\n")
+    return scan_code(code, is_cxx, options, str(file.parent.relative_to(root)))
+
+
+def run_census(
+        root: Path,
+        c_pattern: Pattern[str],
+        cxx_pattern: Pattern[str],
+        options: CensusOptions,
+        jobs: int | None = None
+    ) -> CommentCensus:
+    """
+    Collects the statistics of the comments in the C and C++ source files in `root` recursively.
+
+    The files are scanned in parallel by `jobs` processes without libclang.
+
+    Parameters
+    ----------
+    root : Path
+        The directory (or a single source file).
+    c_pattern : Pattern[str]
+        Used to determine C source files. It has precedence over `cxx_pattern`.
+    cxx_pattern : Pattern[str]
+        Used to determine C++ source files.
+    options : CensusOptions
+        The parameters of the converters.
+    jobs : int | None, optional
+        The number of processes, by default `os.cpu_count()`.
+    """
+    files = list(_collect_files(root, c_pattern, cxx_pattern))
+    scan_root = root if root.is_dir() else root.parent
+    census = CommentCensus()
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    scan = partial(_scan_file, options, scan_root)
+    if jobs <= 1 or len(files) <= 1:
+        results: Iterable[CommentCensus] = map(scan, files)
+        for result in results:
+            census.merge(result)
+        return census
+    with ProcessPoolExecutor(jobs) as executor:
+        for result in executor.map(scan, files, chunksize=max(1, len(files) // (jobs * 8))):
+            census.merge(result)
+    return census
+
+
+def _collect_files(root: Path, c_pattern: Pattern[str], cxx_pattern: Pattern[str]) -> Iterable[tuple[Path, bool]]:
+    if root.is_file():
+        candidates: Iterable[Path] = [root]
+    else:
+        candidates = (dirpath / filename for dirpath, _, filenames in root.walk() for filename in filenames)
+    for file in candidates:
+        if c_pattern.fullmatch(file.name) is not None:
+            yield file, False
+        elif cxx_pattern.fullmatch(file.name) is not None:
+            yield file, True
@@ -0,0 +1,194 @@
+import json
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Sequence
+
+from .conversion import ConvEmpty, ConvError, ConvPresent, ConvResult, ConvUnsupported
+from .document import Document
+from .extractor import Comment
+
+_FORMAT_VERSION: int = 1
+
+
+@dataclass(frozen=True)
+class CheckpointRecord:
+    """The conversion of a file: the hashes of its code before and after and the results by comment offset."""
+    input_hash: str
+    output_hash: str
+    results: dict[int, ConvResult] # By Comment.comment_range.start
+
+
+class ConversionCheckpoint:
+    """
+    Append-only log of the converted files of a run, stored as JSON lines.
+
+    A record is appended after the comments of a file were converted and
+    before the file is written. It contains the path of the file relative
+    to `root`, the hashes of the code before and after the conversion, the
+    results of the conversion and the hash of the configuration, so an
+    interrupted run can be resumed on any machine with the same
+    configuration: Files whose code has the hash after the conversion are
+    skipped, files whose code has the hash before the conversion get the
+    recorded results without converting them again.
+
+    Files with a failed conversion (`ConvError`) are not recorded, so they
+    are converted again when the run is resumed.
+    """
+
+    def __init__(self, path: Path, root: Path, config: Mapping[str, Any], resume: bool = False) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        path : Path
+            The checkpoint file. It is created if it does not exist.
+        root : Path
+            The directory that the paths of the records are relative to.
+        config : Mapping[str, Any]
+            The options that change the conversion results (JSON serializable).
+            Records of another configuration are ignored.
+        resume : bool, optional
+            If True, the records of `path` are read and new records are
+            appended. Otherwise, `path` is truncated. By default False.
+
+        Raises
+        ------
+        OSError
+            If the file cannot be read or written.
+        """
+        self.path = path
+        self.root = root
+        self.config_hash = self.make_config_hash(config)
+        self.recorded = 0
+        self.skipped = 0 # Files that were already converted
+        self.reapplied = 0 # Files that got the recorded results
+        self.ignored = 0 # Records of another configuration, a newer format or broken lines
+        self._records: dict[str, CheckpointRecord] = {}
+        complete_line = True
+        if resume and path.exists():
+            complete_line = self._read()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if not complete_line:
+            self._file.write("\n") # Do not continue the broken last line
+
+    def is_converted(self, file: Path, code: str) -> bool:
+        """Returns True if `code` of `file` is the recorded result of a conversion and counts it as skipped."""
+        record = self._records.get(self._key(file))
+        if record is None or record.output_hash != self._hash(code):
+            return False
+        self.skipped += 1
+        return True
+
+    def has_results(self, file: Path, code: str) -> bool:
+        """Returns True if results are recorded for the unconverted `code` of `file`."""
+        record = self._records.get(self._key(file))
+        return record is not None and record.input_hash == self._hash(code)
+
+    def get_results(self, file: Path, code: str, comments: Sequence[Comment[Any]]) -> list[ConvResult] | None:
+        """
+        Returns the recorded results for `comments` of `code` of `file` in
+        the order of `comments` and counts them as reapplied, or None if no
+        results are recorded for `code` or they do not belong to `comments`.
+        """
+        record = self._records.get(self._key(file))
+        if record is None or record.input_hash != self._hash(code):
+            return None
+        starts = [comment.comment_range.start for comment in comments]
+        if len(starts) != len(record.results) or not all(start in record.results for start in starts):
+            return None
+        self.reapplied += 1
+        return [record.results[start] for start in starts]
+
+    def add(self, file: Path, code: str, document: Document | None, results: Sequence[tuple[Comment[Any], ConvResult]]) -> None:
+        """
+        Appends the record of the conversion of `code` of `file` to `document`
+        and flushes it, unless a result is a `ConvError`.
+        """
+        if any(isinstance(result, ConvError) for _, result in results):
+            return
+        output_hash = self._hash_chunks(document.iter_text()) if document is not None and document.has_changes() else self._hash(code)
+        entry = {
+            "version": _FORMAT_VERSION,
+            "config": self.config_hash,
+            "file": self._key(file),
+            "input": self._hash(code),
+            "output": output_hash,
+            "results": [self._encode_result(comment, result) for comment, result in results],
+        }
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self.recorded += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def summary(self) -> str:
+        message = (f"Checkpoint: {self.recorded} files recorded, {self.skipped} already converted files skipped, "
+                   f"recorded results reapplied to {self.reapplied} files")
+        if self.ignored > 0:
+            message += f", {self.ignored} records of another configuration or unreadable records ignored"
+        return message
+
+    @staticmethod
+    def make_config_hash(config: Mapping[str, Any]) -> str:
+        """Returns the hash of `config`, independent of the order of its keys."""
+        return sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _read(self) -> bool:
+        # Returns False if the last line is not terminated
+        line = ""
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if entry["version"] != _FORMAT_VERSION or entry["config"] != self.config_hash:
+                        self.ignored += 1
+                        continue
+                    results = dict(self._decode_result(encoded) for encoded in entry["results"])
+                    self._records[entry["file"]] = CheckpointRecord(entry["input"], entry["output"], results)
+                except (ValueError, KeyError, TypeError): # E.g. the last line of a killed run
+                    self.ignored += 1
+        return line == "" or line.endswith("\n")
+
+    def _key(self, file: Path) -> str:
+        # Relative to root with "/", so a checkpoint can be resumed on another machine
+        try:
+            return file.relative_to(self.root).as_posix()
+        except ValueError:
+            return file.as_posix()
+
+    @classmethod
+    def _hash(cls, code: str) -> str:
+        return cls._hash_chunks((code,))
+
+    @classmethod
+    def _hash_chunks(cls, chunks: Iterable[str]) -> str:
+        h = sha256()
+        for chunk in chunks:
+            h.update(chunk.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    @classmethod
+    def _encode_result(cls, comment: Comment[Any], result: ConvResult) -> list[Any]:
+        match result:
+            case ConvPresent(new_comment):
+                return [comment.comment_range.start, "present", new_comment]
+            case ConvEmpty():
+                return [comment.comment_range.start, "empty"]
+            case _:
+                return [comment.comment_range.start, "unsupported"]
+
+    @classmethod
+    def _decode_result(cls, encoded: list[Any]) -> tuple[int, ConvResult]:
+        match encoded:
+            case [int(start), "present", str(new_comment)]:
+                return start, ConvPresent(new_comment)
+            case [int(start), "empty"]:
+                return start, ConvEmpty()
+            case [int(start), "unsupported"]:
+                return start, ConvUnsupported()
+            case _:
+                raise ValueError(f"Invalid result: {encoded}")
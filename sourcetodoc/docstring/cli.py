@@ -1,21 +1,40 @@
 import re
+import sqlite3
 from argparse import ArgumentParser
 from enum import StrEnum
+from pathlib import Path
 from typing import Any, Iterable, Mapping
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from ..common.Config import Config
+from .census import CensusOptions, run_census
+from .checkpoint import ConversionCheckpoint
 from .comment_style import CommentStyle
 from .conversion import Conversion
 from .conversions.command_style_conversion import CommandStyleConversion
 from .conversions.comment_style_conversion import CommentStyleConversion
 from .conversions.default_comment_conversion import DefaultCommentStyleConversion
 from .conversions.find_and_replace_conversion import FindAndReplaceConversion
+from .conversions.find_and_replace_rules_conversion import FindAndReplaceRulesConversion
 from .conversions.llm import LLM
+from .conversions.llm_cache import LLMResponseCache
 from .conversions.llm_conversion import LLMConversion
+from .conversions.llm_endpoints import LLMEndpoint, LLMEndpointPool
+from .conversions.llm_rate_limit import LLMRateLimiter
+from .conversions.prompt_budget import PromptBudget
 from .converter import Converter
+from .extraction_cache import CachedExtractor, ExtractionCache
+from .extractor import Extractor
+from .extractors.c_lexer_extractor import CLexerExtractor
+from .extractors.c_libclang_extractor import CLibclangExtractor
+from .extractors.c_type import CType
+from .extractors.cxx_libclang_extractor import CXXLibclangExtractor
+from .extractors.cxx_type import CXXType
+from .extractors.doc_coverage import DocCoverageReport
+from .extractors.libclang_stats import LibclangStatsReport
 from .replace import Replace
+from .scheduler import ConversionScheduler, PriorityWeights
 
 
 _style_map: Mapping[str, CommentStyle] = {
@@ -35,29 +54,29 @@ _style_map: Mapping[str, CommentStyle] = {
 }
 
 
+# The options that change the conversion results, recorded by --cc_checkpoint
+_CHECKPOINT_CONFIG_ARGS: tuple[str, ...] = (
+    "converter", "cc_replace", "cc_style", "cc_only_after_member", "cc_llm_model",
+    "cc_llm_max_prompt_tokens", "cc_llm_max_comment_tokens", "cc_llm_batch_size",
+    "cc_c_system_prompt", "cc_c_user_prompt_template", "cc_cxx_system_prompt", "cc_cxx_user_prompt_template",
+    "cc_command_style", "cc_find", "cc_substitution", "cc_c_regex", "cc_cxx_regex", "cc_c_extractor",
+)
+
+
 class _ConverterNames(StrEnum):
     DEFAULT = "default"
     COMMENT_STYLE = "comment_style"
     FUNCTION_COMMENT_LLM = "function_comment_llm"
     COMMAND_STYLE = "command_style"
     FIND_AND_REPLACE = "find_and_replace"
+    FIND_AND_REPLACE_RULES = "find_and_replace_rules"
 
 
 def run_comment_converter(parser: ArgumentParser, config: Config) -> None:
     """Runs the converter depending on the given arguments in `kwargs`."""
     kwargs = vars(config.args)
 
-    c_regex: str | None = kwargs["cc_c_regex"]
-    try:
-        c_pattern = re.compile(c_regex) if c_regex is not None else None
-    except re.error:
-        parser.error(f"Error: Python RegEx {c_regex} cannot be compiled")
-
-    cxx_regex: str | None = kwargs["cc_cxx_regex"]
-    try:
-        cxx_pattern = re.compile(cxx_regex) if cxx_regex is not None else None
-    except re.error:
-        parser.error(f"Error: Python RegEx {cxx_regex} cannot be compiled")
+    c_pattern, cxx_pattern = _get_patterns(parser, **kwargs)
 
     selected_conversion = _get_conversion(parser, **kwargs)
     if selected_conversion is None:
@@ -75,14 +94,54 @@ def run_comment_converter(parser: ArgumentParser, config: Config) -> None:
                        f"Got \"{kwargs["converter"]}\" instead")
             parser.error(message)
 
+    c_extractor: Extractor[CType] | None = None
+    match kwargs["cc_c_extractor"]:
+        case "libclang" | None:
+            pass
+        case "lexer":
+            c_extractor = CLexerExtractor()
+        case _:
+            parser.error(f"Choices for --cc_c_extractor:\nlibclang\nlexer\n\nGot \"{kwargs["cc_c_extractor"]}\" instead")
+
+    cxx_extractor: Extractor[CXXType] | None = None
+    doc_coverage: DocCoverageReport | None = None
+    if kwargs["cc_doc_coverage"] is not None:
+        doc_coverage = DocCoverageReport()
+        if c_extractor is None:
+            c_extractor = CLibclangExtractor(coverage=True)
+        else:
+            print("Documentation coverage is only computed for C++ source files, because --cc_c_extractor is not libclang")
+        cxx_extractor = CXXLibclangExtractor(coverage=True)
+
+    extraction_cache: ExtractionCache | None = None
+    if kwargs["cc_extraction_cache"] is not None:
+        cache_size: int = kwargs["cc_extraction_cache_size"] # type: ignore
+        extraction_cache = ExtractionCache(Path(kwargs["cc_extraction_cache"]), cache_size * 1024 * 1024)
+        c_extractor = CachedExtractor(c_extractor if c_extractor is not None else CLibclangExtractor(), CType, extraction_cache)
+        cxx_extractor = CachedExtractor(cxx_extractor if cxx_extractor is not None else CXXLibclangExtractor(), CXXType, extraction_cache)
+
+    libclang_stats: LibclangStatsReport | None = None
+    if kwargs["cc_libclang_stats"] is not None:
+        libclang_stats = LibclangStatsReport()
+
+    src_path = config.project_path
+    checkpoint = _get_checkpoint(parser, src_path if src_path.is_dir() else src_path.parent, **kwargs)
+    scheduler = _get_scheduler(parser, selected_conversion, **kwargs)
+
     converter = Converter(
         selected_conversion,
         replace,
         c_pattern,
-        cxx_pattern
+        cxx_pattern,
+        c_extractor,
+        cxx_extractor,
+        libclang_stats,
+        doc_coverage,
+        kwargs["cc_llm_concurrency"], # type: ignore
+        checkpoint,
+        scheduler
     )
 
-    src_path = config.project_path
     if src_path.is_file():
         converter.convert_file(src_path)
     elif src_path.is_dir():
@@ -90,6 +149,130 @@ def run_comment_converter(parser: ArgumentParser, config: Config) -> None:
     else:
         parser.error(f"{src_path} is not a file or a directory")
 
+    if scheduler is not None:
+        print(scheduler.summary())
+        if kwargs["cc_backlog"] is not None:
+            scheduler.write_backlog(Path(kwargs["cc_backlog"]))
+            print(f"The backlog was written to \"{kwargs["cc_backlog"]}\"")
+    if checkpoint is not None:
+        print(checkpoint.summary())
+        checkpoint.close()
+    if extraction_cache is not None:
+        print(f"Extraction cache: {extraction_cache.hits} hits, {extraction_cache.misses} misses")
+    if libclang_stats is not None:
+        print(libclang_stats.summary())
+        libclang_stats.write_json(Path(kwargs["cc_libclang_stats"]))
+    if doc_coverage is not None:
+        out_dir = Path(kwargs["cc_doc_coverage"])
+        doc_coverage.write(out_dir)
+        print(doc_coverage.summary())
+        print(f"Documentation coverage was written to \"{out_dir}\"")
+    if isinstance(selected_conversion, FindAndReplaceRulesConversion):
+        print(selected_conversion.summary())
+    if isinstance(selected_conversion, LLMConversion) and selected_conversion.llm_helper.llm.rate_limiter is not None:
+        print(selected_conversion.llm_helper.llm.rate_limiter.stats.summary())
+    if isinstance(selected_conversion, LLMConversion) and selected_conversion.llm_helper.llm.endpoints is not None:
+        print(selected_conversion.llm_helper.llm.endpoints.summary())
+    if isinstance(selected_conversion, LLMConversion) and selected_conversion.llm_helper.stream:
+        print(f"LLM streaming: {selected_conversion.llm_helper.llm.stopped_streams} responses were closed after the first comment")
+    if isinstance(selected_conversion, LLMConversion) and selected_conversion.llm_helper.budget is not None:
+        print(selected_conversion.llm_helper.budget.summary())
+    if isinstance(selected_conversion, LLMConversion) and selected_conversion.llm_helper.cache is not None:
+        print(selected_conversion.llm_helper.cache.summary())
+        selected_conversion.llm_helper.cache.close()
+
+
+def run_comment_census(parser: ArgumentParser, config: Config) -> None:
+    """Writes statistics of the comments in the project to the directory given by --cc_census."""
+    kwargs = vars(config.args)
+
+    c_pattern, cxx_pattern = _get_patterns(parser, **kwargs)
+
+    find_pattern: re.Pattern[str] | None = None
+    if kwargs["cc_find"] is not None:
+        try:
+            find_pattern = re.compile(kwargs["cc_find"])
+        except re.error:
+            parser.error(f"Error: Python RegEx {kwargs["cc_find"]} cannot be compiled")
+    find_rules_pattern: re.Pattern[str] | None = None
+    if kwargs["cc_find_rules"] is not None:
+        try:
+            find_rules_pattern = FindAndReplaceRulesConversion.from_yaml(Path(kwargs["cc_find_rules"])).combined_pattern
+        except (OSError, ValueError) as e:
+            parser.error(f"Error: {kwargs["cc_find_rules"]} cannot be read: {e}")
+
+    options = CensusOptions(
+        kwargs["cc_c_system_prompt"] or "",
+        kwargs["cc_c_user_prompt_template"] or "{}",
+        kwargs["cc_cxx_system_prompt"] or "",
+        kwargs["cc_cxx_user_prompt_template"] or "{}",
+        _style_map.get(kwargs["cc_style"]) if kwargs["cc_style"] is not None else None,
+        find_pattern,
+        find_rules_pattern
+    )
+
+    src_path = config.project_path
+    if not src_path.exists():
+        parser.error(f"{src_path} is not a file or a directory")
+    census = run_census(
+        src_path,
+        c_pattern if c_pattern is not None else Converter._DEFAULT_C_PATTERN, # type: ignore
+        cxx_pattern if cxx_pattern is not None else Converter._DEFAULT_CXX_PATTERN, # type: ignore
+        options,
+        kwargs["cc_census_jobs"] # type: ignore
+    )
+    out_dir = Path(kwargs["cc_census"])
+    census.write(out_dir)
+    print(census.summary())
+    print(f"Census was written to \"{out_dir}\"")
+
+
+def _get_patterns(parser: ArgumentParser, **kwargs: Any) -> tuple[re.Pattern[str] | None, re.Pattern[str] | None]:
+    c_regex: str | None = kwargs["cc_c_regex"]
+    try:
+        c_pattern = re.compile(c_regex) if c_regex is not None else None
+    except re.error:
+        parser.error(f"Error: Python RegEx {c_regex} cannot be compiled")
+
+    cxx_regex: str | None = kwargs["cc_cxx_regex"]
+    try:
+        cxx_pattern = re.compile(cxx_regex) if cxx_regex is not None else None
+    except re.error:
+        parser.error(f"Error: Python RegEx {cxx_regex} cannot be compiled")
+
+    return c_pattern, cxx_pattern
+
+
+def _get_checkpoint(parser: ArgumentParser, root: Path, **kwargs: Any) -> ConversionCheckpoint | None:
+    if kwargs["cc_checkpoint"] is None:
+        if kwargs["cc_resume"]:
+            parser.error("--cc_resume requires --cc_checkpoint")
+        return None
+    checkpoint_config = {arg: kwargs[arg] for arg in _CHECKPOINT_CONFIG_ARGS}
+    if kwargs["cc_find_rules"] is not None:
+        try: # The rules, not their path, so the checkpoint can be resumed on another machine
+            checkpoint_config["cc_find_rules"] = Path(kwargs["cc_find_rules"]).read_text()
+        except OSError as e:
+            parser.error(f"Error: {kwargs["cc_find_rules"]} cannot be read: {e}")
+    try:
+        return ConversionCheckpoint(Path(kwargs["cc_checkpoint"]), root, checkpoint_config, bool(kwargs["cc_resume"]))
+    except OSError as e:
+        parser.error(f"Error: {kwargs["cc_checkpoint"]} cannot be opened as checkpoint: {e}")
+
+
+def _get_scheduler(parser: ArgumentParser, conversion: Conversion[Any], **kwargs: Any) -> ConversionScheduler | None:
+    if all(kwargs[arg] is None for arg in ("cc_priority", "cc_time_budget", "cc_token_budget", "cc_backlog")):
+        return None
+    spent_tokens = None
+    if isinstance(conversion, LLMConversion) and conversion.llm_helper.llm.rate_limiter is not None:
+        stats = conversion.llm_helper.llm.rate_limiter.stats
+        spent_tokens = lambda: stats.tokens
+    try:
+        weights = PriorityWeights.parse(kwargs["cc_priority"]) if kwargs["cc_priority"] is not None else PriorityWeights()
+        return ConversionScheduler(weights, kwargs["cc_time_budget"], kwargs["cc_token_budget"], spent_tokens)
+    except ValueError as e:
+        parser.error(f"Error: {e}")
+
 
 def _get_conversion(parser: ArgumentParser, **kwargs: str | None) -> Conversion[Any] | None:
     conversion: Conversion[Any] | None = None
@@ -105,8 +288,14 @@ def _get_conversion(parser: ArgumentParser, **kwargs: str | None) -> Conversion[
         case _ConverterNames.FUNCTION_COMMENT_LLM:
             llm = arg_helper.get_llm()
             prompts = arg_helper.get_llm_prompts()
-            if llm is not None and prompts is not None:
-                conversion = LLMConversion(llm, prompts[0], prompts[1], prompts[2], prompts[3])
+            llm_cache = arg_helper.get_llm_cache()
+            batch_size = arg_helper.get_llm_batch_size()
+            budget = arg_helper.get_llm_prompt_budget()
+            if llm is not None and prompts is not None and batch_size is not None:
+                conversion = LLMConversion(
+                    llm, prompts[0], prompts[1], prompts[2], prompts[3],
+                    llm_cache, batch_size, budget, bool(kwargs["cc_llm_stream"])
+                )
         case _ConverterNames.COMMAND_STYLE:
             javadoc_style = arg_helper.get_command_style()
             if javadoc_style is not None:
@@ -116,6 +305,8 @@ def _get_conversion(parser: ArgumentParser, **kwargs: str | None) -> Conversion[
             if pattern_and_replacement is not None:
                 pattern, replacement = pattern_and_replacement
                 conversion = FindAndReplaceConversion(pattern, replacement)
+        case _ConverterNames.FIND_AND_REPLACE_RULES:
+            conversion = arg_helper.get_find_and_replace_rules()
         case _:
             message = (f"Choices for --converter:\n{"\n".join(e for e in _ConverterNames)}\n\n"
                        f"Got \"{kwargs["converter"]}\" instead")
@@ -163,10 +354,100 @@ class _ArgumentHelper:
         if model is None:
             self._add_arg_missing_error_message("cc_llm_model")
 
+        rate_limiter = self.get_llm_rate_limiter()
+        base_urls = [url.strip() for url in base_url.split(",")] if base_url is not None else []
+        weights = self.get_llm_endpoint_weights(len(base_urls))
+
         if not self.has_error_message():
-            client = OpenAI(base_url=base_url, api_key=api_key)
-            return LLM(client, model) # type: ignore
+            # Retries are done by the rate limiter, which also respects the limits for them
+            # (a retry may be sent to another endpoint)
+            endpoints = [
+                LLMEndpoint(
+                    OpenAI(base_url=url, api_key=api_key, max_retries=0),
+                    AsyncOpenAI(base_url=url, api_key=api_key, max_retries=0),
+                    weight
+                )
+                for url, weight in zip(base_urls, weights) # type: ignore
+            ]
+            if len(endpoints) == 1:
+                return LLM(endpoints[0].client, model, endpoints[0].async_client, rate_limiter=rate_limiter) # type: ignore
+            try:
+                pool = LLMEndpointPool(endpoints, self.kwargs["cc_llm_max_failures"], self.kwargs["cc_llm_eject_seconds"]) # type: ignore
+            except ValueError as e:
+                self._add_error_message(f"Error: {e}")
+                return None
+            llm = LLM.create_balanced_LLM(pool, model) # type: ignore
+            llm.rate_limiter = rate_limiter
+            return llm
+
+    def get_llm_endpoint_weights(self, count: int) -> list[float] | None:
+        self._check_args_present("cc_llm_endpoint_weights", "cc_llm_max_failures", "cc_llm_eject_seconds")
+
+        weights_arg = self.kwargs["cc_llm_endpoint_weights"]
+        if weights_arg is None:
+            return [1.0] * count
+        try:
+            weights = [float(weight) for weight in weights_arg.split(",")]
+        except ValueError:
+            self._add_error_message(f"cc_llm_endpoint_weights = \"{weights_arg}\" must be comma-separated numbers")
+            return None
+        if len(weights) != count:
+            self._add_error_message(f"cc_llm_endpoint_weights has {len(weights)} weights for {count} base URLs of --cc_openai_base_url")
+            return None
+        return weights
+
+    def get_llm_rate_limiter(self) -> LLMRateLimiter | None:
+        self._check_args_present("cc_llm_requests_per_minute", "cc_llm_tokens_per_minute", "cc_llm_max_retries")
+
+        requests_per_minute: int | None = self.kwargs["cc_llm_requests_per_minute"] # type: ignore
+        tokens_per_minute: int | None = self.kwargs["cc_llm_tokens_per_minute"] # type: ignore
+        max_retries: int = self.kwargs["cc_llm_max_retries"] # type: ignore
+
+        if max_retries < 0:
+            self._add_error_message(f"cc_llm_max_retries = {max_retries} must not be negative")
+            return None
+        try:
+            return LLMRateLimiter(requests_per_minute, tokens_per_minute, max_retries)
+        except ValueError as e:
+            self._add_error_message(f"Error: {e}")
+        return None
     
+    def get_llm_cache(self) -> LLMResponseCache | None:
+        self._check_args_present("cc_llm_cache", "cc_llm_cache_size")
+
+        cache_path = self.kwargs["cc_llm_cache"]
+        if cache_path is None:
+            return None
+        cache_size: int = self.kwargs["cc_llm_cache_size"] # type: ignore
+        try:
+            return LLMResponseCache(Path(cache_path), cache_size * 1024 * 1024)
+        except (OSError, sqlite3.Error) as e:
+            self._add_error_message(f"Error: {cache_path} cannot be opened as LLM cache: {e}")
+        return None
+
+    def get_llm_batch_size(self) -> int | None:
+        self._check_args_present("cc_llm_batch_size")
+
+        batch_size: int = self.kwargs["cc_llm_batch_size"] # type: ignore
+        if batch_size < 1:
+            self._add_error_message(f"cc_llm_batch_size = {batch_size} must be at least 1")
+            return None
+        return batch_size
+
+    def get_llm_prompt_budget(self) -> PromptBudget | None:
+        self._check_args_present("cc_llm_max_prompt_tokens", "cc_llm_max_comment_tokens")
+
+        max_prompt_tokens: int | None = self.kwargs["cc_llm_max_prompt_tokens"] # type: ignore
+        max_comment_tokens: int | None = self.kwargs["cc_llm_max_comment_tokens"] # type: ignore
+        if max_prompt_tokens is None and max_comment_tokens is None:
+            return None
+        limits = {"max_prompt_tokens": max_prompt_tokens, "max_comment_tokens": max_comment_tokens}
+        try:
+            return PromptBudget(**{name: limit for name, limit in limits.items() if limit is not None}) # Default for the other
+        except ValueError as e:
+            self._add_error_message(f"Error: {e}")
+        return None
+
     def get_llm_prompts(self) -> tuple[str,str,str,str] | None:
         c_system_prompt = self.kwargs["cc_c_system_prompt"]
         c_user_prompt_template = self.kwargs["cc_c_user_prompt_template"]
@@ -229,6 +510,21 @@ class _ArgumentHelper:
         if pattern is not None and replacement is not None:
             return (pattern, replacement)
 
+    def get_find_and_replace_rules(self) -> FindAndReplaceRulesConversion | None:
+        self._check_args_present("cc_find_rules")
+
+        rules_path = self.kwargs["cc_find_rules"]
+        if rules_path is None:
+            self._add_arg_missing_error_message("cc_find_rules")
+            return None
+        try:
+            return FindAndReplaceRulesConversion.from_yaml(Path(rules_path))
+        except OSError as e:
+            self._add_error_message(f"Error: {rules_path} cannot be read: {e}")
+        except ValueError as e:
+            self._add_error_message(f"Error: {e}")
+        return None
+
     def has_error_message(self) -> bool:
         return len(self.error_messages) > 0
     
@@ -1,4 +1,4 @@
-from enum import Enum, auto
+import re
 from typing import Iterable, Iterator, Sequence, SupportsIndex
 
 from .comment_style import (BLOCK_INLINE_STYLES, BLOCK_STYLES, LINE_STYLES,
@@ -13,20 +13,37 @@ def _get_style_by_start_delimiter(comment: str, candidates: Iterable[CommentStyl
     raise RuntimeError
 
 
-class _State(Enum):
-    START = auto()
-    SLASH = auto()
-    LINE = auto()
-    BLOCK_INLINE = auto()
-    BLOCK_INLINE_ASTERISK = auto()
-    BLOCK = auto()
-    BLOCK_ASTERISK = auto()
+# Characters that are skipped in a single step are excluded from the leading [^...]* and
+# handled by "." if no alternative matches. Every repetition has disjoint alternatives or is lazy.
+_COMMENT_REGEX = re.compile(r"""
+    [^/]*
+    (?:
+        (?P<line>//(?:[^\n\\]|\\(?:\r\n|.)?)*) # Line comment, "\" at the end of a line continues it
+      | (?P<block>/\*.*?(?:\*/|\Z))
+      | .
+    )
+""", re.VERBOSE | re.DOTALL)
+
+_COMMENT_OR_LITERAL_REGEX = re.compile(r"""
+    [^/"'R]*
+    (?:
+        (?P<line>//(?:[^\n\\]|\\(?:\r\n|.)?)*) # Line comment, "\" at the end of a line continues it
+      | (?P<block>/\*.*?(?:\*/|\Z))
+      | (?P<literal>
+            (?:(?<!\w)|(?<=(?<!\w)[uUL])|(?<=(?<!\w)u8))R"(?P<delimiter>[^\s()\\]{0,16})\(.*?(?:\)(?P=delimiter)"|\Z) # Raw string
+          | "(?:[^"\\\n]|\\.)*"?
+          | (?:(?<!\w)|(?<=(?<!\w)[uUL])|(?<=(?<!\w)u8))'(?:[^'\\\n]|\\.)*'? # Not a digit separator, e.g. 1'000
+        )
+      | .
+    )
+""", re.VERBOSE | re.DOTALL)
 
 
 def find_comments(
         code: str,
         start: SupportsIndex | None = None,
-        end: SupportsIndex | None = None
+        end: SupportsIndex | None = None,
+        skip_literals: bool = True
     ) -> Iterator[tuple[Range, CommentStyle]]:
     """
     Returns the range and style of single C comment pieces in `code` in ascending order.
@@ -38,6 +55,12 @@ def find_comments(
     ````
     are two comment pieces.
 
+    The scanner jumps from one candidate delimiter to the next with a
+    compiled regular expression. Delimiters in string, char and raw
+    string literals are ignored and line comments are continued by a
+    backslash at the end of the line. Comments that are not terminated
+    before `end` end at `end`.
+
     Parameters
     ----------
     code: str
@@ -46,6 +69,9 @@ def find_comments(
         The start index to search, by default `0`.
     end: SupportsIndex | None, optional
         The end index to search, by default `len(code`)
+    skip_literals: bool, optional
+        If set to False, quotes are ignored, e.g. for prose that contains
+        comments, by default True.
 
     Yields
     ------
@@ -56,80 +82,27 @@ def find_comments(
     if end is None:
         end = len(code)
 
-    state: _State = _State.START
-    comment_start: int = 0
-    for i in range(start, end):
-        x = code[i]
-        match state:
-            case _State.START:
-                match x:
-                    case "/": # /
-                        comment_start = i
-                        state = _State.SLASH
-                    case str(): # ...
-                        pass
-            case _State.SLASH: # /
-                match x:
-                    case "/": # //
-                        state = _State.LINE
-                    case "*": # /*
-                        state = _State.BLOCK_INLINE
-                    case str():
-                        pass
-            case _State.LINE: # //...
-                match x:
-                    case "\n": # //...\n
-                        state = _State.START
-                        yield Range(comment_start, i), _get_style_by_start_delimiter(code, LINE_STYLES, comment_start)
-                    case str(): # //...
-                        pass
-            case _State.BLOCK_INLINE: # /*...
-                match x:
-                    case "*": # /*...*
-                        state = _State.BLOCK_INLINE_ASTERISK
-                    case "\n":
-                        state = _State.BLOCK
-                    case str(): # /*...
-                        pass
-            case _State.BLOCK_INLINE_ASTERISK: # /*...*
-                match x:
-                    case "/": # /*...*/
-                        yield Range(comment_start,i+1), _get_style_by_start_delimiter(code, BLOCK_INLINE_STYLES, comment_start)
-                        state = _State.START
-                    case "\n": # /*...*\n
-                        state = _State.BLOCK
-                    case str():  # /*...*...
-                        state = _State.BLOCK_INLINE
-            case _State.BLOCK: # /*...\n...
-                match x:
-                    case "*": # /*...\n...*
-                        state = _State.BLOCK_ASTERISK
-                    case str(): # /*...\n...
-                        pass
-            case _State.BLOCK_ASTERISK:
-                match x:
-                    case "/": # /*...\n...*/
-                        yield Range(comment_start,i+1), _get_style_by_start_delimiter(code, BLOCK_STYLES, comment_start)
-                        state = _State.START
-                    case str(): # /*...\n...*...
-                        pass
-
-    # Handle last line or block comment that has not ended by \n or */ respectively
-    match state:
-        case _State.LINE:
-            yield Range(comment_start, end.__index__()), _get_style_by_start_delimiter(code, LINE_STYLES, comment_start)
-        case _State.BLOCK_INLINE | _State.BLOCK_INLINE_ASTERISK:
-            yield Range(comment_start, end.__index__()), _get_style_by_start_delimiter(code, BLOCK_INLINE_STYLES, comment_start)
-        case _State.BLOCK | _State.BLOCK_ASTERISK:
-            yield Range(comment_start, end.__index__()), _get_style_by_start_delimiter(code, BLOCK_STYLES, comment_start)
-        case _:
-            pass
+    regex = _COMMENT_OR_LITERAL_REGEX if skip_literals else _COMMENT_REGEX
+    for matched in regex.finditer(code, start.__index__(), end.__index__()):
+        match matched.lastgroup:
+            case "line": # //...
+                comment_start, comment_end = matched.span("line")
+                yield Range(comment_start, comment_end), _get_style_by_start_delimiter(code, LINE_STYLES, comment_start)
+            case "block": # /*...*/
+                comment_start, comment_end = matched.span("block")
+                if code.find("\n", comment_start, comment_end) == -1: # /*...*/
+                    yield Range(comment_start, comment_end), _get_style_by_start_delimiter(code, BLOCK_INLINE_STYLES, comment_start)
+                else: # /*...\n...*/
+                    yield Range(comment_start, comment_end), _get_style_by_start_delimiter(code, BLOCK_STYLES, comment_start)
+            case _: # Literal or other character
+                pass
 
 
 def find_comments_connected_with_ranges(
         code: str,
         start: SupportsIndex | None = None,
-        end: SupportsIndex | None = None
+        end: SupportsIndex | None = None,
+        skip_literals: bool = True
     ) -> Iterator[tuple[Sequence[Range], CommentStyle]]:
     """
     Returns the range and style of C comments in `code` in ascending order.
@@ -150,6 +123,8 @@ def find_comments_connected_with_ranges(
         The start index to search, by default `0`.
     end: SupportsIndex | None, optional
         The end index to search, by default `len(code`).
+    skip_literals: bool, optional
+        See `find_comments`, by default True.
 
     Yields
     ------
@@ -157,7 +132,7 @@ def find_comments_connected_with_ranges(
     """
     ranges: list[Range] = []
     last_style: CommentStyle | None = None
-    for range, style in find_comments(code, start, end):
+    for range, style in find_comments(code, start, end, skip_literals):
         if last_style is None: # Init: There is no previous comment to combine
             ranges.append(range)
             last_style = style
@@ -206,7 +181,8 @@ def _use_less_specific_style(current_style: CommentStyle, other_style: CommentSt
 def find_comments_connected(
         code: str,
         start: SupportsIndex | None = None,
-        end: SupportsIndex | None = None
+        end: SupportsIndex | None = None,
+        skip_literals: bool = True
     ) -> Iterator[tuple[Range, CommentStyle]]:
     """
     Returns the range and style of C comments in `code` in ascending order.
@@ -221,9 +197,11 @@ def find_comments_connected(
         The start index to search, by default `0`.
     end: SupportsIndex | None, optional
         The end index to search, by default `len(code`).
+    skip_literals: bool, optional
+        See `find_comments`, by default True.
 
     Yields
     ------
     Iterator[tuple[Range, CommentStyle]]
     """
-    return ((Range(ranges[0].start, ranges[-1].end), style) for ranges, style in find_comments_connected_with_ranges(code, start, end))
+    return ((Range(ranges[0].start, ranges[-1].end), style) for ranges, style in find_comments_connected_with_ranges(code, start, end, skip_literals))
@@ -3,8 +3,10 @@ from itertools import chain
 from typing import Self
 
 from .comment_content import extract_content
-from .comment_parsing import find_comments_connected
+from .comment_parsing import (find_comments_connected,
+                              find_comments_connected_with_ranges)
 from .comment_style import BlockComment, CommentStyle, LineComment
+from .range import Range
 
 
 @dataclass(frozen=True)
@@ -109,3 +111,41 @@ class CommentStyler:
         for i in range(1, len(lines)):
             lines[i] = subsequent_indentation + start_delimiter + " " + lines[i] + " " + end_delimiter
         return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class ParsedComment(CommentStyler):
+    """
+    The result of parsing a comment text once.
+
+    It can be used like a `CommentStyler` object (e.g. in `match` statements).
+
+    Parameters
+    ----------
+    content : str
+        The content of the comment without comment delimiters.
+    style : CommentStyle
+        The (Doxygen) style of the comment.
+    piece_ranges : tuple[Range, ...]
+        The ranges of the comment pieces in the parsed comment text, see `find_comments`.
+    """
+    piece_ranges: tuple[Range, ...]
+
+    @classmethod
+    def parse(cls, comment_text: str) -> "ParsedComment | None":
+        """
+        Parses `comment_text` like `CommentStyler.parse_comment` and keeps the ranges of its pieces.
+
+        Returns
+        -------
+        ParsedComment | None
+            A ParsedComment object if the parsing was successful, else None.
+        """
+        groups = list(find_comments_connected_with_ranges(comment_text))
+        if len(groups) == 1:
+            ranges, style = groups[0]
+            text = comment_text[ranges[0].start:ranges[-1].end]
+            content = extract_content(text, style)
+            return cls(content, style, tuple(ranges))
+        else:
+            return None
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional, Protocol
+from typing import Optional, Protocol, Sequence, runtime_checkable
 
 from .extractor import Comment
 
@@ -56,3 +56,30 @@ class Conversion[T](Protocol):
             A ConvError object if an error occured.
         """
         ...
+
+
+@runtime_checkable
+class AsyncConversion[T](Conversion[T], Protocol):
+    """A `Conversion` that can also calculate new comment texts concurrently (e.g. with network requests)."""
+
+    async def calc_conversion_async(self, comment: Comment[T]) -> ConvResult:
+        """Like `calc_conversion`, but without blocking the event loop."""
+        ...
+
+
+@runtime_checkable
+class BatchConversion[T](AsyncConversion[T], Protocol):
+    """
+    An `AsyncConversion` that can calculate the new comment texts of a file together
+    (e.g. several comments in one request to a LLM) if `batch_size` is greater than 1.
+    """
+
+    batch_size: int
+
+    def calc_conversions(self, comments: Sequence[Comment[T]]) -> list[ConvResult]:
+        """Like `calc_conversion`, but for all `comments` of a file. The results have the order of `comments`."""
+        ...
+
+    async def calc_conversions_async(self, comments: Sequence[Comment[T]]) -> list[ConvResult]:
+        """Like `calc_conversions`, but without blocking the event loop."""
+        ...
@@ -45,7 +45,7 @@ class CommandStyleConversion(Conversion[Any]):
             A ConvUnsupported object if `comment` is not a
             Doxygen style comment.
         """
-        match CommentStyler.parse_comment(comment.comment_text):
+        match comment.parsed:
             case CommentStyler(_, style) if style.is_doxygen_style():
                 new_comment_text = self._sub_func(comment.comment_text)
                 if comment.comment_text == new_comment_text:
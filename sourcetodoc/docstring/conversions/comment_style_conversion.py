@@ -67,7 +67,7 @@ class CommentStyleConversion(Conversion[Any]):
                 return self._calc_conversion_helper(comment)
 
     def _calc_conversion_helper(self, comment: Comment[Any]) -> ConvResult:
-        match CommentStyler.parse_comment(comment.comment_text):
+        match comment.parsed:
             case CommentStyler(_, style=self.target_style):
                 return ConvEmpty("The comment has already that style")
             case CommentStyler(content, _) if content.count("*/") >= 1 and isinstance(self.target_style.value, BlockComment):
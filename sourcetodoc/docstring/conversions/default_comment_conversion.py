@@ -13,7 +13,7 @@ class DefaultCommentStyleConversion(Conversion[CType | CXXType]):
 
     @override
     def calc_conversion(self, comment: Comment[CType | CXXType]) -> ConvResult:
-        match CommentStyler.parse_comment(comment.comment_text):
+        match comment.parsed:
             case CommentStyler(_, style) if style.is_doxygen_style():
                 return ConvEmpty("The comment has already a Doxygen style")
             case CommentStyler(content, style):
@@ -0,0 +1,184 @@
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from re import Match, Pattern
+from typing import Any, Iterable, override
+
+from yaml import YAMLError
+from yaml import safe_load as yaml_safe_load
+
+from ..conversion import ConvEmpty, Conversion, ConvPresent, ConvResult
+from ..extractor import Comment
+
+# The tokens of a pattern: a backreference or conditional group (which would refer to other groups in
+# the combined pattern), the start of a named group, an escape, a character class or any other character
+_PATTERN_TOKEN_REGEX = re.compile(
+    r"(?P<backreference>\\[1-9]|\(\?P=|\(\?\()|(?P<named_group>\(\?P<\w+>)|\\.|\[\^?\]?(?:\\.|[^\]\\])*\]|.",
+    re.DOTALL
+)
+
+
+@dataclass(frozen=True)
+class FindAndReplaceRule:
+    """
+    A rule of `FindAndReplaceRulesConversion`.
+
+    If `literal` is True, `find` and `replacement` are plain strings,
+    else `find` is a Python RegEx and `replacement` may contain group
+    references like in `re.sub`.
+    """
+    find: str
+    replacement: str
+    literal: bool = False
+
+
+class FindAndReplaceRulesConversion(Conversion[Any]):
+    """
+    Converts comments by finding and replacing substrings with several rules in a single scan.
+
+    The rules are compiled into one alternation. At every position, the
+    first rule that matches is applied, and replaced text is not matched
+    again (unlike applying the rules one after another).
+    """
+
+    def __init__(self, rules: Iterable[FindAndReplaceRule]) -> None:
+        """
+        Constructs a new object.
+
+        Parameters
+        ----------
+        rules : Iterable[FindAndReplaceRule]
+            The rules in descending priority.
+
+        Raises
+        ------
+        ValueError
+            If there are no rules, a pattern cannot be compiled or a pattern has backreferences.
+        """
+        self.rules = list(rules)
+        if not self.rules:
+            raise ValueError("At least one rule is required")
+        self.hits = [0] * len(self.rules) # Number of replaced substrings per rule
+
+        self._patterns: list[Pattern[str]] = []
+        # The replacement of every rule, or None if it must be expanded for every match
+        self._fixed_replacements: list[str | None] = []
+        alternatives: list[str] = []
+        for i, rule in enumerate(self.rules):
+            find = re.escape(rule.find) if rule.literal else rule.find
+            try:
+                pattern = re.compile(find)
+            except re.error as e:
+                raise ValueError(f"Rule {i}: Python RegEx \"{rule.find}\" cannot be compiled: {e}") from e
+            if not rule.literal:
+                find = self._remove_group_names(i, find)
+            self._patterns.append(pattern)
+            if rule.literal or (pattern.groups == 0 and "\\" not in rule.replacement):
+                self._fixed_replacements.append(rule.replacement)
+            else:
+                self._fixed_replacements.append(None)
+            alternatives.append(f"(?P<_rule{i}>{find})")
+        try:
+            self._combined_pattern = re.compile("|".join(alternatives))
+        except re.error as e:
+            raise ValueError(f"The rules cannot be combined: {e}") from e
+
+    @classmethod
+    def from_yaml(cls, path: Path) -> "FindAndReplaceRulesConversion":
+        """
+        Constructs a new object with the rules in the YAML file `path`.
+
+        The file contains a list of rules, e.g. (a backslash in the
+        replacement of a RegEx rule must be escaped like in `re.sub`):
+
+        ```yaml
+        - find: '@returns?\\b'
+          replace: '\\\\return'
+        - find: 'TODO:'
+          replace: '\\todo'
+          literal: true
+        ```
+
+        Raises
+        ------
+        OSError
+            If the file cannot be read.
+        ValueError
+            If the file does not contain a valid list of rules.
+        """
+        try:
+            data = yaml_safe_load(path.read_text())
+        except YAMLError as e:
+            raise ValueError(f"{path} cannot be parsed: {e}") from e
+        if not isinstance(data, list):
+            raise ValueError(f"{path} must contain a list of rules")
+        rules: list[FindAndReplaceRule] = []
+        for i, entry in enumerate(data): # type: ignore
+            match entry:
+                case {"find": str(find), "replace": str(replacement), **rest} if set(rest) <= {"literal"}:
+                    literal = rest.get("literal", False)
+                    if not isinstance(literal, bool):
+                        raise ValueError(f"Rule {i} in {path}: \"literal\" must be true or false")
+                    rules.append(FindAndReplaceRule(find, replacement, literal))
+                case _:
+                    raise ValueError(f"Rule {i} in {path} must have the strings \"find\" and \"replace\" "
+                                     "and optionally \"literal\"")
+        return cls(rules)
+
+    @property
+    def combined_pattern(self) -> Pattern[str]:
+        """The pattern that matches a substring if any rule matches it."""
+        return self._combined_pattern
+
+    @override
+    def calc_conversion(self, comment: Comment[Any]) -> ConvResult:
+        """
+        Calculates new comments by finding and replacing substrings with every rule.
+
+        Parameters
+        ----------
+        comment : Comment[Any]
+            The comment.
+
+        Returns
+        -------
+        ConvResult
+            A ConvPresent object if the new comment text has changed,
+            else ConvEmpty
+        """
+        new_comment_text = self._combined_pattern.sub(self._replace_match, comment.comment_text)
+        if comment.comment_text == new_comment_text:
+            return ConvEmpty()
+        else:
+            return ConvPresent(new_comment_text)
+
+    def summary(self) -> str:
+        """Returns the number of replaced substrings per rule."""
+        lines = ["Replaced substrings per rule:"]
+        for rule, hits in zip(self.rules, self.hits):
+            lines.append(f"  {hits:>8}  {rule.find!r} -> {rule.replacement!r}")
+        return "\n".join(lines)
+
+    @classmethod
+    def _remove_group_names(cls, i: int, find: str) -> str:
+        # Returns the pattern for the combined pattern, in which named groups are not capturing,
+        # so the names of different rules cannot collide (the replacements use the pattern of the rule)
+        parts: list[str] = []
+        for token in _PATTERN_TOKEN_REGEX.finditer(find):
+            if token.lastgroup == "backreference":
+                raise ValueError(f"Rule {i}: Backreferences are not supported in \"{find}\"")
+            parts.append("(?:" if token.lastgroup == "named_group" else token[0])
+        return "".join(parts)
+
+    def _replace_match(self, matched: Match[str]) -> str:
+        # The group of the rule closes last, so it is the last group
+        i = int(matched.lastgroup.removeprefix("_rule")) # type: ignore
+        self.hits[i] += 1
+        replacement = self._fixed_replacements[i]
+        if replacement is not None:
+            return replacement
+        # Match again with the pattern of the rule to expand its own group references
+        rule_matched = self._patterns[i].match(matched.string, matched.start())
+        if rule_matched is None:
+            raise RuntimeError
+        return rule_matched.expand(self.rules[i].replacement)
@@ -1,25 +1,67 @@
-from dataclasses import dataclass
-from openai import OpenAI
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from openai import AsyncOpenAI, OpenAI
+
+from .llm_endpoints import LLMEndpoint, LLMEndpointPool
+from .llm_rate_limit import LLMRateLimiter
+from .prompt_budget import estimate_tokens
 
 
 @dataclass
 class LLM:
     client: OpenAI
     model: str
+    async_client: AsyncOpenAI | None = None # Used by call_llm_async if set
+    seed: int = 0
+    rate_limiter: LLMRateLimiter | None = None # Limits and retries the requests if set
+    endpoints: LLMEndpointPool | None = None # If set, its clients are used instead of client and async_client
+    stopped_streams: int = field(default=0, init=False) # Streamed responses that were closed before their end
 
     @staticmethod
     def create_LLM(base_url: str, api_key: str, model: str):
         """Convenience method to create a new LLM instance."""
-        return LLM(OpenAI(base_url=base_url, api_key=api_key), model)
+        return LLM(
+            OpenAI(base_url=base_url, api_key=api_key),
+            model,
+            AsyncOpenAI(base_url=base_url, api_key=api_key)
+        )
+
+    @property
+    def base_url(self) -> str:
+        return str(self.client.base_url)
+
+    @staticmethod
+    def create_balanced_LLM(endpoints: LLMEndpointPool, model: str) -> "LLM":
+        """
+        Creates a new LLM instance that distributes its requests over `endpoints`.
+        `call_llm_async` uses the async clients only if every endpoint has one.
+        """
+        first = endpoints.endpoints[0]
+        has_async_clients = all(endpoint.async_client is not None for endpoint in endpoints.endpoints)
+        return LLM(first.client, model, first.async_client if has_async_clients else None, endpoints=endpoints)
 
-    def call_llm(self, system_prompt: str, prompt: str) -> str:
+    def call_llm(self, system_prompt: str, prompt: str, is_complete: Callable[[str], bool] | None = None) -> str:
         """
         Calls the Chat Completions API.
 
+        If `rate_limiter` is set, the request waits for its limits and
+        transient errors are retried. If `endpoints` is set, every attempt is
+        sent to the endpoint that it selects.
+
         Parameters
         ----------
         prompt : str
             The user message.
+        is_complete : Callable[[str], bool] | None, optional
+            If set, the response is streamed and closed as soon as
+            `is_complete` returns True for the received text, which is
+            then returned. It is called once per chunk with content and
+            should only inspect the text added since its last call (and a
+            small tail before it), so that a response is not rescanned for
+            every chunk. By default None (the response is not streamed).
 
         Returns
         -------
@@ -33,15 +75,150 @@ class LLM:
         RuntimeError
             If the reponse message is None.
         """
-        response = self.client.chat.completions.create(
-            model=self.model,
-            seed=0,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-        ])
+        dispatch: tuple[LLMEndpoint, float] | None = None # The endpoint and start time of the streamed response
+
+        def request() -> Any:
+            nonlocal dispatch
+            endpoint = self.endpoints.acquire() if self.endpoints is not None else None
+            start = time.perf_counter()
+            client = endpoint.client if endpoint is not None else self.client
+            try:
+                response = client.chat.completions.create(
+                    model=self.model,
+                    seed=self.seed,
+                    messages=self._messages(system_prompt, prompt),
+                    stream=is_complete is not None
+                )
+            except BaseException as e: # Including cancellation, which must not count as a success
+                self._release(endpoint, start, e)
+                raise
+            if is_complete is None:
+                self._release(endpoint, start)
+            elif endpoint is not None:
+                dispatch = (endpoint, start)
+            return response
+
+        if self.rate_limiter is None:
+            response = request()
+        else:
+            response = self.rate_limiter.call(request, estimate_tokens(system_prompt + prompt))
+        if is_complete is None:
+            return self._content(response)
+
+        received = "" # Extended in place, so the received text is not joined again for every chunk
+        error: BaseException | None = None
+        try:
+            for chunk in response:
+                delta = self._delta(chunk)
+                if not delta:
+                    continue
+                received += delta
+                if is_complete(received):
+                    self.stopped_streams += 1
+                    break
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            response.close()
+            if dispatch is not None:
+                self._release(dispatch[0], dispatch[1], error)
+            if self.rate_limiter is not None:
+                self.rate_limiter.record_completion(estimate_tokens(received))
+        return received
+
+    async def call_llm_async(self, system_prompt: str, prompt: str, is_complete: Callable[[str], bool] | None = None) -> str:
+        """
+        Calls the Chat Completions API without blocking the event loop.
+
+        Like `call_llm`, but with `async_client`. If `async_client` is None,
+        `call_llm` is called in a worker thread.
+
+        Raises
+        ------
+        APIError
+
+        RuntimeError
+            If the reponse message is None.
+        """
+        async_client = self.async_client
+        if async_client is None:
+            return await asyncio.to_thread(self.call_llm, system_prompt, prompt, is_complete)
+
+        dispatch: tuple[LLMEndpoint, float] | None = None # The endpoint and start time of the streamed response
+
+        async def request() -> Any:
+            nonlocal dispatch
+            endpoint = self.endpoints.acquire() if self.endpoints is not None else None
+            start = time.perf_counter()
+            client = endpoint.async_client if endpoint is not None and endpoint.async_client is not None else async_client
+            try:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    seed=self.seed,
+                    messages=self._messages(system_prompt, prompt),
+                    stream=is_complete is not None
+                )
+            except BaseException as e: # Including cancellation, which must not count as a success
+                self._release(endpoint, start, e)
+                raise
+            if is_complete is None:
+                self._release(endpoint, start)
+            elif endpoint is not None:
+                dispatch = (endpoint, start)
+            return response
+
+        if self.rate_limiter is None:
+            response = await request()
+        else:
+            response = await self.rate_limiter.call_async(request, estimate_tokens(system_prompt + prompt))
+        if is_complete is None:
+            return self._content(response)
+
+        received = "" # Extended in place, so the received text is not joined again for every chunk
+        error: BaseException | None = None
+        try:
+            async for chunk in response:
+                delta = self._delta(chunk)
+                if not delta:
+                    continue
+                received += delta
+                if is_complete(received):
+                    self.stopped_streams += 1
+                    break
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            await response.close()
+            if dispatch is not None:
+                self._release(dispatch[0], dispatch[1], error)
+            if self.rate_limiter is not None:
+                self.rate_limiter.record_completion(estimate_tokens(received))
+        return received
+
+    def _release(self, endpoint: LLMEndpoint | None, start: float, error: BaseException | None = None) -> None:
+        if self.endpoints is not None and endpoint is not None:
+            self.endpoints.release(endpoint, time.perf_counter() - start, error)
+
+    @classmethod
+    def _messages(cls, system_prompt: str, prompt: str) -> Any:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    @classmethod
+    def _content(cls, response: Any) -> str:
         result = response.choices[0].message.content
         if result is not None:
             return result
         else:
             raise RuntimeError
+
+    @classmethod
+    def _delta(cls, chunk: Any) -> str:
+        # The content of a streamed chunk, or an empty string if it has none
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return ""
+        return chunk.choices[0].delta.content
@@ -0,0 +1,129 @@
+import sqlite3
+import time
+from hashlib import sha256
+from pathlib import Path
+
+_SCHEMA: str = """\
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    latency REAL NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)"""
+
+
+class LLMResponseCache:
+    """
+    Persistent cache for the responses of a LLM, stored in a SQLite database.
+
+    An entry contains the raw response and the latency of the request
+    that produced it. If the total size of the responses exceeds
+    `max_bytes`, the least recently used entries are deleted.
+
+    Every entry is committed immediately, so the responses of a run that
+    is interrupted are not requested again in the next run.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        path : Path
+            The database file. It is created if it does not exist.
+        max_bytes : int, optional
+            The maximum total size of the responses, by default 64 MiB.
+
+        Raises
+        ------
+        sqlite3.Error
+            If the database cannot be opened.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0 # Sum of the latencies of the hits
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute(_SCHEMA)
+        self._connection.commit()
+        self._total_bytes: int | None = None # Computed when the first entry is added
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the cached response or None if no entry exists for `key`.
+
+        Parameters
+        ----------
+        key : str
+            The key returned by `make_key`.
+        """
+        row = self._connection.execute("SELECT response, latency FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self._connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._connection.commit()
+        self.hits += 1
+        self.saved_seconds += row[1]
+        return row[0]
+
+    def put(self, key: str, response: str, latency: float) -> None:
+        """
+        Stores `response` for `key` and evicts old entries if necessary.
+
+        Parameters
+        ----------
+        key : str
+            The key returned by `make_key`.
+        response : str
+            The raw response of the LLM.
+        latency : float
+            The time in seconds that the request took.
+        """
+        size = len(response.encode("utf-8", "surrogatepass"))
+        if self._total_bytes is None:
+            self._total_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        old_size = self._connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO responses (key, response, latency, size, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, response, latency, size, time.time())
+        )
+        self._connection.commit()
+        self._total_bytes += size - (old_size[0] if old_size is not None else 0)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def summary(self) -> str:
+        return (f"LLM cache: {self.hits} hits, {self.misses} misses, "
+                f"{self.saved_seconds:.1f} s of LLM requests saved")
+
+    @staticmethod
+    def make_key(model: str, base_url: str, system_prompt: str, user_prompt: str, seed: int) -> str:
+        """Returns the key for the response to a request with the given parameters."""
+        h = sha256()
+        for part in (model, base_url, system_prompt, user_prompt, repr(seed)):
+            h.update(part.encode("utf-8", "surrogatepass"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _evict(self) -> None:
+        # Delete least recently used entries until at most 3/4 of max_bytes are used
+        rows = self._connection.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        total = sum(size for _, size in rows)
+        target = self.max_bytes * 3 // 4
+        evicted: list[tuple[str]] = []
+        for key, size in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._connection.commit()
+        self._total_bytes = total
@@ -1,15 +1,17 @@
-from typing import override
+from typing import Sequence, override
 
 from ..comment_style import CommentStyle
-from ..conversion import Conversion, ConvResult, ConvUnsupported
+from ..conversion import BatchConversion, ConvResult, ConvUnsupported
 from ..extractor import Comment
 from ..extractors.c_type import CType
 from ..extractors.cxx_type import CXXType
 from .llm import LLM
+from .llm_cache import LLMResponseCache
 from .llm_conversion_helper import LLMConversionHelper
+from .prompt_budget import PromptBudget
 
 
-class LLMConversion(Conversion[CType | CXXType]):
+class LLMConversion(BatchConversion[CType | CXXType]):
     """Converts comments on C or C++ functions with a LLM."""
 
     _CXX_INCLUDE_TYPES: set[CXXType] = {
@@ -28,6 +30,10 @@ class LLMConversion(Conversion[CType | CXXType]):
             c_user_prompt_template: str = "{}",
             cxx_system_prompt: str = DEFAULT_CXX_SYSTEM_PROMPT,
             cxx_user_prompt_template: str = "{}",
+            cache: LLMResponseCache | None = None,
+            batch_size: int = 1,
+            budget: PromptBudget | None = None,
+            stream: bool = False,
         ) -> None:
         """
         Creates a new object.
@@ -36,8 +42,19 @@ class LLMConversion(Conversion[CType | CXXType]):
         ----------
         llm : LLM
             The LLM.
+        cache : LLMResponseCache | None, optional
+            The cache for the responses of `llm`, by default None (no cache).
+        batch_size : int, optional
+            The maximum number of comments of a file that are passed to the
+            LLM in one request by `calc_conversions`, by default 1.
+        budget : PromptBudget | None, optional
+            Limits the size of the user prompts, by default None (no limit).
+        stream : bool, optional
+            If True, a response is closed as soon as its first comment is
+            complete, by default False. Batch responses are read completely.
         """
-        self.llm_helper = LLMConversionHelper(llm)
+        self.llm_helper = LLMConversionHelper(llm, cache, budget, stream)
+        self.batch_size = batch_size
         self.c_system_prompt = c_system_prompt
         self.c_user_prompt_template = c_user_prompt_template
         self.cxx_system_prompt = cxx_system_prompt
@@ -77,3 +94,73 @@ class LLMConversion(Conversion[CType | CXXType]):
             )
         else:
             return ConvUnsupported("Comment is not attached to a C function")
+
+    @override
+    async def calc_conversion_async(self, comment: Comment[CType | CXXType]) -> ConvResult:
+        """Like `calc_conversion`, but the LLM is called with `LLM.call_llm_async`."""
+        if comment.symbol_type is CType.FUNCTION:
+            return await self.llm_helper.calc_conversion_with_llm_async(
+                comment,
+                self.c_system_prompt,
+                CommentStyle.JAVADOC_BLOCK,
+                self.c_user_prompt_template
+            )
+        elif comment.symbol_type in self.__class__._CXX_INCLUDE_TYPES:
+            return await self.llm_helper.calc_conversion_with_llm_async(
+                comment,
+                self.cxx_system_prompt,
+                CommentStyle.JAVADOC_BLOCK,
+                self.cxx_user_prompt_template
+            )
+        else:
+            return ConvUnsupported("Comment is not attached to a C function")
+
+    @override
+    def calc_conversions(self, comments: Sequence[Comment[CType | CXXType]]) -> list[ConvResult]:
+        """
+        Like `calc_conversion`, but up to `batch_size` comments are passed to the LLM in one request.
+
+        See: `LLMConversionHelper.calc_conversions_with_llm`.
+        """
+        results: list[ConvResult] = [ConvUnsupported("Comment is not attached to a C function")] * len(comments)
+        for indices, system_prompt, user_prompt_template in self._group_comments(comments):
+            group_results = self.llm_helper.calc_conversions_with_llm(
+                [comments[i] for i in indices],
+                system_prompt,
+                CommentStyle.JAVADOC_BLOCK,
+                user_prompt_template,
+                self.batch_size
+            )
+            for i, result in zip(indices, group_results):
+                results[i] = result
+        return results
+
+    @override
+    async def calc_conversions_async(self, comments: Sequence[Comment[CType | CXXType]]) -> list[ConvResult]:
+        """Like `calc_conversions`, but the LLM is called with `LLM.call_llm_async`."""
+        results: list[ConvResult] = [ConvUnsupported("Comment is not attached to a C function")] * len(comments)
+        for indices, system_prompt, user_prompt_template in self._group_comments(comments):
+            group_results = await self.llm_helper.calc_conversions_with_llm_async(
+                [comments[i] for i in indices],
+                system_prompt,
+                CommentStyle.JAVADOC_BLOCK,
+                user_prompt_template,
+                self.batch_size
+            )
+            for i, result in zip(indices, group_results):
+                results[i] = result
+        return results
+
+    def _group_comments(self, comments: Sequence[Comment[CType | CXXType]]) -> list[tuple[list[int], str, str]]:
+        # Indices of the supported comments with the prompts they are passed with
+        c_indices: list[int] = []
+        cxx_indices: list[int] = []
+        for i, comment in enumerate(comments):
+            if comment.symbol_type is CType.FUNCTION:
+                c_indices.append(i)
+            elif comment.symbol_type in self.__class__._CXX_INCLUDE_TYPES:
+                cxx_indices.append(i)
+        return [
+            (c_indices, self.c_system_prompt, self.c_user_prompt_template),
+            (cxx_indices, self.cxx_system_prompt, self.cxx_user_prompt_template),
+        ]
@@ -1,6 +1,11 @@
+import re
+from time import perf_counter
+from typing import Sequence
+
 
 from ..command_style import CommandStyle
-from ..comment_parsing import find_comments_connected
+from ..comment_parsing import (find_comments_connected,
+                               find_comments_connected_with_ranges)
 from ..comment_style import CommentStyle
 from ..comment_styler import CommentStyler
 from ..conversion import (ConvEmpty, ConvError, ConvPresent, ConvResult,
@@ -9,12 +14,27 @@ from ..extractor import Comment
 from ..extractors.c_type import CType
 from ..extractors.cxx_type import CXXType
 from .llm import LLM
+from .llm_cache import LLMResponseCache
+from .prompt_budget import PromptBudget, estimate_tokens
 
 
 class LLMConversionHelper:
     """Helper to calculates new comments with a LLM."""
 
-    def __init__(self, llm: LLM) -> None:
+    _BATCH_INSTRUCTION = (
+        "Convert each of the following {} comments separately. For every comment, answer with its header line "
+        "\"=== COMMENT <number> ===\" followed by the converted comment."
+    )
+    _BATCH_HEADER = "=== COMMENT {} ==="
+    _BATCH_HEADER_REGEX: re.Pattern[str] = re.compile(r"^[ \t*#]*=+[ \t]*COMMENT[ \t]+(\d+)[ \t]*=+[ \t*]*$", re.MULTILINE)
+
+    def __init__(
+            self,
+            llm: LLM,
+            cache: LLMResponseCache | None = None,
+            budget: PromptBudget | None = None,
+            stream: bool = False
+        ) -> None:
         """
         Creates a new object.
 
@@ -22,8 +42,18 @@ class LLMConversionHelper:
         ----------
         llm : LLM
             The LLM to use.
+        cache : LLMResponseCache | None, optional
+            The cache for the responses of `llm`, by default None (no cache).
+        budget : PromptBudget | None, optional
+            Limits the size of the user prompts, by default None (no limit).
+        stream : bool, optional
+            If True, the responses to single comments are streamed and closed
+            as soon as the first comment in the output is complete, by default False.
         """
         self.llm = llm
+        self.cache = cache
+        self.budget = budget
+        self.stream = stream
 
     def calc_conversion_with_llm(
             self,
@@ -37,7 +67,8 @@ class LLMConversionHelper:
 
         Steps:
         1. `comment_text` in `comment` will be parsed and formatted by `CommandStyler`.
-        2. Insert the formatted comment in {} of `prompt`.
+        2. Insert the formatted comment in {} of `prompt`. If `budget` is set,
+           the comment and the symbol text are shortened to fit it.
         3. Pass `system_prompt` with `prompt` to the LLM.
         4. Extract the first found `/*...*/` part in the output of the LLM.
         5. Replace `@command with` `\\command` in the new comment.
@@ -63,24 +94,231 @@ class LLMConversionHelper:
             A ConvUnsupported object if `comment` cannot be parsed in Step 1,
             or if no `/*...*/` is found the output of the LLM.
         """
-        # Format the comment text and append the symbol text
-        match CommentStyler.parse_comment(comment.comment_text):
+        user_prompt = self._get_user_prompt(comment, user_prompt_template)
+        if not isinstance(user_prompt, str):
+            return user_prompt
+
+        # Call LLM
+        llm_output = self._call_llm(system_prompt, user_prompt)
+
+        return self._convert_llm_output(comment, llm_output, output_style)
+
+    async def calc_conversion_with_llm_async(
+            self,
+            comment: Comment[CType | CXXType],
+            system_prompt: str,
+            output_style: CommentStyle,
+            user_prompt_template: str = "{}"
+        ) -> ConvResult:
+        """
+        Like `calc_conversion_with_llm`, but calls the LLM with `LLM.call_llm_async`,
+        so that several comments can be converted concurrently.
+        """
+        user_prompt = self._get_user_prompt(comment, user_prompt_template)
+        if not isinstance(user_prompt, str):
+            return user_prompt
+
+        # Call LLM
+        llm_output = await self._call_llm_async(system_prompt, user_prompt)
+
+        return self._convert_llm_output(comment, llm_output, output_style)
+
+    def calc_conversions_with_llm(
+            self,
+            comments: Sequence[Comment[CType | CXXType]],
+            system_prompt: str,
+            output_style: CommentStyle,
+            user_prompt_template: str = "{}",
+            batch_size: int = 8
+        ) -> list[ConvResult]:
+        """
+        Like `calc_conversion_with_llm`, but up to `batch_size` comments are
+        passed to the LLM in one request.
+
+        Each comment is placed in the user prompt after an indexed header line
+        and the LLM is asked to answer with the same header lines. Comments
+        whose section is missing in the output or cannot be converted are
+        passed to the LLM again in single requests.
+
+        Returns
+        -------
+        list[ConvResult]
+            The results in the order of `comments`. If a request fails, its
+            comments have a `ConvError` result.
+        """
+        results, batches = self._prepare_batches(comments, user_prompt_template, batch_size)
+        for batch in batches:
+            batch_results: list[tuple[int, ConvResult | None]] = [(i, None) for i, _ in batch]
+            if len(batch) > 1:
+                try:
+                    llm_output = self._call_llm(system_prompt, self._get_batch_prompt(batch), single=False)
+                    batch_results = self._convert_batch_output(comments, batch, llm_output, output_style)
+                except Exception as e:
+                    batch_results = [(i, self._get_error_result(e)) for i, _ in batch]
+            user_prompts = dict(batch)
+            for i, result in batch_results:
+                if result is None: # Single request
+                    try:
+                        llm_output = self._call_llm(system_prompt, user_prompts[i])
+                        result = self._convert_llm_output(comments[i], llm_output, output_style)
+                    except Exception as e:
+                        result = self._get_error_result(e)
+                results[i] = result
+        return results # type: ignore
+
+    async def calc_conversions_with_llm_async(
+            self,
+            comments: Sequence[Comment[CType | CXXType]],
+            system_prompt: str,
+            output_style: CommentStyle,
+            user_prompt_template: str = "{}",
+            batch_size: int = 8
+        ) -> list[ConvResult]:
+        """
+        Like `calc_conversions_with_llm`, but calls the LLM with `LLM.call_llm_async`.
+
+        The requests are sent one after another.
+        """
+        results, batches = self._prepare_batches(comments, user_prompt_template, batch_size)
+        for batch in batches:
+            batch_results: list[tuple[int, ConvResult | None]] = [(i, None) for i, _ in batch]
+            if len(batch) > 1:
+                try:
+                    llm_output = await self._call_llm_async(system_prompt, self._get_batch_prompt(batch), single=False)
+                    batch_results = self._convert_batch_output(comments, batch, llm_output, output_style)
+                except Exception as e:
+                    batch_results = [(i, self._get_error_result(e)) for i, _ in batch]
+            user_prompts = dict(batch)
+            for i, result in batch_results:
+                if result is None: # Single request
+                    try:
+                        llm_output = await self._call_llm_async(system_prompt, user_prompts[i])
+                        result = self._convert_llm_output(comments[i], llm_output, output_style)
+                    except Exception as e:
+                        result = self._get_error_result(e)
+                results[i] = result
+        return results # type: ignore
+
+    def _prepare_batches(
+            self,
+            comments: Sequence[Comment[CType | CXXType]],
+            user_prompt_template: str,
+            batch_size: int
+        ) -> tuple[list[ConvResult | None], list[list[tuple[int, str]]]]:
+        # Returns the results of comments that are not passed to the LLM and
+        # batches of (index in comments, user prompt) for the other comments.
+        # With a budget, a batch is closed before its prompt would exceed max_prompt_tokens.
+        results: list[ConvResult | None] = []
+        batches: list[list[tuple[int, str]]] = []
+        instruction_tokens = estimate_tokens(self._BATCH_INSTRUCTION)
+        batch_tokens = 0
+        for i, comment in enumerate(comments):
+            user_prompt = self._get_user_prompt(comment, user_prompt_template)
+            if isinstance(user_prompt, str):
+                results.append(None)
+                section_tokens = estimate_tokens(self._BATCH_HEADER) + estimate_tokens(user_prompt)
+                if (not batches or len(batches[-1]) >= batch_size
+                        or self.budget is not None and batch_tokens + section_tokens > self.budget.max_prompt_tokens):
+                    batches.append([])
+                    batch_tokens = instruction_tokens
+                batches[-1].append((i, user_prompt))
+                batch_tokens += section_tokens
+            else:
+                results.append(user_prompt)
+        return results, batches
+
+    @classmethod
+    def _get_error_result(cls, error: Exception) -> ConvResult:
+        return ConvError(f"An error occured during the conversion: {error}")
+
+    @classmethod
+    def _get_batch_prompt(cls, batch: list[tuple[int, str]]) -> str:
+        sections = (f"{cls._BATCH_HEADER.format(number)}\n{user_prompt}"
+                    for number, (_, user_prompt) in enumerate(batch, start=1))
+        return cls._BATCH_INSTRUCTION.format(len(batch)) + "\n\n" + "\n".join(sections)
+
+    @classmethod
+    def _convert_batch_output(
+            cls,
+            comments: Sequence[Comment[CType | CXXType]],
+            batch: list[tuple[int, str]],
+            llm_output: str,
+            output_style: CommentStyle
+        ) -> list[tuple[int, ConvResult | None]]:
+        # Returns the results by index in comments, None if a section is missing or cannot be converted
+        headers = list(cls._BATCH_HEADER_REGEX.finditer(llm_output))
+        sections: dict[int, str] = {}
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            end = next_header.start() if next_header is not None else len(llm_output)
+            sections.setdefault(int(header[1]), llm_output[header.end():end])
+
+        results: list[tuple[int, ConvResult | None]] = []
+        for number, (i, _) in enumerate(batch, start=1):
+            result: ConvResult | None = None
+            section = sections.get(number)
+            if section is not None:
+                try:
+                    result = cls._convert_llm_output(comments[i], section, output_style)
+                except RuntimeError:
+                    pass
+                if isinstance(result, ConvError):
+                    result = None
+            results.append((i, result))
+        return results
+
+    def _call_llm(self, system_prompt: str, user_prompt: str, single: bool = True) -> str:
+        # single is False for batch prompts, whose output is needed up to the last section
+        is_complete = _CommentCompletion() if self.stream and single else None
+        if self.cache is None:
+            return self.llm.call_llm(system_prompt, user_prompt, is_complete)
+        key = self._cache_key(system_prompt, user_prompt)
+        llm_output = self.cache.get(key)
+        if llm_output is None:
+            start = perf_counter()
+            llm_output = self.llm.call_llm(system_prompt, user_prompt, is_complete)
+            self.cache.put(key, llm_output, perf_counter() - start)
+        return llm_output
+
+    async def _call_llm_async(self, system_prompt: str, user_prompt: str, single: bool = True) -> str:
+        is_complete = _CommentCompletion() if self.stream and single else None
+        if self.cache is None:
+            return await self.llm.call_llm_async(system_prompt, user_prompt, is_complete)
+        key = self._cache_key(system_prompt, user_prompt)
+        llm_output = self.cache.get(key)
+        if llm_output is None:
+            start = perf_counter()
+            llm_output = await self.llm.call_llm_async(system_prompt, user_prompt, is_complete)
+            self.cache.put(key, llm_output, perf_counter() - start)
+        return llm_output
+
+    def _cache_key(self, system_prompt: str, user_prompt: str) -> str:
+        return LLMResponseCache.make_key(self.llm.model, self.llm.base_url, system_prompt, user_prompt, self.llm.seed)
+
+    def _get_user_prompt(self, comment: Comment[CType | CXXType], user_prompt_template: str) -> str | ConvResult:
+        # Steps 1 and 2, or the result if the LLM is not called
+        match comment.parsed:
             case None:
                 return ConvUnsupported("Comment cannot be parsed")
             case CommentStyler(_, style) if style.is_doxygen_style():
                 return ConvEmpty("Comment is already a doxygen style comment")
             # Format the comment text and append the symbol text
+            case CommentStyler(content, style) if self.budget is not None:
+                comment_formatted = CommentStyler(self.budget.fit_comment(content), style).construct_comment()
             case CommentStyler() as input_styler:
                 comment_formatted = input_styler.construct_comment()
 
-        prompt_part = comment_formatted + "\n" + comment.symbol_text
-        user_prompt = user_prompt_template.format(prompt_part)
-
-        # Call LLM
-        llm_output = self.llm.call_llm(system_prompt, user_prompt)
+        symbol_text = comment.symbol_text
+        if self.budget is not None:
+            used_tokens = estimate_tokens(user_prompt_template) + estimate_tokens(comment_formatted)
+            symbol_text = self.budget.fit_symbol(symbol_text, self.budget.max_prompt_tokens - used_tokens)
+        prompt_part = comment_formatted + "\n" + symbol_text
+        return user_prompt_template.format(prompt_part)
 
+    @classmethod
+    def _convert_llm_output(cls, comment: Comment[CType | CXXType], llm_output: str, output_style: CommentStyle) -> ConvResult:
+        # Steps 4 to 7
         # Extract the comment part from the output
-        new_comment = self._extract_comment(llm_output)
+        new_comment = cls._extract_comment(llm_output)
         if new_comment is None:
             return ConvError(f"No comment found in output of LLM: {llm_output}")
         output_styler = CommentStyler.parse_comment(new_comment)
@@ -102,9 +340,47 @@ class LLMConversionHelper:
 
     @classmethod
     def _extract_comment(cls, result: str) -> str | None:
-        found_comments = tuple(find_comments_connected(result))
+        found_comments = tuple(find_comments_connected(result, skip_literals=False)) # The output is prose
         if not found_comments:
             return None
         range, _ = found_comments[0]
         return result[range.start:range.end]
-    
\ No newline at end of file
+    
+
+
+class _CommentCompletion:
+    """
+    Returns True for a streamed LLM output if the first comment in it cannot
+    change when more output follows, i.e. it is followed by a character that
+    is neither a whitespace nor the start of another comment.
+
+    The output is only scanned again after the end of a comment ("*/" or a
+    newline) arrived, and only from the start of the last comment piece
+    found so far, so a response is not rescanned for every chunk.
+    """
+
+    _FOLLOWING_TEXT_REGEX: re.Pattern[str] = re.compile(r"\s*(\S)")
+
+    def __init__(self) -> None:
+        self._checked = 0 # Length of the output at the last call
+        self._closed = False # True if the first comment ended and only whitespace followed at the last scan
+        self._start = 0 # Index to scan from, no comment starts before it
+
+    def __call__(self, llm_output: str) -> bool:
+        new_text = llm_output[max(0, self._checked - 1):] # Including the last character for a split "*/"
+        self._checked = len(llm_output)
+        if not self._closed and "*/" not in new_text and "\n" not in new_text:
+            return False
+        self._closed = False
+        for ranges, _ in find_comments_connected_with_ranges(llm_output, self._start, skip_literals=False):
+            # Only the last piece can be connected with the following output
+            last_piece = ranges[-1]
+            self._start = last_piece.start
+            following = self._FOLLOWING_TEXT_REGEX.match(llm_output, last_piece.end)
+            if following is not None:
+                return following[1] != "/"
+            piece = llm_output[last_piece.start:last_piece.end]
+            self._closed = last_piece.end < len(llm_output) or len(piece) >= 4 and piece.startswith("/*") and piece.endswith("*/")
+            return False
+        self._start = max(self._start, len(llm_output) - 1) # The last character may start a comment
+        return False
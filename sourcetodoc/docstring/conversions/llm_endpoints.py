@@ -0,0 +1,127 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Sequence
+
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, OpenAI
+
+
+@dataclass
+class LLMEndpoint:
+    """An inference server of a `LLMEndpointPool` and its statistics."""
+    client: OpenAI
+    async_client: AsyncOpenAI | None = None
+    weight: float = 1.0 # Share of the requests relative to the other endpoints
+    requests: int = field(default=0, init=False) # Including failed requests
+    errors: int = field(default=0, init=False)
+    ejections: int = field(default=0, init=False)
+    outstanding: int = field(default=0, init=False)
+    total_seconds: float = field(default=0.0, init=False) # Of the successful requests
+    consecutive_failures: int = field(default=0, init=False)
+    ejection_streak: int = field(default=0, init=False) # Ejections without a successful request in between
+    ejected_until: float | None = field(default=None, init=False)
+
+    @property
+    def base_url(self) -> str:
+        return str(self.client.base_url)
+
+    def summary(self) -> str:
+        successful = self.requests - self.errors - self.outstanding
+        mean_latency = self.total_seconds / successful if successful > 0 else 0.0
+        return (f"  {self.base_url}: {self.requests} requests, {self.errors} errors, "
+                f"{mean_latency:.3f} s mean latency, ejected {self.ejections} times")
+
+
+class LLMEndpointPool:
+    """
+    Distributes the requests to a LLM over several OpenAI-compatible endpoints.
+
+    A request is sent to the endpoint with the fewest outstanding requests
+    relative to its weight. An endpoint whose last `max_failures` requests
+    failed with a connection error or a status code of 5xx is ejected for
+    `eject_seconds` (doubled for every further ejection in a row, at most
+    `max_eject_seconds`). After that, its next request is the health check:
+    If it fails, the endpoint is ejected again, otherwise it gets its share of
+    the requests again. If all endpoints are ejected, the endpoint that
+    returns first is used.
+    """
+
+    def __init__(
+            self,
+            endpoints: Sequence[LLMEndpoint],
+            max_failures: int = 3,
+            eject_seconds: float = 30.0,
+            max_eject_seconds: float = 600.0,
+            clock: Callable[[], float] = time.monotonic
+        ) -> None:
+        """
+        Creates a new object.
+
+        Raises
+        ------
+        ValueError
+            If `endpoints` is empty, a weight is not positive or `max_failures` is less than 1.
+        """
+        if not endpoints:
+            raise ValueError("At least one LLM endpoint is required")
+        for endpoint in endpoints:
+            if endpoint.weight <= 0:
+                raise ValueError(f"The weight of {endpoint.base_url} must be positive, got {endpoint.weight}")
+        if max_failures < 1:
+            raise ValueError(f"max_failures must be at least 1, got {max_failures}")
+        self.endpoints = list(endpoints)
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.clock = clock
+        self._lock = threading.Lock() # LLM.call_llm may be called from several threads
+
+    def acquire(self) -> LLMEndpoint:
+        """Returns the endpoint for the next request and counts the request as outstanding."""
+        with self._lock:
+            now = self.clock()
+            # An endpoint whose ejection ended gets one request at a time until it succeeds
+            healthy = [e for e in self.endpoints if e.ejected_until is None or e.ejected_until <= now and e.outstanding == 0]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: (e.outstanding + 1) / e.weight)
+            else:
+                endpoint = min(self.endpoints, key=lambda e: e.ejected_until or 0.0)
+            endpoint.requests += 1
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint: LLMEndpoint, seconds: float, error: BaseException | None = None) -> None:
+        """
+        Counts the request to `endpoint` as finished after `seconds`.
+        If `error` is an unhealthy response (see `is_unhealthy`), the
+        endpoint may be ejected.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.total_seconds += seconds
+                endpoint.consecutive_failures = 0
+                if endpoint.ejected_until is not None and endpoint.ejected_until <= self.clock():
+                    endpoint.ejected_until = None # The health check succeeded
+                    endpoint.ejection_streak = 0
+                return
+            endpoint.errors += 1
+            if not self.is_unhealthy(error):
+                return
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.max_failures:
+                eject_seconds = min(self.max_eject_seconds, self.eject_seconds * 2 ** endpoint.ejection_streak)
+                endpoint.ejected_until = self.clock() + eject_seconds
+                endpoint.ejections += 1
+                endpoint.ejection_streak += 1
+                endpoint.consecutive_failures = self.max_failures - 1 # The health check must succeed
+
+    def summary(self) -> str:
+        return "\n".join(["LLM endpoints:"] + [endpoint.summary() for endpoint in self.endpoints])
+
+    @classmethod
+    def is_unhealthy(cls, error: BaseException) -> bool:
+        """Returns True if `error` indicates a failing endpoint (e.g. not a rate limit or an invalid request)."""
+        if isinstance(error, APIStatusError):
+            return error.status_code >= 500
+        return isinstance(error, (APIConnectionError, OSError))
@@ -0,0 +1,233 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from random import Random
+from typing import Any, Awaitable, Callable
+
+from openai import APIConnectionError, APIError, APIStatusError
+
+# Status codes of responses that are retried, in addition to 5xx
+_RETRY_STATUS_CODES: frozenset[int] = frozenset((408, 409, 429))
+
+
+class TokenBucket:
+    """
+    A token bucket that is refilled with `per_minute` tokens per minute and
+    holds at most `per_minute` tokens.
+
+    A reservation takes its tokens immediately, even if the bucket does not
+    contain enough tokens. The caller waits until the debt is refilled, so
+    reservations are served in order at the configured rate.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        if per_minute <= 0:
+            raise ValueError(f"per_minute must be positive, got {per_minute}")
+        self.per_minute = per_minute
+        self._clock = clock
+        self._tokens = per_minute
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` tokens and returns the number of seconds to wait before using them."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.per_minute, self._tokens + (now - self._updated) * self.per_minute / 60)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens * 60 / self.per_minute)
+
+
+@dataclass
+class ThrottleStats:
+    """Statistics of the requests of an `LLMRateLimiter`."""
+    requests: int = 0 # Including retries
+    retries: int = 0
+    rate_limited: int = 0 # Responses with status code 429
+    failed: int = 0 # Requests that failed after the last retry
+    tokens: int = 0 # Used tokens reported by the API (estimated if not reported)
+    waited_seconds: float = 0.0 # Waiting for the limits
+    backoff_seconds: float = 0.0 # Waiting before retries
+
+    def summary(self) -> str:
+        return (f"LLM requests: {self.requests} ({self.retries} retries, {self.rate_limited} rate limited, "
+                f"{self.failed} failed), {self.tokens} tokens, {self.waited_seconds:.1f} s waited for rate limits, "
+                f"{self.backoff_seconds:.1f} s waited before retries")
+
+
+class LLMRateLimiter:
+    """
+    Limits the requests to a LLM to a number of requests and tokens per
+    minute and retries failed requests with exponential backoff.
+
+    Requests that fail with a connection error, a timeout, a status code
+    of 408, 409, 429 or 5xx are retried after a random delay between 0 and
+    `base_delay * 2**attempt` (at most `max_delay`), but not before the
+    time requested by the Retry-After header of the response. If the
+    Retry-After header requests more than `max_delay`, the request is not
+    retried.
+    """
+
+    def __init__(
+            self,
+            requests_per_minute: float | None = None,
+            tokens_per_minute: float | None = None,
+            max_retries: int = 5,
+            base_delay: float = 1.0,
+            max_delay: float = 60.0,
+            clock: Callable[[], float] = time.monotonic,
+            rng: Random | None = None
+        ) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        requests_per_minute : float | None, optional
+            The maximum number of requests per minute, by default None (no limit).
+        tokens_per_minute : float | None, optional
+            The maximum number of tokens (prompt and completion) per minute,
+            by default None (no limit).
+        max_retries : int, optional
+            The maximum number of retries of a request, by default 5.
+        base_delay : float, optional
+            The maximum delay in seconds before the first retry, by default 1.0.
+        max_delay : float, optional
+            The maximum delay in seconds before a retry, by default 60.0.
+            Requests whose response asks for a longer delay (with a
+            Retry-After header) fail without a retry.
+
+        Raises
+        ------
+        ValueError
+            If a limit is not positive.
+        """
+        self.request_bucket = TokenBucket(requests_per_minute, clock) if requests_per_minute is not None else None
+        self.token_bucket = TokenBucket(tokens_per_minute, clock) if tokens_per_minute is not None else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = ThrottleStats()
+        self._rng = rng if rng is not None else Random()
+
+    def call[R](self, request: Callable[[], R], estimated_tokens: int) -> R:
+        """
+        Calls `request` when the limits allow it and retries it on transient errors.
+
+        Parameters
+        ----------
+        request : Callable[[], R]
+            Sends the request, e.g. `client.chat.completions.create`.
+        estimated_tokens : int
+            The estimated number of tokens of the request. It is corrected
+            with the usage of the response.
+
+        Raises
+        ------
+        APIError
+            If the request fails after the last retry or with an error that is not retried.
+        """
+        attempt = 0
+        while True:
+            time.sleep(self._reserve(estimated_tokens))
+            try:
+                response = request()
+            except APIError as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self._record_usage(estimated_tokens, response)
+            return response
+
+    async def call_async[R](self, request: Callable[[], Awaitable[R]], estimated_tokens: int) -> R:
+        """Like `call`, but without blocking the event loop."""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve(estimated_tokens))
+            try:
+                response = await request()
+            except APIError as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self._record_usage(estimated_tokens, response)
+            return response
+
+    def record_completion(self, tokens: int) -> None:
+        """
+        Adds the `tokens` of a streamed completion, whose response does not
+        report its usage, to the statistics and the token limit.
+        """
+        self.stats.tokens += tokens
+        if self.token_bucket is not None:
+            self.token_bucket.reserve(tokens)
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        # Returns the seconds to wait before the request is sent
+        self.stats.requests += 1
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = self.request_bucket.reserve(1)
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        self.stats.waited_seconds += wait
+        return wait
+
+    def _record_usage(self, estimated_tokens: int, response: Any) -> None:
+        used_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if not isinstance(used_tokens, int):
+            used_tokens = estimated_tokens
+        self.stats.tokens += used_tokens
+        if self.token_bucket is not None and used_tokens != estimated_tokens:
+            self.token_bucket.reserve(used_tokens - estimated_tokens) # Completion tokens are known only now
+
+    def _retry_delay(self, attempt: int, error: APIError) -> float | None:
+        # Returns the seconds to wait before the next attempt or None if the request is not retried
+        status_code = error.status_code if isinstance(error, APIStatusError) else None
+        if status_code == 429:
+            self.stats.rate_limited += 1
+        retryable = (isinstance(error, APIConnectionError)
+                     or status_code is not None and (status_code in _RETRY_STATUS_CODES or status_code >= 500))
+        retry_after = _get_retry_after(error)
+        # A longer Retry-After than max_delay is not shortened, because the server would reject the retry anyway
+        if not retryable or attempt >= self.max_retries or retry_after is not None and retry_after > self.max_delay:
+            self.stats.failed += 1
+            return None
+        delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        self.stats.retries += 1
+        self.stats.backoff_seconds += delay
+        return delay
+
+
+def _get_retry_after(error: APIError) -> float | None:
+    # The delay in seconds requested by the "retry-after-ms" or "retry-after" header
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        return float(headers["retry-after-ms"]) / 1000
+    except (KeyError, ValueError):
+        pass
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(retry_after).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,128 @@
+import re
+
+# Words are split into tokens of about 4 characters, other non-space characters are single tokens
+_TOKEN_REGEX = re.compile(r"\w+|[^\w\s]")
+
+COMMENT_MARKER: str = "[... rest of the comment omitted ...]"
+BODY_MARKER: str = "{ ... }"
+SYMBOL_MARKER: str = "..."
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Returns an estimate of the number of tokens of `text` for common LLM tokenizers.
+
+    Every word counts one token per 4 characters and every other non-space
+    character counts one token, so code with many operators is not underestimated.
+    """
+    return sum(_count_tokens(m) for m in _TOKEN_REGEX.findall(text))
+
+
+class PromptBudget:
+    """
+    Limits the number of tokens of the prompts for a LLM.
+
+    The content of a comment is cut to `max_comment_tokens` and marked with
+    `COMMENT_MARKER`. The symbol text after the comment is reduced to the
+    signature (the text before the body, followed by `BODY_MARKER`) if the
+    prompt would exceed `max_prompt_tokens`, and cut (followed by
+    `SYMBOL_MARKER`) if the signature is still too long.
+    """
+
+    def __init__(self, max_prompt_tokens: int = 2048, max_comment_tokens: int = 1024) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        max_prompt_tokens : int, optional
+            The maximum estimated number of tokens of a user prompt, by default 2048.
+        max_comment_tokens : int, optional
+            The maximum estimated number of tokens of the content of a comment, by default 1024.
+
+        Raises
+        ------
+        ValueError
+            If a maximum is not positive.
+        """
+        if max_prompt_tokens <= 0 or max_comment_tokens <= 0:
+            raise ValueError(f"Token budgets must be positive, got {max_prompt_tokens} and {max_comment_tokens}")
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_comment_tokens = max_comment_tokens
+        self.truncated_comments = 0
+        self.trimmed_symbols = 0
+        self.tokens_saved = 0
+
+    def fit_comment(self, content: str) -> str:
+        """Returns `content` or its first lines followed by `COMMENT_MARKER` if it exceeds `max_comment_tokens`."""
+        tokens = estimate_tokens(content)
+        if tokens <= self.max_comment_tokens:
+            return content
+        limit = self.max_comment_tokens - estimate_tokens(COMMENT_MARKER)
+        kept: list[str] = []
+        kept_tokens = 0
+        for line in content.splitlines():
+            line_tokens = estimate_tokens(line)
+            if kept_tokens + line_tokens > limit:
+                if not kept: # A single long line
+                    kept.append(_cut(line, limit))
+                break
+            kept.append(line)
+            kept_tokens += line_tokens
+        kept.append(COMMENT_MARKER)
+        result = "\n".join(kept)
+        self.truncated_comments += 1
+        self.tokens_saved += tokens - estimate_tokens(result)
+        return result
+
+    def fit_symbol(self, symbol_text: str, available_tokens: int) -> str:
+        """
+        Returns `symbol_text`, its signature or a cut signature, so that it
+        does not exceed `available_tokens` (the tokens of the prompt that
+        are not used by the rest of the prompt) if possible.
+        """
+        tokens = estimate_tokens(symbol_text)
+        if tokens <= available_tokens:
+            return symbol_text
+        result = symbol_text
+        body_start = _find_body(symbol_text)
+        if body_start is not None:
+            result = symbol_text[:body_start].rstrip() + " " + BODY_MARKER
+        if estimate_tokens(result) > available_tokens:
+            result = _cut(result, max(available_tokens - estimate_tokens(SYMBOL_MARKER), 1)).rstrip() + " " + SYMBOL_MARKER
+        self.trimmed_symbols += 1
+        self.tokens_saved += tokens - estimate_tokens(result)
+        return result
+
+    def summary(self) -> str:
+        return (f"LLM prompt budget: {self.truncated_comments} comments truncated, {self.trimmed_symbols} symbols trimmed, "
+                f"about {self.tokens_saved} tokens saved")
+
+
+def _find_body(symbol_text: str) -> int | None:
+    # Returns the index of the "{" that starts the body, i.e. the first "{" outside of parentheses
+    depth = 0
+    for m in re.finditer(r"[(){]", symbol_text):
+        match m[0]:
+            case "(":
+                depth += 1
+            case ")":
+                depth = max(depth - 1, 0)
+            case _ if depth == 0:
+                return m.start()
+    return None
+
+
+def _cut(text: str, max_tokens: int) -> str:
+    # Returns the longest prefix of text ending at a token boundary with at most max_tokens tokens
+    tokens = 0
+    for m in _TOKEN_REGEX.finditer(text):
+        tokens += _count_tokens(m[0])
+        if tokens > max_tokens:
+            return text[:m.start()]
+    return text
+
+
+def _count_tokens(match: str) -> int:
+    # match is a word or a single other character
+    return -(-len(match) // 4) if match[0].isalnum() or match[0] == "_" else 1
@@ -1,15 +1,28 @@
+import asyncio
+import mmap
+import os
+import shutil
+import tempfile
 from pathlib import Path
 from re import Pattern, compile
-from typing import Any, ClassVar
+from typing import Any, ClassVar, Iterable, Mapping, Sequence
 
-from .conversion import ConvEmpty, ConvError, ConvUnsupported, Conversion, ConvPresent, ConvResult
+from .checkpoint import ConversionCheckpoint
+from .conversion import (AsyncConversion, BatchConversion, ConvEmpty,
+                         ConvError, ConvPresent, ConvResult, ConvUnsupported,
+                         Conversion)
+from .document import Document
 from .extractor import Comment, Extractor
 from .extractors.c_libclang_extractor import CLibclangExtractor
 from .extractors.c_type import CType
 from .extractors.cxx_libclang_extractor import CXXLibclangExtractor
 from .extractors.cxx_type import CXXType
+from .extractors.doc_coverage import DocCoverage, DocCoverageReport
+from .extractors.libclang_stats import LibclangStats, LibclangStatsReport
+from .range import Range
 from .replace import Replace
 from .replacer import CommentReplacement, Replacer
+from .scheduler import ConversionScheduler
 
 class Converter:
     """
@@ -29,7 +42,12 @@ class Converter:
             c_pattern: Pattern[str] | None = None,
             cxx_pattern: Pattern[str] | None = None,
             c_extractor: Extractor[CType] | None = None,
-            cxx_extractor: Extractor[CXXType] | None = None
+            cxx_extractor: Extractor[CXXType] | None = None,
+            libclang_stats: LibclangStatsReport | None = None,
+            doc_coverage: DocCoverageReport | None = None,
+            concurrency: int = 1,
+            checkpoint: ConversionCheckpoint | None = None,
+            scheduler: ConversionScheduler | None = None
         ) -> None:
         """
         Creates a new `Converter` object.
@@ -44,6 +62,26 @@ class Converter:
             Used to determine C source files, by default `r".*\\.[ch]"`
         cxx_pattern: Pattern[str] | None, optional
             Used to determine C++ source files, by default `r".*\\.(c(pp|xx|c)|h(pp|xx|h)?)"`
+        c_extractor: Extractor[CType] | None, optional
+            The extractor for C source files, by default `CLibclangExtractor()`.
+        cxx_extractor: Extractor[CXXType] | None, optional
+            The extractor for C++ source files, by default `CXXLibclangExtractor()`.
+        libclang_stats: LibclangStatsReport | None, optional
+            If set, the statistics of every file parsed by libclang are added to it.
+        doc_coverage: DocCoverageReport | None, optional
+            If set, the documentation coverage of every file is added to it
+            (only for extractors created with `coverage=True`).
+        concurrency: int, optional
+            The maximum number of concurrent conversions if `conversion` is an
+            `AsyncConversion` (e.g. requests to a LLM), by default 1 (sequential).
+        checkpoint: ConversionCheckpoint | None, optional
+            If set, the results of every converted file are recorded in it before
+            the file is written, and files that it records as converted are
+            skipped or get the recorded results without converting them again.
+        scheduler: ConversionScheduler | None, optional
+            If set, the comments of all files are extracted first and converted
+            one at a time in the order of their priority until the budget of
+            `scheduler` is used up (see `_convert_files_scheduled`).
         """
         self.conversion = conversion
         self.replace = replace
@@ -51,6 +89,11 @@ class Converter:
         self.cxx_pattern = cxx_pattern if cxx_pattern is not None else self.__class__._DEFAULT_CXX_PATTERN
         self.c_extractor = c_extractor if c_extractor is not None else self.__class__._DEFAULT_C_EXTRACTOR
         self.cxx_extractor = cxx_extractor if cxx_extractor is not None else self.__class__._DEFAULT_CXX_EXTRACTOR
+        self.libclang_stats = libclang_stats
+        self.doc_coverage = doc_coverage
+        self.concurrency = concurrency
+        self.checkpoint = checkpoint
+        self.scheduler = scheduler
 
     def convert_file(self, file: Path) -> None:
         """
@@ -63,17 +106,26 @@ class Converter:
         file : Path
             The source file with zero or more comments.
         """
+        extractor: Extractor[CType] | Extractor[CXXType]
         match (self.c_pattern.fullmatch(file.name) is not None,
                self.cxx_pattern.fullmatch(file.name) is not None):
             case True, _:
                 print(f"\"{file}\" was identified as a C source file")
-                self._convert_file(file, self.c_extractor)
+                extractor = self.c_extractor
             case False, True:
                 print(f"\"{file}\" was identified as a C++ source file")
-                self._convert_file(file, self.cxx_extractor)
+                extractor = self.cxx_extractor
             case False, False:
                 print(f"Skip \"{file}\": Filename does not match C ({self.c_pattern} specified by --c_regex) \n"
                       f"or C++ ({self.cxx_pattern} specified by --cxx_regex) Python RegEx")
+                return
+
+        if self.scheduler is not None:
+            self._convert_files_scheduled([(file, extractor)])
+        elif self._is_async():
+            asyncio.run(self._convert_files_async([(file, extractor)]))
+        else:
+            self._convert_file(file, extractor)
 
     def convert_files(self, dir: Path) -> None:
         """
@@ -98,6 +150,18 @@ class Converter:
         c_files_count = len(c_files)
         cxx_files_count = len(cxx_files)
 
+        if self.scheduler is not None:
+            print(f"{c_files_count} C source files and {cxx_files_count} C++ source files found")
+            files = [(file, self.c_extractor) for file in c_files] + [(file, self.cxx_extractor) for file in cxx_files]
+            self._convert_files_scheduled(files)
+            return
+
+        if self._is_async():
+            print(f"{c_files_count} C source files and {cxx_files_count} C++ source files found")
+            files = [(file, self.c_extractor) for file in c_files] + [(file, self.cxx_extractor) for file in cxx_files]
+            asyncio.run(self._convert_files_async(files))
+            return
+
         # Convert source files
         print(f"{c_files_count} C source files found")
         for i, file in enumerate(c_files, start=1):
@@ -110,35 +174,367 @@ class Converter:
             self._convert_file(file, self.cxx_extractor)
 
     def _convert_file(self, file: Path, extractor: Extractor[CType] | Extractor[CXXType]) -> None:
-        code: str = ""
-        try:  # try reading file as utf-8
-            code = file.read_text()
-        except UnicodeDecodeError as ue:
-            print(ue)
-            print(f"{str(file)} could not be decoded as utf-8. Re-attempting decode as ISO-8859-1 (latin-1):")
-            try:  # try reading file as latin-1
-                code = file.read_text(encoding="ISO-8859-1")
-            except UnicodeDecodeError as le:
-                print(le)
+        code = self._read_code(file)
+        if self._is_converted(file, code):
+            return
+        document: Document | None = None
+        results: list[tuple[Comment[Any], ConvResult]] = []
+        if self.checkpoint is not None and self.checkpoint.has_results(file, code):
+            comments, extractor = self._extract_comments(file, code, extractor)
+            if comments is not None:
+                if self._reapply_results(file, code, comments):
+                    return
+                # The comments are not extracted again (the C++ fallback was already tried)
+                document = self._convert_document(code, extractor, results, comments)
+        else:
+            try:
+                document = self._convert_document(code, extractor, results)
+            except Exception:
+                if extractor == self.c_extractor:
+                    print(f"An error occured when parsing \"{file}\" as a C file. Trying to parse it as a C++ file...")
+                    extractor = self.cxx_extractor
+                    # The comments that were converted before the error are not converted again
+                    previous_results = {self._result_key(comment): result for comment, result in results}
+                    results.clear()
+                    try:
+                        document = self._convert_document(code, extractor, results, previous_results=previous_results)
+                    except Exception as e:
+                        print(f"An error occured when parsing \"{file}\" as a C++ file: {e}. Skipping the file...")
 
-        result: str | None = None
-        try:
-            result = self._convert_string(code, extractor)
-        except Exception:
-            if extractor == self.c_extractor:
-                print(f"An error occured when parsing \"{file}\" as a C file. Trying to parse it as a C++ file...")
+        self._add_file_stats(file, extractor)
+        if document is not None:
+            self._record(file, code, document, results)
+        self._write_document(file, document)
+
+    async def _convert_files_async(self, files: Sequence[tuple[Path, Extractor[CType] | Extractor[CXXType]]]) -> None:
+        """
+        Converts comments in `files` with `AsyncConversion.calc_conversion_async`.
+
+        While the comments of up to `concurrency` files are converted (with at
+        most `concurrency` conversions at a time), the next file is extracted
+        in a worker thread. A conversion that raises an exception results in a
+        `ConvError`, so the other comments of the file are still converted.
+        If `conversion` is a `BatchConversion` with `batch_size` greater than 1,
+        the comments of a file are converted together with one conversion slot.
+        """
+        conversion_slots = asyncio.Semaphore(self.concurrency)
+        pending: set[asyncio.Task[None]] = set()
+        for i, (file, extractor) in enumerate(files, start=1):
+            while len(pending) >= self.concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result() # Raise unexpected exceptions
+            print(f"{i}/{len(files)} Converting file \"{file}\"")
+            code = self._read_code(file)
+            if self._is_converted(file, code):
+                continue
+            comments, extractor = await asyncio.to_thread(self._extract_comments, file, code, extractor)
+            self._add_file_stats(file, extractor)
+            if comments is None:
+                print(f"\"{file}\" has not changed")
+                continue
+            if self._reapply_results(file, code, comments):
+                continue
+            pending.add(asyncio.create_task(self._convert_comments_async(file, code, comments, conversion_slots)))
+        await asyncio.gather(*pending)
+
+    async def _convert_comments_async(
+            self,
+            file: Path,
+            code: str,
+            comments: list[Comment[Any]],
+            conversion_slots: asyncio.Semaphore
+        ) -> None:
+        if self._is_batch():
+            batch_conversion: BatchConversion[Any] = self.conversion # type: ignore
+            async with conversion_slots:
                 try:
-                    result = self._convert_string(code, self.cxx_extractor)
+                    results = await batch_conversion.calc_conversions_async(comments)
                 except Exception as e:
-                    print(f"An error occured when parsing \"{file}\" as a C++ file: {e}. Skipping the file...")
+                    results = [ConvError(f"An error occured during the conversion: {e}")] * len(comments)
+            print(f"Comments of \"{file}\" were processed")
+            self._write_results(file, code, list(zip(comments, results)))
+            return
+
+        conversion: AsyncConversion[Any] = self.conversion # type: ignore
+
+        async def convert(comment: Comment[Any]) -> ConvResult:
+            async with conversion_slots:
+                try:
+                    return await conversion.calc_conversion_async(comment)
+                except Exception as e:
+                    return ConvError(f"An error occured during the conversion: {e}")
+
+        # gather keeps the order of the comments
+        results = await asyncio.gather(*(convert(comment) for comment in comments))
+        print(f"Comments of \"{file}\" were processed")
+        self._write_results(file, code, list(zip(comments, results)))
+
+    def _convert_files_scheduled(self, files: Sequence[tuple[Path, Extractor[CType] | Extractor[CXXType]]]) -> None:
+        """
+        Converts the comments of `files` in the order of their priority until
+        the budget of `scheduler` is used up.
+
+        The comments of all files are extracted first. Then the conversions
+        are started in the order of `ConversionScheduler.order` (with up to
+        `concurrency` conversions at a time if `conversion` is an
+        `AsyncConversion`, but without batches), and the remaining comments
+        are added to the backlog of the scheduler. Finally, every file is
+        written with the comments that were converted. Files with remaining
+        comments are not recorded in the checkpoint.
+        """
+        scheduler: ConversionScheduler = self.scheduler # type: ignore
+        scheduler.start()
+        extracted: list[tuple[Path, str, list[Comment[Any]]]] = []
+        for i, (file, extractor) in enumerate(files, start=1):
+            print(f"{i}/{len(files)} Extracting comments of file \"{file}\"")
+            code = self._read_code(file)
+            if self._is_converted(file, code):
+                continue
+            comments, extractor = self._extract_comments(file, code, extractor)
+            self._add_file_stats(file, extractor)
+            if comments is None:
+                print(f"\"{file}\" has not changed")
+                continue
+            if not self._reapply_results(file, code, comments):
+                extracted.append((file, code, comments))
+
+        items = [(file_index, comment) for file_index, (_, _, comments) in enumerate(extracted) for comment in comments]
+        order = scheduler.order([(extracted[file_index][0], comment) for file_index, comment in items])
+        print(f"{len(items)} comments of {len(extracted)} files are converted in the order of their priority")
+        results: list[ConvResult | None] = [None] * len(items)
+        if self._is_async():
+            started = asyncio.run(self._convert_scheduled_async(items, order, results))
+        else:
+            started = 0
+            for i in order:
+                if not scheduler.try_start(items[i][1]):
+                    break
+                print(f"{started + 1}/{len(items)} Converting comment", end="\r", flush=True)
+                results[i] = self._calc_conversion(items[i][1])
+                started += 1
+        for i in order[started:]:
+            file, code, _ = extracted[items[i][0]]
+            scheduler.add_to_backlog(file, code, items[i][1])
+
+        offset = 0
+        for file, code, comments in extracted:
+            file_results = results[offset:offset + len(comments)]
+            offset += len(comments)
+            print(f"Writing file \"{file}\"")
+            document = self._build_document(
+                code,
+                zip(comments, (result if result is not None else ConvEmpty("Not converted within the budget") for result in file_results))
+            )
+            if all(result is not None for result in file_results):
+                self._record(file, code, document, list(zip(comments, file_results))) # type: ignore
+            self._write_document(file, document)
+
+    async def _convert_scheduled_async(
+            self,
+            items: list[tuple[int, Comment[Any]]],
+            order: list[int],
+            results: list[ConvResult | None]
+        ) -> int:
+        # Converts the comments of items in order until the budget is used up, returns the number of started conversions
+        scheduler: ConversionScheduler = self.scheduler # type: ignore
+        conversion: AsyncConversion[Any] = self.conversion # type: ignore
+        conversion_slots = asyncio.Semaphore(self.concurrency)
+
+        async def convert(i: int) -> None:
+            try:
+                results[i] = await conversion.calc_conversion_async(items[i][1])
+            except Exception as e:
+                results[i] = ConvError(f"An error occured during the conversion: {e}")
+            finally:
+                conversion_slots.release()
+
+        tasks: list[asyncio.Task[None]] = []
+        for i in order:
+            await conversion_slots.acquire() # The budget is checked when a slot is free
+            if not scheduler.try_start(items[i][1]):
+                conversion_slots.release()
+                break
+            print(f"{len(tasks) + 1}/{len(items)} Converting comment", end="\r", flush=True)
+            tasks.append(asyncio.create_task(convert(i)))
+        await asyncio.gather(*tasks)
+        return len(tasks)
+
+    def _extract_comments(
+            self,
+            file: Path,
+            code: str,
+            extractor: Extractor[CType] | Extractor[CXXType]
+        ) -> tuple[list[Comment[Any]] | None, Extractor[CType] | Extractor[CXXType]]:
+        # Returns the comments (None on errors) and the extractor that was used
+        try:
+            return list(extractor.iter_comments(code)), extractor
+        except Exception:
+            if extractor != self.c_extractor:
+                return None, extractor
+            print(f"An error occured when parsing \"{file}\" as a C file. Trying to parse it as a C++ file...")
+            extractor = self.cxx_extractor
+            try:
+                return list(extractor.iter_comments(code)), extractor
+            except Exception as e:
+                print(f"An error occured when parsing \"{file}\" as a C++ file: {e}. Skipping the file...")
+                return None, extractor
+
+    def _is_converted(self, file: Path, code: str) -> bool:
+        if self.checkpoint is None or not self.checkpoint.is_converted(file, code):
+            return False
+        print(f"Skip \"{file}\": It was already converted according to the checkpoint")
+        return True
+
+    def _reapply_results(self, file: Path, code: str, comments: list[Comment[Any]]) -> bool:
+        # Writes the results that the checkpoint records for the comments of file, returns False if there are none
+        results = self.checkpoint.get_results(file, code, comments) if self.checkpoint is not None else None
+        if results is None:
+            return False
+        print(f"The recorded conversions of \"{file}\" are reapplied")
+        self._write_document(file, self._build_document(code, zip(comments, results)))
+        return True
+
+    def _write_results(self, file: Path, code: str, results: list[tuple[Comment[Any], ConvResult]]) -> None:
+        document = self._build_document(code, results)
+        self._record(file, code, document, results)
+        self._write_document(file, document)
 
-        if result is not None and result != code:
+    def _record(self, file: Path, code: str, document: Document, results: list[tuple[Comment[Any], ConvResult]]) -> None:
+        # Before the file is written, so a file is never converted without a record
+        if self.checkpoint is not None:
+            self.checkpoint.add(file, code, document, results)
+
+    def _is_async(self) -> bool:
+        return self.concurrency > 1 and isinstance(self.conversion, AsyncConversion)
+
+    def _is_batch(self) -> bool:
+        return isinstance(self.conversion, BatchConversion) and self.conversion.batch_size > 1
+
+    def _add_file_stats(self, file: Path, extractor: Extractor[CType] | Extractor[CXXType]) -> None:
+        if self.libclang_stats is not None:
+            stats: LibclangStats | None = getattr(extractor, "last_stats", None)
+            if stats is not None:
+                self.libclang_stats.add(file, stats)
+        if self.doc_coverage is not None:
+            coverage: DocCoverage | None = getattr(extractor, "last_coverage", None)
+            if coverage is not None:
+                self.doc_coverage.add(file, coverage)
+
+    def _write_document(self, file: Path, document: Document | None) -> None:
+        if document is not None and document.has_changes():
             print(f"\"{file}\" was updated")
-            file.write_text(result)
+            self._write_chunks(file, document.iter_text())
             return
 
         print(f"\"{file}\" has not changed")
 
+    @classmethod
+    def _read_code(cls, file: Path) -> str:
+        """
+        Reads `file` like `Path.read_text` (with universal newlines), but
+        decodes it directly from a memory map without copying the bytes first.
+        Files that cannot be mapped (e.g. special files) are read normally.
+        """
+        with open(file, "rb") as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size > 0 else None
+            except (OSError, ValueError):
+                mapped = None
+            if mapped is None:
+                code = cls._decode(file, f.read())
+            else:
+                with mapped:
+                    code = cls._decode(file, mapped)
+        if "\r" in code:
+            code = code.replace("\r\n", "\n").replace("\r", "\n")
+        return code
+
+    @classmethod
+    def _decode(cls, file: Path, data: Any) -> str:
+        try:  # try reading file as utf-8
+            return str(data, "utf-8")
+        except UnicodeDecodeError as ue:
+            print(ue)
+            print(f"{str(file)} could not be decoded as utf-8. Re-attempting decode as ISO-8859-1 (latin-1):")
+            return str(data, "ISO-8859-1")
+
+    @classmethod
+    def _write_chunks(cls, file: Path, chunks: Iterable[str]) -> None:
+        """
+        Writes `chunks` to a temporary file in the directory of `file`
+        and renames it to `file`, so the new content is never held in
+        memory at once and `file` is never partially written.
+
+        Symbolic links are followed. Extended attributes (e.g. ACLs and
+        SELinux labels) are copied to the temporary file. If the rename
+        would change more than the content (the file has several hard
+        links, an owner or group that cannot be kept, or extended
+        attributes that cannot be copied) or no temporary file can be
+        created, `file` is written in place.
+        """
+        target = file.resolve()
+        stat = os.stat(target)
+        if stat.st_nlink > 1 or not cls._can_keep_owner(stat):
+            cls._write_in_place(target, chunks)
+            return
+        try:
+            fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+        except OSError:
+            cls._write_in_place(target, chunks)
+            return
+        try:
+            try:
+                # Before writing, because chunks can only be consumed once
+                cls._copy_xattrs(target, tmp_name)
+            except OSError:
+                os.close(fd)
+                os.unlink(tmp_name)
+                cls._write_in_place(target, chunks)
+                return
+            with open(fd, "w") as f:
+                f.writelines(chunks)
+            shutil.copymode(target, tmp_name)
+            if (stat.st_uid, stat.st_gid) != (os.geteuid(), os.getegid()):
+                os.chown(tmp_name, stat.st_uid, stat.st_gid)
+            os.replace(tmp_name, target)
+        except BaseException:
+            if os.path.lexists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    @classmethod
+    def _write_in_place(cls, file: Path, chunks: Iterable[str]) -> None:
+        with open(file, "w") as f:
+            f.writelines(chunks)
+
+    @classmethod
+    def _can_keep_owner(cls, stat: os.stat_result) -> bool:
+        # A new file gets the effective user and may only be given a group of the user (any owner as root)
+        if not hasattr(os, "geteuid"):
+            return True # No owners to keep (Windows)
+        if os.geteuid() == 0:
+            return True
+        return stat.st_uid == os.geteuid() and stat.st_gid in (os.getegid(), *os.getgroups())
+
+    @classmethod
+    def _copy_xattrs(cls, source: Path, destination: str) -> None:
+        # Raises OSError if an attribute cannot be set, e.g. a SELinux label without the permission to relabel
+        if not hasattr(os, "listxattr"):
+            return
+        try:
+            names = os.listxattr(source)
+        except OSError:
+            return # Not supported by the file system
+        for name in names:
+            value = os.getxattr(source, name)
+            try:
+                if os.getxattr(destination, name) == value:
+                    continue # E.g. the default SELinux label of the directory
+            except OSError:
+                pass
+            os.setxattr(destination, name, value)
+
     def _convert_string(
             self,
             code: str,
@@ -159,36 +555,106 @@ class Converter:
         str
             The code with replaced comments.
         """
-        # Extract comments
+        return self._convert_document(code, extractor).text()
+
+    def _convert_document(
+            self,
+            code: str,
+            extractor: Extractor[CType] | Extractor[CXXType],
+            results_out: list[tuple[Comment[Any], ConvResult]] | None = None,
+            comments: Iterable[Comment[Any]] | None = None,
+            previous_results: Mapping[tuple[Range, Range, str], ConvResult] | None = None
+        ) -> Document:
+        """
+        Converts comments in `code`.
+
+        Parameters
+        ----------
+        code : str
+            The code with zero or more comments.
+        extractor: Extractor[CType] | Extractor[CXXType]
+            The extractor to use to extract comments from `code`.
+        results_out: list[tuple[Comment[Any], ConvResult]] | None, optional
+            If set, the comments and their results are appended to it.
+        comments: Iterable[Comment[Any]] | None, optional
+            The comments of `code` if they were already extracted,
+            by default None (they are extracted with `extractor`).
+        previous_results: Mapping[tuple[Range, Range, str], ConvResult] | None, optional
+            Results of comments that were converted before (by `_result_key`),
+            which are used instead of converting these comments again.
+
+        Returns
+        -------
+        Document
+            The code with replaced comments.
+        """
+        # Extract comments and calculate new comments
+        # Unless batched, comments are converted while the rest of the code is still being extracted
         print("Extracting comments", end="\r", flush=True)
-        comments = extractor.extract_comments(code)
-        comments_count = len(comments)
-        print(f"{comments_count} comments were found")
+        if comments is None:
+            comments = extractor.iter_comments(code)
+        previous_results = previous_results or {}
+        if self._is_batch():
+            batch_conversion: BatchConversion[Any] = self.conversion # type: ignore
+            comments = list(comments)
+            new_comments = [comment for comment in comments if self._result_key(comment) not in previous_results]
+            try:
+                new_results = iter(batch_conversion.calc_conversions(new_comments))
+            except Exception as e:
+                new_results = iter([ConvError(f"An error occured during the conversion: {e}")] * len(new_comments))
+            batch_results = [previous_results[key] if (key := self._result_key(comment)) in previous_results else next(new_results)
+                             for comment in comments]
+            if results_out is not None:
+                results_out.extend(zip(comments, batch_results))
+            return self._build_document(code, zip(comments, batch_results))
+        results = ((comment, previous_results[key] if (key := self._result_key(comment)) in previous_results
+                    else self._calc_conversion(comment))
+                   for comment in comments)
+        if results_out is not None:
+            results = self._collect(results, results_out)
+        return self._build_document(code, results)
+
+    @classmethod
+    def _collect[T](cls, items: Iterable[T], collected: list[T]) -> Iterable[T]:
+        for item in items:
+            collected.append(item)
+            yield item
 
-        # Calculate new comments
-        comment_conv_pairs: list[tuple[Comment[Any], ConvResult]] = []
-        for i, comment in enumerate(comments, start=1):
-            print(f"{i}/{comments_count} Processing comment", end="\r", flush=True)
-            conv_result = self.conversion.calc_conversion(comment)
-            comment_conv_pairs.append((comment, conv_result))
+    @classmethod
+    def _result_key(cls, comment: Comment[Any]) -> tuple[Range, Range, str]:
+        # Identifies a comment of the same code independently of the extractor (CType or CXXType)
+        return (comment.comment_range, comment.symbol_range, comment.symbol_type.name)
 
+    def _calc_conversion(self, comment: Comment[Any]) -> ConvResult:
+        # A failed conversion (e.g. a request to a LLM) must not discard the other conversions of the file
+        try:
+            return self.conversion.calc_conversion(comment)
+        except Exception as e:
+            return ConvError(f"An error occured during the conversion: {e}")
+
+    def _build_document(self, code: str, results: Iterable[tuple[Comment[Any], ConvResult]]) -> Document:
+        """Replaces the comments in `code` that have a `ConvPresent` result and prints the number of results."""
         conv_present_list: list[tuple[Comment[Any],ConvPresent]] = []
-        conv_empty_list: list[tuple[Comment[Any],ConvEmpty]] = []
-        conv_unsupported_list: list[tuple[Comment[Any],ConvUnsupported]] = []
-        conv_error_list: list[tuple[Comment[Any],ConvError]] = []
-        for comment_conv_pair in comment_conv_pairs:
-            match comment_conv_pair:
-                case _, ConvPresent():
-                    conv_present_list.append(comment_conv_pair)
-                case _, ConvEmpty():
-                    conv_empty_list.append(comment_conv_pair)
-                case _, ConvUnsupported():
-                    conv_unsupported_list.append(comment_conv_pair)
-                case _, ConvError():
-                    conv_error_list.append(comment_conv_pair)
+        conv_empty_count = 0
+        conv_unsupported_count = 0
+        conv_error_count = 0
+        comments_count = 0
+        for comment, result in results:
+            comments_count += 1
+            print(f"{comments_count} Processing comment", end="\r", flush=True)
+            match result:
+                case ConvPresent() as conv_present:
+                    conv_present_list.append((comment, conv_present))
+                case ConvEmpty():
+                    conv_empty_count += 1
+                case ConvUnsupported():
+                    conv_unsupported_count += 1
+                case ConvError():
+                    conv_error_count += 1
+        print(f"{comments_count} comments were found")
 
+        document = Document(code)
         if not conv_present_list:
-            result = code
             print("No comment was converted")
         else:
             replacements = (
@@ -196,14 +662,15 @@ class Converter:
                     c.comment_range,
                     c.symbol_indentation,
                     c.comment_text,
-                    conv_present.new_comment
+                    conv_present.new_comment,
+                    c.parsed
                 )
                 for c, conv_present in conv_present_list
             )
             sorted_replacements = sorted(replacements, key=lambda e: e.range.start)
-            result = Replacer.replace_comments(code, sorted_replacements, self.replace)
+            Replacer.replace_comments_in_document(document, sorted_replacements, self.replace)
             print(f"{len(conv_present_list)} comments were converted")
-        print(f"For {len(conv_empty_list)} comments a conversion was skipped")
-        print(f"{len(conv_unsupported_list)} comments were not supported")
-        print(f"For {len(conv_error_list)} comments a conversion was not found")
-        return result
+        print(f"For {conv_empty_count} comments a conversion was skipped")
+        print(f"{conv_unsupported_count} comments were not supported")
+        print(f"For {conv_error_count} comments a conversion was not found")
+        return document
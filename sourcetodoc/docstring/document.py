@@ -0,0 +1,158 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Iterable, Iterator
+
+from .range import Range
+
+# Maximum length of the parts of the original text yielded by `Document.iter_text`
+_CHUNK_SIZE: int = 1 << 20
+
+
+class Document:
+    """
+    A text with replacements from one or more passes (piece table).
+
+    Replacements are given by ranges in the original text, so successive
+    passes can use the ranges of the same extraction without extracting
+    the intermediate text again. The original text is not copied and the
+    new text is only created by `text`, e.g. when the file is written.
+
+    A replacement must not overlap a previous replacement, except if its
+    range is the same, then it replaces the previous replacement (e.g. a
+    comment that was converted by a previous pass).
+    """
+
+    def __init__(self, original: str) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        original : str
+            The original text.
+        """
+        self.original = original
+        # The replacements are sorted by their ranges in the original text
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self._texts: list[str] = []
+        self._shifts: list[int] | None = None # _shifts[i] is the length difference of the first i replacements
+
+    def replace(self, range: Range, new_text: str) -> None:
+        """
+        Replaces the text given by `range` in the original text with `new_text`.
+
+        Raises
+        ------
+        ValueError
+            If `range` overlaps with the range of a previous replacement and is not the same range.
+        """
+        i = bisect_left(self._starts, range.start)
+        # The same range as a previous replacement
+        if i < len(self._starts) and self._starts[i] == range.start and self._ends[i] == range.end:
+            self._texts[i] = new_text
+            self._shifts = None
+            return
+        if ((i > 0 and self._ends[i-1] > range.start)
+            or (i < len(self._starts) and (self._starts[i] < range.end or self._starts[i] == range.start))):
+            raise ValueError(f"{range} overlaps with a previous replacement")
+        self._starts.insert(i, range.start)
+        self._ends.insert(i, range.end)
+        self._texts.insert(i, new_text)
+        self._shifts = None
+
+    def replace_all(self, ranges_and_texts: Iterable[tuple[Range, str]]) -> None:
+        """
+        Calls `replace` for every range and new text in `ranges_and_texts`.
+
+        Raises
+        ------
+        ValueError
+            If the ranges are not in ascending order without overlap (like `Replacer.replace_text`),
+            or if a range overlaps with the range of a previous replacement and is not the same range.
+        """
+        end = 0
+        for range, new_text in ranges_and_texts:
+            if range.start < end:
+                raise ValueError("Replacements must be in ascending order without overlap")
+            self.replace(range, new_text)
+            end = range.end
+
+    def get_text(self, range: Range) -> str:
+        """
+        Returns the current text of `range` in the original text.
+
+        Raises
+        ------
+        ValueError
+            If `range` starts or ends inside of a replacement.
+        """
+        self.map_position(range.start) # Check the boundaries
+        self.map_position(range.end)
+        return "".join(self._iter_chunks(range.start, range.end))
+
+    def map_position(self, index: int) -> int:
+        """
+        Maps `index` in the original text to the index in the current text in O(log n).
+
+        The start and end of a replaced range are mapped to the start
+        and end of its new text respectively.
+
+        Raises
+        ------
+        ValueError
+            If `index` is inside of a replaced range.
+        """
+        i = bisect_right(self._ends, index) # Number of replacements before index
+        if i < len(self._starts) and self._starts[i] < index:
+            raise ValueError(f"Index {index} is inside of a replacement")
+        return index + self._get_shifts()[i]
+
+    def map_range(self, range: Range) -> Range:
+        """Maps `range` in the original text to the range in the current text, see `map_position`."""
+        return Range(self.map_position(range.start), self.map_position(range.end))
+
+    def iter_text(self) -> Iterator[str]:
+        """
+        Yields the parts of the current text.
+
+        Concatenate the yielded results to get the entire text like in the `text` method.
+        Unchanged parts are yielded in slices of at most 1 Mi characters, so
+        writing the parts to a file needs little memory besides the original text.
+        """
+        return self._iter_chunks(0, len(self.original))
+
+    def text(self) -> str:
+        """Returns the current text."""
+        return "".join(self.iter_text())
+
+    def has_changes(self) -> bool:
+        """Returns True if the current text differs from the original text."""
+        return any(
+            text != self.original[start:end]
+            for start, end, text in zip(self._starts, self._ends, self._texts)
+        )
+
+    def __len__(self) -> int:
+        return len(self.original) + self._get_shifts()[-1]
+
+    def _iter_chunks(self, start: int, end: int) -> Iterator[str]:
+        # Yields the current text of [start, end), which must not start or end inside of a replacement
+        i = bisect_left(self._starts, start)
+        position = start
+        while i < len(self._ends) and self._ends[i] <= end:
+            yield from self._iter_original(position, self._starts[i])
+            yield self._texts[i]
+            position = self._ends[i]
+            i += 1
+        yield from self._iter_original(position, end)
+
+    def _iter_original(self, start: int, end: int) -> Iterator[str]:
+        for chunk_start in range(start, end, _CHUNK_SIZE):
+            yield self.original[chunk_start:min(chunk_start + _CHUNK_SIZE, end)]
+
+    def _get_shifts(self) -> list[int]:
+        if self._shifts is None:
+            differences = (len(text) - (end - start) for start, end, text in zip(self._starts, self._ends, self._texts))
+            self._shifts = list(accumulate(differences, initial=0))
+        return self._shifts
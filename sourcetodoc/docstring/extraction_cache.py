@@ -0,0 +1,228 @@
+import marshal
+import os
+import tempfile
+from enum import Enum
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, override
+
+from ..libclang_util import clang_get_version
+from .extractor import Comment, Extractor
+from .extractors.doc_coverage import DocCoverage
+from .extractors.libclang_stats import LibclangStats
+from .range import Range
+
+_FORMAT_VERSION: int = 1
+
+# Increment if an extractor returns different comments for the same code, so the old entries are not used
+EXTRACTOR_VERSION: int = 5
+
+
+class ExtractionCache:
+    """
+    Persistent cache for the results of `Extractor.extract_comments`.
+
+    Every entry is stored in its own file in `cache_dir`. If the total
+    size of the entries exceeds `max_bytes`, the least recently used
+    entries are deleted.
+
+    Only offsets, the symbol type and the indentation are stored,
+    because `Comment.comment_text` and `Comment.symbol_text` are slices
+    of the code and can be restored from it.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 256 * 1024 * 1024) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        cache_dir : Path
+            The directory of the cache. It is created if it does not exist.
+        max_bytes : int, optional
+            The maximum total size of the entries, by default 256 MiB.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes: int | None = None # Computed when the first entry is added
+
+    def get[T: Enum](self, key: str, code: str, type_enum: type[T]) -> list[Comment[T]] | None:
+        """
+        Returns the cached comments of `code` or None if no entry exists for `key`.
+
+        Parameters
+        ----------
+        key : str
+            The key returned by `make_key`.
+        code : str
+            The code that the comments were extracted from.
+        type_enum : type[T]
+            The enumeration of `Comment.symbol_type`.
+        """
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            version, records = marshal.loads(data)
+            if version != _FORMAT_VERSION:
+                raise ValueError
+            comments = [
+                Comment.from_source(
+                    code,
+                    Range(comment_start, comment_end),
+                    Range(symbol_start, symbol_end),
+                    type_enum[type_name],
+                    indentation
+                )
+                for comment_start, comment_end, symbol_start, symbol_end, type_name, indentation in records
+            ]
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self.misses += 1
+            return None
+        os.utime(path) # Mark as recently used
+        self.hits += 1
+        return comments
+
+    def put(self, key: str, code: str, comments: list[Comment[Any]]) -> None:
+        """
+        Stores `comments` for `key` and evicts old entries if necessary.
+
+        Nothing is stored if `comment_text` or `symbol_text` of a comment
+        is not the slice of `code` given by `comment_range` or `symbol_range`.
+
+        Parameters
+        ----------
+        key : str
+            The key returned by `make_key`.
+        code : str
+            The code that the comments were extracted from.
+        comments : list[Comment[Any]]
+            The comments.
+        """
+        for c in comments:
+            if (code[c.comment_range.start:c.comment_range.end] != c.comment_text
+                or code[c.symbol_range.start:c.symbol_range.end] != c.symbol_text):
+                return
+        records = [
+            (c.comment_range.start, c.comment_range.end,
+             c.symbol_range.start, c.symbol_range.end,
+             c.symbol_type.name, c.symbol_indentation)
+            for c in comments
+        ]
+        data = marshal.dumps((_FORMAT_VERSION, records))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if self._total_bytes is None:
+            self._total_bytes = sum(entry.stat().st_size for entry in self._entries())
+        path = self._path(key)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{key}.", suffix=".tmp", dir=self.cache_dir)
+        try:
+            with open(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, path) # Atomic, so concurrent runs never read partial entries
+        except OSError:
+            os.unlink(tmp_name) # Not cached
+            return
+        self._total_bytes += len(data)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    @staticmethod
+    def make_key(code: str, extractor: Extractor[Any]) -> str:
+        """
+        Returns the key for the comments of `code` extracted by `extractor`.
+
+        The key depends on the content of `code`, the class of `extractor`,
+        its parse arguments (`parse_args` and `parse_options`, if present),
+        `EXTRACTOR_VERSION` and the libclang version.
+        """
+        extractor_class = type(extractor)
+        h = sha256()
+        h.update(code.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+        h.update(f"{extractor_class.__module__}.{extractor_class.__qualname__}".encode())
+        h.update(b"\0")
+        h.update(repr(getattr(extractor, "parse_args", None)).encode())
+        h.update(repr(getattr(extractor, "parse_options", None)).encode())
+        h.update(b"\0")
+        h.update(str(EXTRACTOR_VERSION).encode())
+        h.update(b"\0")
+        h.update(_LIBCLANG_VERSION.encode())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.bin"
+
+    def _entries(self) -> list[os.DirEntry[str]]:
+        return [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".bin")]
+
+    def _evict(self) -> None:
+        # Delete least recently used entries until at most 3/4 of max_bytes are used
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        target = self.max_bytes * 3 // 4
+        for entry in entries:
+            if total <= target:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+
+class CachedExtractor[T: Enum](Extractor[T]):
+    """Extracts comments with another extractor and stores the results in an `ExtractionCache`."""
+
+    def __init__(self, extractor: Extractor[T], type_enum: type[T], cache: ExtractionCache) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        extractor : Extractor[T]
+            The extractor that is used if the comments are not cached.
+        type_enum : type[T]
+            The enumeration of `Comment.symbol_type`, e.g. `CType`.
+        cache : ExtractionCache
+            The cache.
+        """
+        self.extractor = extractor
+        self.type_enum = type_enum
+        self.cache = cache
+        self._last_cached = False
+
+    @override
+    def extract_comments(self, code: str) -> list[Comment[T]]:
+        key = ExtractionCache.make_key(code, self.extractor)
+        comments = self.cache.get(key, code, self.type_enum)
+        self._last_cached = comments is not None
+        if comments is None:
+            comments = self.extractor.extract_comments(code)
+            self.cache.put(key, code, comments)
+        return comments
+
+    @property
+    def last_stats(self) -> LibclangStats | None:
+        """
+        Statistics of the last call of `extract_comments`, or None if the
+        comments were cached or `self.extractor` has no statistics.
+        """
+        if self._last_cached:
+            return None
+        return getattr(self.extractor, "last_stats", None)
+
+    @property
+    def last_coverage(self) -> DocCoverage | None:
+        """
+        Documentation coverage of the last call of `extract_comments`, or None
+        if the comments were cached or `self.extractor` has no coverage.
+        """
+        if self._last_cached:
+            return None
+        return getattr(self.extractor, "last_coverage", None)
+
+
+_LIBCLANG_VERSION: str = clang_get_version()
@@ -1,10 +1,12 @@
-from dataclasses import dataclass
-from typing import Protocol
+from dataclasses import FrozenInstanceError
+from typing import Any, Iterator, Protocol
 
+from sourcetodoc.docstring.comment_styler import ParsedComment
 from sourcetodoc.docstring.range import Range
 
+_NOT_PARSED = object() # Marks that Comment.parsed was not computed yet
+
 
-@dataclass(frozen=True)
 class Comment[T]:
     """
     Contains a comment associated with a symbol.
@@ -20,14 +22,139 @@ class Comment[T]:
     - `"␣␣␣␣"`                      is the symbol_indentation,
     - `"/*\\n␣␣␣␣ * abc\\n␣␣␣␣ */"` is the comment_text, and
     - `"int f(void)"`               is the symbol_text.
+
+    Objects created by `from_source` only keep a reference to the source
+    code and slice `comment_text` and `symbol_text` from it on access, so
+    nested symbols (e.g. namespaces or classes) do not copy their extents.
     """
 
-    comment_text: str  # e.g. "/* ... /*" (without the initial indentation)
-    comment_range: Range  #    ^       ^ Start and end of the comment in a string
-    symbol_text: str
-    symbol_range: Range  # Start and end of the symbol in a string
-    symbol_type: T  # e.g. CType.FUNCTION
+    __slots__ = ("_source", "_comment_text", "comment_range", "_symbol_text", "symbol_range", "symbol_type", "symbol_indentation", "_parsed", "_hash")
+    __match_args__ = ("comment_text", "comment_range", "symbol_text", "symbol_range", "symbol_type", "symbol_indentation")
+
+    _source: str | None
+    _comment_text: str | None
+    comment_range: Range
+    _symbol_text: str | None
+    symbol_range: Range
+    symbol_type: T
     symbol_indentation: str
+    _parsed: "ParsedComment | None | object"
+    _hash: int | None
+
+    def __init__(
+            self,
+            comment_text: str, # e.g. "/* ... /*" (without the initial indentation)
+            comment_range: Range, # ^       ^ Start and end of the comment in a string
+            symbol_text: str,
+            symbol_range: Range, # Start and end of the symbol in a string
+            symbol_type: T, # e.g. CType.FUNCTION
+            symbol_indentation: str
+        ) -> None:
+        self._init(None, comment_text, comment_range, symbol_text, symbol_range, symbol_type, symbol_indentation)
+
+    @classmethod
+    def from_source(
+            cls,
+            source: str,
+            comment_range: Range,
+            symbol_range: Range,
+            symbol_type: T,
+            symbol_indentation: str
+        ) -> "Comment[T]":
+        """
+        Creates a comment whose texts are the slices of `source` given by
+        `comment_range` and `symbol_range`.
+        """
+        comment = cls.__new__(cls)
+        comment._init(source, None, comment_range, None, symbol_range, symbol_type, symbol_indentation)
+        return comment
+
+    def _init(
+            self,
+            source: str | None,
+            comment_text: str | None,
+            comment_range: Range,
+            symbol_text: str | None,
+            symbol_range: Range,
+            symbol_type: T,
+            symbol_indentation: str
+        ) -> None:
+        set_attribute = object.__setattr__
+        set_attribute(self, "_source", source)
+        set_attribute(self, "_comment_text", comment_text)
+        set_attribute(self, "comment_range", comment_range)
+        set_attribute(self, "_symbol_text", symbol_text)
+        set_attribute(self, "symbol_range", symbol_range)
+        set_attribute(self, "symbol_type", symbol_type)
+        set_attribute(self, "symbol_indentation", symbol_indentation)
+        set_attribute(self, "_parsed", _NOT_PARSED)
+        set_attribute(self, "_hash", None)
+
+    @property
+    def comment_text(self) -> str:
+        if self._comment_text is not None:
+            return self._comment_text
+        return self._source[self.comment_range.start:self.comment_range.end] # type: ignore
+
+    @property
+    def symbol_text(self) -> str:
+        if self._symbol_text is not None:
+            return self._symbol_text
+        return self._source[self.symbol_range.start:self.symbol_range.end] # type: ignore
+
+    @property
+    def parsed(self) -> ParsedComment | None:
+        """
+        The parsed `comment_text` (content, style and piece ranges), or None
+        if it cannot be parsed.
+
+        It is computed on first access and cached, so conversions and the
+        `Replacer` do not parse the same comment text again.
+        """
+        parsed = self._parsed
+        if parsed is _NOT_PARSED:
+            parsed = ParsedComment.parse(self.comment_text)
+            object.__setattr__(self, "_parsed", parsed)
+        return parsed # type: ignore
+
+    def _astuple(self) -> tuple[str, Range, str, Range, T, str]:
+        return (self.comment_text, self.comment_range, self.symbol_text,
+                self.symbol_range, self.symbol_type, self.symbol_indentation)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        if (self.comment_range, self.symbol_range, self.symbol_type, self.symbol_indentation) \
+                != (other.comment_range, other.symbol_range, other.symbol_type, other.symbol_indentation): # type: ignore
+            return False
+        if self._source is not None and self._source is other._source: # type: ignore
+            return True # Same slices of the same source
+        return self.comment_text == other.comment_text and self.symbol_text == other.symbol_text # type: ignore
+
+    def __hash__(self) -> int:
+        hash_value = self._hash
+        if hash_value is None:
+            hash_value = hash(self._astuple())
+            object.__setattr__(self, "_hash", hash_value)
+        return hash_value
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Copying and pickling cannot set the frozen slots, so the comment is created again
+        if self._source is not None:
+            return (self.__class__.from_source, (self._source, self.comment_range, self.symbol_range,
+                                                 self.symbol_type, self.symbol_indentation))
+        return (self.__class__, self._astuple())
+
+    def __repr__(self) -> str:
+        return (f"{self.__class__.__qualname__}(comment_text={self.comment_text!r}, comment_range={self.comment_range!r}, "
+                f"symbol_text={self.symbol_text!r}, symbol_range={self.symbol_range!r}, "
+                f"symbol_type={self.symbol_type!r}, symbol_indentation={self.symbol_indentation!r})")
 
 
 class Extractor[T](Protocol):
@@ -49,3 +176,25 @@ class Extractor[T](Protocol):
             `comment_range` in ascending order.
         """
         ...
+
+    def iter_comments(self, code: str) -> Iterator[Comment[T]]:
+        """
+        Extracts comments from `code` and yields every comment as soon as
+        its position in the result is certain.
+
+        This allows to process comments while the rest of `code` is still
+        being extracted. The default implementation yields the result of
+        `extract_comments`.
+
+        Parameters
+        ----------
+        code : str
+            The string that contain zero or more comments.
+
+        Yields
+        ------
+        Comment[T]
+            The extracted comments with pairwise disjoint
+            `comment_range` in ascending order.
+        """
+        yield from self.extract_comments(code)
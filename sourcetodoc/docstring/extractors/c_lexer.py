@@ -0,0 +1,79 @@
+import re
+from enum import Enum, auto
+from typing import Iterator, NamedTuple
+
+
+class TokenKind(Enum):
+    """Enumeration with kinds of C tokens"""
+    LINE_COMMENT = auto()
+    BLOCK_COMMENT = auto()
+    STRING = auto()
+    CHAR = auto()
+    PREPROCESSOR = auto()
+    IDENTIFIER = auto()
+    NUMBER = auto()
+    PUNCTUATOR = auto()
+
+
+class Token(NamedTuple):
+    """A token in C source code, given by its kind and its start and end index."""
+    kind: TokenKind
+    start: int
+    end: int
+
+
+# Every repetition has disjoint alternatives or is lazy without anything after it, so no match can backtrack
+_TOKEN_REGEX = re.compile(r"""
+    \s*
+    (?:
+        (?P<block_comment>/\*.*?(?:\*/|\Z))
+      | (?P<line_comment>//(?:[^\n\\]|\\.)*)
+      | (?P<preprocessor>\#(?:[^\n\\/"']|\\.|/(?![/*])|"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)*)
+      | (?P<string>"(?:[^"\\\n]|\\.)*"?)
+      | (?P<char>'(?:[^'\\\n]|\\.)*'?)
+      | (?P<identifier>[A-Za-z_]\w*)
+      | (?P<number>\.?\d(?:[eEpP][+-]|[\w.])*)
+      | (?P<punctuator>\S)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+_GROUP_KINDS: dict[str, TokenKind] = {
+    "block_comment": TokenKind.BLOCK_COMMENT,
+    "line_comment": TokenKind.LINE_COMMENT,
+    "preprocessor": TokenKind.PREPROCESSOR,
+    "string": TokenKind.STRING,
+    "char": TokenKind.CHAR,
+    "identifier": TokenKind.IDENTIFIER,
+    "number": TokenKind.NUMBER,
+    "punctuator": TokenKind.PUNCTUATOR,
+}
+
+
+def tokenize(code: str) -> Iterator[Token]:
+    """
+    Splits `code` into C tokens in a single pass.
+
+    Comments, string and char literals and preprocessor lines (including
+    line continuations) are recognized as single tokens, so delimiters
+    inside of them are ignored. In valid C code, "#" outside of a directive
+    only appears at the start of a directive, so it is not checked whether
+    "#" is the first token of a line. Whitespaces are skipped. Unterminated
+    comments and literals end at the end of `code` or line respectively.
+
+    The running time is linear in `len(code)`.
+
+    Parameters
+    ----------
+    code : str
+        The code.
+
+    Yields
+    ------
+    Token
+        The tokens in ascending order.
+    """
+    for matched in _TOKEN_REGEX.finditer(code):
+        group = matched.lastgroup
+        if group is None:
+            return # Only whitespaces are left
+        yield Token(_GROUP_KINDS[group], matched.start(group), matched.end())
@@ -0,0 +1,363 @@
+import heapq
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import Iterator, Mapping, override
+
+from ..comment_parsing import find_comments_connected_with_ranges
+from ..comment_style import CommentStyle
+from ..extractor import Comment, Extractor
+from ..range import Range
+from .c_lexer import Token, TokenKind, tokenize
+from .c_type import CType
+
+_MEMBER_START_DELIMITERS: tuple[str, ...] = tuple(style.value.start_delimiter for style in (
+    CommentStyle.JAVADOC_BLOCK_MEMBER_INLINE,
+    CommentStyle.QT_BLOCK_MEMBER_INLINE,
+    CommentStyle.QT_LINE_MEMBER,
+    CommentStyle.TRIPLE_SLASH_LINE_MEMBER,
+))
+
+_RECORD_KEYWORDS: Mapping[str, CType] = {
+    "struct": CType.STRUCT,
+    "union": CType.UNION,
+    "enum": CType.ENUM,
+}
+
+
+class _Scope(Enum):
+    FILE = auto() # Top level or extern "C" { ... }
+    RECORD = auto() # struct { ... } or union { ... }
+    ENUM = auto() # enum { ... }
+    SKIPPED = auto() # Function bodies and initializers
+
+
+@dataclass
+class _Declaration:
+    tokens: list[Token] = field(default_factory=list)
+    leading_comment: Range | None = None
+    paren_depth: int = 0 # Depth of (...) and [...]
+    record: tuple[int, CType] | None = None # Start and type of the struct, union or enum defined by "{"
+    initializer: bool = False # True if "{" started an initializer, whose "}" is appended to the tokens
+
+
+class CLexerExtractor(Extractor[CType]):
+    """
+    Extracts comments from C source code without libclang.
+
+    The code is split into tokens by `tokenize` (linear time), then a
+    small recognizer splits the tokens into declarations by `;`, `,`,
+    `{` and `}`. A comment is associated with a declaration if:
+    - it is before the declaration with only whitespace between, or
+    - it has a member style (e.g. `/**< ... */`) and is after the declaration
+      in the same line.
+
+    Only the last connected comment (see `find_comments_connected`) before
+    a declaration is used. Comments in function bodies are ignored.
+    Like libclang, the comment of a declaration that defines a struct, union
+    or enum (e.g. `typedef struct S { ... } S_t;`) is associated with the
+    definition from its keyword to the closing `}`.
+
+    `iter_comments` yields comments while the code is tokenized.
+
+    Recognized symbols are functions (the signature without the body),
+    structs, unions, enums, enum constants, fields, variables and typedefs.
+    """
+
+    @override
+    def extract_comments(self, code: str) -> list[Comment[CType]]:
+        return list(self.iter_comments(code))
+
+    @override
+    def iter_comments(self, code: str) -> Iterator[Comment[CType]]:
+        recognizer = _Recognizer(code)
+        for token in tokenize(code):
+            recognizer.feed(token)
+            if recognizer.has_ready_comments():
+                yield from recognizer.take_ready_comments()
+        recognizer.finish()
+        yield from recognizer.take_ready_comments()
+
+
+class _Recognizer:
+    """Recognizes declarations in a token stream and associates comments with them."""
+
+    def __init__(self, code: str) -> None:
+        self.code = code
+        # Emitted comments as a heap of (comment start, emit order, comment),
+        # because e.g. the comment of "struct S { ... };" is emitted after the comments of the fields
+        self._emitted: list[tuple[int, int, Comment[CType]]] = []
+        self._emitted_count = 0
+        self._scopes: list[_Scope] = [_Scope.FILE]
+        self._outer_declarations: list[_Declaration] = [] # Declarations that opened a scope
+        self._declaration = _Declaration()
+        self._last_symbol: tuple[Range, CType] | None = None # Last emitted symbol in the current scope
+        self._comment_run: list[Token] = []
+        self._pending_comment: Range | None = None
+        self._last_token_end = 0 # End of the last token that is not a comment
+        self._finished = False
+
+    def feed(self, token: Token) -> None:
+        if token.kind in (TokenKind.LINE_COMMENT, TokenKind.BLOCK_COMMENT):
+            self._comment_run.append(token)
+            return
+        if self._comment_run:
+            self._finish_comment_run()
+        self._last_token_end = token.end
+
+        scope = self._scopes[-1]
+        if token.kind is TokenKind.PREPROCESSOR:
+            self._pending_comment = None
+            return
+        if scope is _Scope.SKIPPED:
+            self._feed_skipped(token)
+            return
+
+        text = self.code[token.start:token.end]
+        if token.kind is TokenKind.PUNCTUATOR and self._declaration.paren_depth == 0:
+            match text:
+                case ";":
+                    if not self._declaration.tokens:
+                        self._pending_comment = None # An empty declaration
+                    self._finish_declaration(scope)
+                    return
+                case "," if scope is _Scope.ENUM:
+                    self._finish_declaration(scope)
+                    return
+                case "{":
+                    self._open_scope(scope)
+                    return
+                case "}":
+                    self._close_scope(scope, token)
+                    return
+                case _:
+                    pass
+
+        declaration = self._declaration
+        if not declaration.tokens:
+            declaration.leading_comment = self._take_pending_comment()
+        declaration.tokens.append(token)
+        if token.kind is TokenKind.PUNCTUATOR:
+            match text:
+                case "(" | "[":
+                    declaration.paren_depth += 1
+                case ")" | "]":
+                    declaration.paren_depth -= 1
+                case _:
+                    pass
+
+    def finish(self) -> None:
+        if self._comment_run:
+            self._finish_comment_run()
+        self._finished = True
+
+    def has_ready_comments(self) -> bool:
+        return bool(self._emitted)
+
+    def take_ready_comments(self) -> Iterator[Comment[CType]]:
+        """Yields the emitted comments that start before every comment that can still be emitted."""
+        frontier = self._get_frontier()
+        emitted = self._emitted
+        while emitted and emitted[0][0] < frontier:
+            yield heapq.heappop(emitted)[2]
+
+    def _get_frontier(self) -> float:
+        if self._finished:
+            return float("inf")
+        starts = [d.leading_comment.start for d in self._outer_declarations if d.leading_comment is not None]
+        if self._declaration.leading_comment is not None:
+            starts.append(self._declaration.leading_comment.start)
+        if self._pending_comment is not None:
+            starts.append(self._pending_comment.start)
+        if self._comment_run:
+            starts.append(self._comment_run[0].start)
+        return min(starts, default=float("inf"))
+
+    def _feed_skipped(self, token: Token) -> None:
+        if token.kind is not TokenKind.PUNCTUATOR:
+            return
+        match self.code[token.start:token.end]:
+            case "{":
+                self._scopes.append(_Scope.SKIPPED)
+                self._outer_declarations.append(_Declaration()) # Restored by the matching "}"
+            case "}":
+                self._scopes.pop()
+                self._restore_outer_declaration()
+                if self._scopes[-1] is not _Scope.SKIPPED and self._declaration.initializer:
+                    self._declaration.tokens.append(token) # The symbol ends after the initializer
+            case _:
+                pass
+
+    def _finish_comment_run(self) -> None:
+        run = self._comment_run
+        self._comment_run = []
+        groups = list(find_comments_connected_with_ranges(self.code, run[0].start, run[-1].end))
+        previous_end = self._last_token_end
+        for i, (ranges, _) in enumerate(groups):
+            # Member comment pieces (e.g. "/**< ... */") at the start of a group are after a symbol
+            member_count = 0
+            while member_count < len(ranges) and self.code.startswith(_MEMBER_START_DELIMITERS, ranges[member_count].start):
+                member_count += 1
+            if member_count > 0:
+                self._attach_trailing_comment(Range(ranges[0].start, ranges[member_count-1].end))
+                previous_end = ranges[member_count-1].end
+            if member_count < len(ranges) and i == len(groups) - 1:
+                comment_start = ranges[member_count].start
+                # A leading comment must start its line (except at the start of the code)
+                if previous_end == 0 or self.code.find("\n", previous_end, comment_start) != -1:
+                    self._pending_comment = Range(comment_start, ranges[-1].end)
+            previous_end = ranges[-1].end
+
+    def _attach_trailing_comment(self, comment_range: Range) -> None:
+        if self._scopes[-1] is _Scope.SKIPPED:
+            return
+        tokens = self._declaration.tokens
+        if tokens and self._scopes[-1] is _Scope.ENUM: # e.g. the last enum constant "A /**< a */ }"
+            symbol_range = Range(tokens[0].start, tokens[-1].end)
+            symbol_type = CType.ENUM_CONSTANT
+        elif not tokens and self._last_symbol is not None:
+            symbol_range, symbol_type = self._last_symbol
+            self._last_symbol = None # A symbol has at most one trailing comment
+        else:
+            return
+        if self.code.find("\n", symbol_range.end, comment_range.start) == -1:
+            self._emit(comment_range, symbol_range, symbol_type)
+
+    def _take_pending_comment(self) -> Range | None:
+        comment_range = self._pending_comment
+        self._pending_comment = None
+        return comment_range
+
+    def _finish_declaration(self, scope: _Scope) -> None:
+        declaration = self._declaration
+        self._declaration = _Declaration()
+        if not declaration.tokens:
+            return
+        symbol_end, symbol_type = self._classify(declaration.tokens, scope)
+        symbol_range = Range(declaration.tokens[0].start, symbol_end)
+        if declaration.leading_comment is not None:
+            self._emit(declaration.leading_comment, symbol_range, symbol_type)
+        self._last_symbol = (symbol_range, symbol_type)
+
+    def _open_scope(self, scope: _Scope) -> None:
+        declaration = self._declaration
+        tokens = declaration.tokens
+        texts = [self.code[t.start:t.end] for t in tokens]
+        new_scope: _Scope
+        if scope is _Scope.ENUM or "=" in texts:
+            new_scope = _Scope.SKIPPED # Initializer
+            declaration.initializer = "=" in texts
+        elif texts[:1] == ["extern"] and len(tokens) == 2 and tokens[1].kind is TokenKind.STRING:
+            new_scope = _Scope.FILE # extern "C" { ... }
+        elif (keyword_index := self._find_record_keyword(texts)) is not None:
+            record_type = _RECORD_KEYWORDS[texts[keyword_index]]
+            new_scope = _Scope.ENUM if record_type is CType.ENUM else _Scope.RECORD
+            declaration.record = (tokens[keyword_index].start, record_type) # The comment is emitted by the matching "}"
+        elif tokens and texts[-1] == ")":
+            new_scope = _Scope.SKIPPED # Function body
+            if declaration.leading_comment is not None:
+                self._emit(declaration.leading_comment, Range(tokens[0].start, tokens[-1].end), CType.FUNCTION)
+            self._declaration = _Declaration()
+            self._last_symbol = (Range(tokens[0].start, tokens[-1].end), CType.FUNCTION)
+            self._scopes.append(new_scope)
+            self._outer_declarations.append(_Declaration())
+            return
+        else:
+            new_scope = _Scope.SKIPPED
+        self._scopes.append(new_scope)
+        self._outer_declarations.append(declaration)
+        self._declaration = _Declaration()
+        self._last_symbol = None
+
+    def _close_scope(self, scope: _Scope, token: Token) -> None:
+        if len(self._scopes) == 1:
+            return # Unbalanced "}"
+        if scope is _Scope.ENUM:
+            self._finish_declaration(scope)
+        self._pending_comment = None
+        self._scopes.pop()
+        self._restore_outer_declaration()
+        declaration = self._declaration
+        if declaration.record is not None and declaration.leading_comment is not None:
+            # The rest of the declaration (e.g. the name of a typedef) has no comment
+            record_start, record_type = declaration.record
+            self._emit(declaration.leading_comment, Range(record_start, token.end), record_type)
+            declaration.leading_comment = None
+
+    def _restore_outer_declaration(self) -> None:
+        if self._outer_declarations:
+            self._declaration = self._outer_declarations.pop()
+        self._last_symbol = None
+
+    def _classify(self, tokens: list[Token], scope: _Scope) -> tuple[int, CType]:
+        """Returns the end index of the symbol and its type."""
+        texts = [self.code[t.start:t.end] for t in tokens]
+        if scope is _Scope.ENUM:
+            return tokens[-1].end, CType.ENUM_CONSTANT
+        if texts[0] == "typedef":
+            return tokens[-1].end, CType.TYPEDEF
+        signature_end = self._find_function_signature_end(tokens, texts)
+        if signature_end is not None:
+            return signature_end, CType.FUNCTION
+        keyword_index = self._find_record_keyword(texts)
+        if keyword_index is not None and len(texts) <= 3:
+            return tokens[-1].end, _RECORD_KEYWORDS[texts[keyword_index]] # Forward declaration, e.g. "struct S;"
+        if scope is _Scope.RECORD:
+            return tokens[-1].end, CType.FIELD
+        return tokens[-1].end, CType.VARIABLE
+
+    @staticmethod
+    def _find_function_signature_end(tokens: list[Token], texts: list[str]) -> int | None:
+        # The first "(" must follow an identifier and must not be "(*" (function pointer)
+        for i, text in enumerate(texts):
+            match text:
+                case "(":
+                    if (i == 0 or tokens[i-1].kind is not TokenKind.IDENTIFIER
+                        or (i + 1 < len(texts) and texts[i+1] == "*")):
+                        return None
+                    # Find the matching ")"
+                    depth = 0
+                    for j in range(i + 1, len(texts)):
+                        match texts[j]:
+                            case "(":
+                                depth += 1
+                            case ")" if depth == 0:
+                                return tokens[j].end
+                            case ")":
+                                depth -= 1
+                            case _:
+                                pass
+                    return None
+                case "=" | "[":
+                    return None
+                case _:
+                    pass
+        return None
+
+    @staticmethod
+    def _find_record_keyword(texts: list[str]) -> int | None:
+        # Returns the index of "struct", "union" or "enum" after the storage class and qualifiers
+        for i, text in enumerate(texts):
+            if text in _RECORD_KEYWORDS:
+                return i
+            if text not in {"typedef", "static", "const", "volatile", "extern"}:
+                return None
+        return None
+
+    def _emit(self, comment_range: Range, symbol_range: Range, symbol_type: CType) -> None:
+        comment = Comment.from_source(
+            self.code,
+            comment_range,
+            symbol_range,
+            symbol_type,
+            _get_symbol_indentation(self.code, symbol_range.start)
+        )
+        heapq.heappush(self._emitted, (comment_range.start, self._emitted_count, comment))
+        self._emitted_count += 1
+
+
+def _get_symbol_indentation(code: str, symbol_start: int) -> str:
+    line_start = code.rfind("\n", 0, symbol_start)
+    indent = code[line_start+1:symbol_start]
+    if not indent.isspace():
+        return ""
+    return indent
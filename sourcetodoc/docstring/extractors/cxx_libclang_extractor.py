@@ -1,10 +1,13 @@
-from typing import Mapping, override
+from typing import ClassVar, Mapping, Sequence, override
 
 from clang.cindex import Cursor, CursorKind, TranslationUnit
 
+from ...libclang_util import pruned_kind_ids_for
 from ..extractor import Extractor, Comment
 from .cxx_type import CXXType
+from .doc_coverage import DocCoverage
 from .libclang_extractor import LibclangExtractor
+from .libclang_stats import LibclangStats
 
 
 class CXXLibclangExtractor(Extractor[CXXType]):
@@ -12,6 +15,9 @@ class CXXLibclangExtractor(Extractor[CXXType]):
     Extracts comments from C++ source code that are associated with
     symbols.
     """
+    parse_args: ClassVar[Sequence[str]] = ("-fparse-all-comments",)
+    parse_options: ClassVar[int] = TranslationUnit.PARSE_SKIP_FUNCTION_BODIES | TranslationUnit.PARSE_INCOMPLETE
+
     type_map: Mapping[CursorKind, CXXType] = {
         CursorKind.DESTRUCTOR: CXXType.DESTRUCTOR,
         CursorKind.CXX_ACCESS_SPEC_DECL: CXXType.ACCESS_SPECIFIER,
@@ -28,16 +34,39 @@ class CXXLibclangExtractor(Extractor[CXXType]):
         CursorKind.FIELD_DECL: CXXType.FIELD,
     }
 
-    def __init__(self) -> None:
+    def __init__(self, bulk: bool = True, coverage: bool = False) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        bulk : bool, optional
+            See `LibclangExtractor`, by default True.
+        coverage : bool, optional
+            See `LibclangExtractor`, by default False.
+        """
         self.extractor = LibclangExtractor(
             self.__class__._translation_unit_from_source,
-            self.__class__._get_type
+            self.__class__._get_type,
+            bulk,
+            coverage,
+            pruned_kind_ids_for(self.__class__.parse_options)
         )
 
     @override
     def extract_comments(self, code: str) -> list[Comment[CXXType]]:
         return self.extractor.extract_comments(code)
 
+    @property
+    def last_stats(self) -> LibclangStats | None:
+        """Statistics of the last call of `extract_comments`."""
+        return self.extractor.last_stats
+
+    @property
+    def last_coverage(self) -> DocCoverage | None:
+        """Documentation coverage of the last call of `extract_comments`, if enabled."""
+        return self.extractor.last_coverage
+
     @classmethod
     def _translation_unit_from_source(cls, code: str) -> TranslationUnit:
         fake_path = "unsaved.cpp"
@@ -45,9 +74,9 @@ class CXXLibclangExtractor(Extractor[CXXType]):
 
         tu: TranslationUnit = TranslationUnit.from_source(  # type: ignore
             fake_path,
-            ["-fparse-all-comments"],
+            list(cls.parse_args),
             unsaved_files=unsaved,
-            options=TranslationUnit.PARSE_SKIP_FUNCTION_BODIES | TranslationUnit.PARSE_INCOMPLETE,
+            options=cls.parse_options,
         )
         return tu
 
@@ -0,0 +1,139 @@
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from html import escape
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+# Symbol types that are not counted, e.g. "public:" in C++
+IGNORED_TYPE_NAMES: frozenset[str] = frozenset(("UNKNOWN", "ACCESS_SPECIFIER"))
+
+
+@dataclass
+class DocCoverage:
+    """Number of documented and undocumented public symbols by symbol type name (e.g. `CType.FUNCTION.name`)."""
+    documented: Counter[str] = field(default_factory=Counter)
+    undocumented: Counter[str] = field(default_factory=Counter)
+
+    def add(self, type_name: str, is_documented: bool) -> None:
+        if is_documented:
+            self.documented[type_name] += 1
+        else:
+            self.undocumented[type_name] += 1
+
+    def merge(self, other: "DocCoverage") -> None:
+        """Adds the counts of `other` to this object."""
+        self.documented.update(other.documented)
+        self.undocumented.update(other.undocumented)
+
+    @property
+    def documented_count(self) -> int:
+        return self.documented.total()
+
+    @property
+    def total_count(self) -> int:
+        return self.documented.total() + self.undocumented.total()
+
+    @property
+    def ratio(self) -> float:
+        """The fraction of documented symbols, 1.0 if there are no symbols."""
+        total = self.total_count
+        return self.documented_count / total if total else 1.0
+
+    def to_dict(self) -> dict[str, Any]:
+        type_names = sorted(self.documented.keys() | self.undocumented.keys())
+        return {
+            "documented": self.documented_count,
+            "total": self.total_count,
+            "ratio": self.ratio,
+            "types": {
+                name: {"documented": self.documented[name], "total": self.documented[name] + self.undocumented[name]}
+                for name in type_names
+            },
+        }
+
+
+class DocCoverageReport:
+    """Collects `DocCoverage` per file and aggregates it per directory."""
+
+    def __init__(self) -> None:
+        self.files: dict[str, DocCoverage] = {}
+
+    def add(self, file: Path, coverage: DocCoverage) -> None:
+        self.files[str(file)] = coverage
+
+    def total(self) -> DocCoverage:
+        return _merged(self.files.values())
+
+    def by_directory(self) -> dict[str, DocCoverage]:
+        directories: dict[str, DocCoverage] = {}
+        for file, coverage in self.files.items():
+            directories.setdefault(str(Path(file).parent), DocCoverage()).merge(coverage)
+        return dict(sorted(directories.items()))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "total": self.total().to_dict(),
+            "directories": {directory: c.to_dict() for directory, c in self.by_directory().items()},
+            "files": {file: c.to_dict() for file, c in sorted(self.files.items())},
+        }
+
+    def summary(self) -> str:
+        """Returns a text with the documented fraction of public symbols per type."""
+        total = self.total()
+        lines = [f"Documentation coverage: {total.documented_count}/{total.total_count} public symbols ({total.ratio:.1%})"]
+        for name, counts in total.to_dict()["types"].items():
+            lines.append(f"  {name:<20} {counts["documented"]:>8}/{counts["total"]}")
+        return "\n".join(lines)
+
+    def write(self, out_dir: Path) -> None:
+        """Writes "coverage.json" and "coverage.html" to `out_dir`."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "coverage.json").write_text(json.dumps(self.to_dict(), indent=2))
+        (out_dir / "coverage.html").write_text(self._html())
+
+    def _html(self) -> str:
+        total = self.total()
+        type_rows = {name: _type_coverage(total, name) for name in sorted(total.documented.keys() | total.undocumented.keys())}
+        parts = [
+            "<!DOCTYPE html>",
+            "<html><head><meta charset=\"utf-8\"><title>Documentation coverage</title><style>",
+            "body{font-family:sans-serif} table{border-collapse:collapse;margin-bottom:2em}",
+            "td,th{border:1px solid #ccc;padding:2px 8px;text-align:right} td:first-child{text-align:left}",
+            ".bar{background:#e33;width:120px;height:10px} .bar div{background:#3a3;height:10px}",
+            "</style></head><body>",
+            f"<h1>Documentation coverage: {total.ratio:.1%}</h1>",
+            "<h2>Symbol types</h2>",
+            _html_table("Type", type_rows),
+            "<h2>Directories</h2>",
+            _html_table("Directory", self.by_directory()),
+            "<h2>Files</h2>",
+            _html_table("File", dict(sorted(self.files.items()))),
+            "</body></html>",
+        ]
+        return "\n".join(parts) + "\n"
+
+
+def _merged(coverages: Iterable[DocCoverage]) -> DocCoverage:
+    result = DocCoverage()
+    for coverage in coverages:
+        result.merge(coverage)
+    return result
+
+
+def _type_coverage(coverage: DocCoverage, type_name: str) -> DocCoverage:
+    return DocCoverage(
+        Counter({type_name: coverage.documented[type_name]}),
+        Counter({type_name: coverage.undocumented[type_name]})
+    )
+
+
+def _html_table(title: str, rows: Mapping[str, DocCoverage]) -> str:
+    lines = [f"<table><tr><th>{escape(title)}</th><th>Documented</th><th>Total</th><th>Coverage</th><th></th></tr>"]
+    for name, coverage in rows.items():
+        lines.append(
+            f"<tr><td>{escape(name)}</td><td>{coverage.documented_count}</td><td>{coverage.total_count}</td>"
+            f"<td>{coverage.ratio:.1%}</td><td><div class=\"bar\"><div style=\"width:{coverage.ratio:.1%}\"></div></div></td></tr>"
+        )
+    lines.append("</table>")
+    return "\n".join(lines)
@@ -1,13 +1,30 @@
-from typing import Callable
+from bisect import bisect_left, bisect_right
+from time import perf_counter
+from typing import AbstractSet, Callable
 
-from clang.cindex import Cursor, TranslationUnit
+from clang.cindex import (AccessSpecifier, Cursor, CursorKind, LinkageKind,
+                          SourceRange, TranslationUnit)
 
 from ...common.helpers import IndexFinder
 from ...libclang_util import (clang_get_comment_range,
-                              walk_preorder_only_main_file)
-from ..comment_parsing import find_comments_connected
+                              clang_location_is_from_main_file,
+                              clang_range_is_null, collect_main_file_cursors)
+from ..comment_parsing import (find_comments_connected,
+                               find_comments_connected_with_ranges)
 from ..extractor import Comment, Extractor
 from ..range import Range
+from .doc_coverage import IGNORED_TYPE_NAMES, DocCoverage
+from .libclang_stats import LibclangStats
+
+# Types whose members without linkage (e.g. typedefs) are public if the type has external linkage
+_RECORD_KINDS: frozenset[CursorKind] = frozenset((
+    CursorKind.STRUCT_DECL,
+    CursorKind.UNION_DECL,
+    CursorKind.CLASS_DECL,
+    CursorKind.ENUM_DECL,
+    CursorKind.CLASS_TEMPLATE,
+    CursorKind.CLASS_TEMPLATE_PARTIAL_SPECIALIZATION,
+))
 
 
 class LibclangExtractor[T](Extractor[T]):
@@ -16,7 +33,10 @@ class LibclangExtractor[T](Extractor[T]):
     def __init__(
             self,
             translation_unit_from_code: Callable[[str],TranslationUnit],
-            get_type: Callable[[Cursor], T]
+            get_type: Callable[[Cursor], T],
+            bulk: bool = True,
+            coverage: bool = False,
+            pruned_kind_ids: AbstractSet[int] | None = None
         ) -> None:
         """
         Creates a new object.
@@ -27,10 +47,29 @@ class LibclangExtractor[T](Extractor[T]):
             Function that creates a translation unit from source code.
         get_type : Callable[[Cursor], T]
             Function that maps `Cursor` to `Comment.symbol_type`.
+        bulk : bool, optional
+            If set to True, all comments of the code are scanned once and
+            attached to the cursors by binary search, else every comment
+            is fetched and scanned separately, by default True. In both modes,
+            the comment range of every cursor is fetched with one FFI call
+            (`clang_Cursor_getCommentRange`), but bulk mode does not fetch
+            `raw_comment` for documented cursors.
+        coverage : bool, optional
+            If set to True, the documented and undocumented public symbols
+            are counted during the traversal, by default False.
+        pruned_kind_ids : AbstractSet[int] | None, optional
+            Ids of cursor kinds whose subtrees are not visited, by default
+            `PRUNED_KIND_IDS`. Use `pruned_kind_ids_for` to prune
+            statements and expressions if function bodies are skipped.
         """
 
         self._translation_unit_from_code = translation_unit_from_code
         self._get_type = get_type
+        self._bulk = bulk
+        self._coverage = coverage
+        self._pruned_kind_ids = pruned_kind_ids
+        self.last_stats: LibclangStats | None = None # Statistics of the last call of extract_comments
+        self.last_coverage: DocCoverage | None = None # Documentation coverage of the last call of extract_comments
 
     def extract_comments(self, code: str) -> list[Comment[T]]:
         """
@@ -39,6 +78,9 @@ class LibclangExtractor[T](Extractor[T]):
         - `self.translation_unit_from_code` maps `code` to a `TranslationUnit` object.
         - `self.get_type` maps `Cursor` to `Comment.symbol_type`.
 
+        Timings, node counts and diagnostics are stored in `self.last_stats`.
+        If `coverage` was set, the documentation coverage is stored in `self.last_coverage`.
+
         Parameters
         ----------
         code : str
@@ -49,25 +91,54 @@ class LibclangExtractor[T](Extractor[T]):
         list[Comment[T]]
             The extracted comments with pairwise disjoint
             `comment_range` in ascending order.
-        
+
         Raises
         ------
         RuntimeError
             If the extracted indices do not match the actual indices of a comment.
         """
         index_finder = IndexFinder(code)
+        stats = LibclangStats()
+        self.last_stats = stats
 
+        parse_start = perf_counter()
         tu: TranslationUnit = self._translation_unit_from_code(code)
+        traversal_start = perf_counter()
+        stats.parse_seconds = traversal_start - parse_start
+        stats.add_diagnostics(tu)
+
+        comment_index = _CommentIndex(code) if self._bulk else None
+        coverage = DocCoverage() if self._coverage else None
+        self.last_coverage = coverage
 
         comments: list[Comment[T]] = []
         comment_ranges: set[Range] = set()
-        for node in walk_preorder_only_main_file(tu.cursor):
-            comment_text: str | None = node.raw_comment
-            if comment_text is None:
+        nodes = collect_main_file_cursors(tu.cursor, self._pruned_kind_ids)
+        stats.node_count = len(nodes)
+        for node in nodes:
+            # In bulk mode only the comment range is fetched (no raw_comment string), which is still one FFI call per cursor
+            comment_text: str | None = None
+            comment_source_range: SourceRange | None = None
+            if comment_index is not None:
+                comment_source_range = clang_get_comment_range(node)
+                is_documented = not clang_range_is_null(comment_source_range)
+            else:
+                comment_text = node.raw_comment
+                is_documented = comment_text is not None
+            if is_documented and not clang_location_is_from_main_file(node.location):
+                # Only top-level cursors are tested during the traversal, so this cursor may come
+                # from a file included inside a declaration
                 continue
+            if coverage is not None:
+                self._add_coverage(coverage, node, is_documented)
+            if not is_documented:
+                continue
+            stats.commented_node_count += 1
             try:
-                symbol_start = index_finder.find_index(node.extent.start.line, node.extent.start.column)
-                symbol_end = index_finder.find_index(node.extent.end.line, node.extent.end.column)
+                extent = node.extent
+                extent_start, extent_end = extent.start, extent.end # Each location fetches its line and column at once
+                symbol_start = index_finder.find_index(extent_start.line, extent_start.column)
+                symbol_end = index_finder.find_index(extent_end.line, extent_end.column)
                 if symbol_start is None or symbol_end is None:
                     raise ValueError("No index was found")
             except ValueError:
@@ -76,36 +147,35 @@ class LibclangExtractor[T](Extractor[T]):
                 symbol_end = symbol_start + len(node.displayname)
 
             symbol_range = Range(symbol_start, symbol_end)
-            symbol_text: str = code[symbol_range.start:symbol_range.end]
             symbol_indentation = self.__class__._get_symbol_indentation(code, symbol_range.start)
             symbol_type = self._get_type(node)
 
-            comment_source_range = clang_get_comment_range(node)
-            comment_start = index_finder.find_index(comment_source_range.start.line, comment_source_range.start.column)
-            comment_end = index_finder.find_index(comment_source_range.end.line, comment_source_range.end.column)
+            if comment_source_range is None:
+                comment_source_range = clang_get_comment_range(node)
+            comment_start_location, comment_end_location = comment_source_range.start, comment_source_range.end
+            comment_start = index_finder.find_index(comment_start_location.line, comment_start_location.column)
+            comment_end = index_finder.find_index(comment_end_location.line, comment_end_location.column)
             comment_range = Range(comment_start, comment_end)
 
             if comment_range in comment_ranges: # Prevent duplicate comments
                 continue
 
-            # To be safe, check if comment_range matches comment_text
-            comment_text_by_range = code[comment_range.start:comment_range.end]
-            if comment_text_by_range != comment_text:
-                raise RuntimeError(f"The extracted indices do not match the actual indices of a comment:"
-                      f"\n\"{comment_text}\" (getting the comment with libclang directly)"
-                      f"\n!=\n\"{comment_text_by_range}\" (getting the comment with indices: {comment_range}")
-
             # Get only the last connected comment
-            found_comments = tuple(find_comments_connected(code, comment_start, comment_end))
-            if not found_comments:
-                raise RuntimeError("The comment cannot be parsed")
-            last_comment_range, _ = found_comments[-1]
-            last_comment_text = code[last_comment_range.start:last_comment_range.end]
-
-            comment = Comment(
-                last_comment_text,
+            last_comment_range = None
+            if comment_index is not None and self.__class__._has_byte_length(
+                    code, comment_range, comment_end_location.offset - comment_start_location.offset):
+                last_comment_range = comment_index.find_last_connected(comment_range)
+            if last_comment_range is None:
+                # The comment is not aligned with the scanned comments or its length does not match
+                # the offsets of libclang, so scan it separately and compare it with raw_comment
+                if comment_text is None:
+                    comment_text = node.raw_comment
+                last_comment_range = self.__class__._find_last_connected(code, comment_range, comment_text)
+
+            # The texts are sliced from code on access, so nested symbols are not copied
+            comment = Comment.from_source(
+                code,
                 last_comment_range,
-                symbol_text,
                 symbol_range,
                 symbol_type,
                 symbol_indentation
@@ -113,8 +183,55 @@ class LibclangExtractor[T](Extractor[T]):
             comments.append(comment)
             comment_ranges.add(comment_range)
         comments.sort(key=lambda x: x.comment_range.start)
+        stats.traversal_seconds = perf_counter() - traversal_start
         return comments
 
+    def _add_coverage(self, coverage: DocCoverage, node: Cursor, is_documented: bool) -> None:
+        type_name: str = self._get_type(node).name # type: ignore
+        if type_name in IGNORED_TYPE_NAMES:
+            return
+        # Only public symbols: no private or protected members and no symbols
+        # without external linkage (e.g. static functions or local variables)
+        if node.access_specifier in (AccessSpecifier.PRIVATE, AccessSpecifier.PROTECTED):
+            return
+        if not self._is_public_linkage(node):
+            return
+        coverage.add(type_name, is_documented)
+
+    @staticmethod
+    def _is_public_linkage(node: Cursor) -> bool:
+        linkage = node.linkage
+        if linkage == LinkageKind.EXTERNAL:
+            # Except anonymous namespaces, whose members have internal linkage
+            return node.kind != CursorKind.NAMESPACE or node.spelling != ""
+        if linkage not in (LinkageKind.NO_LINKAGE, LinkageKind.INVALID):
+            return False # Internal or unique external linkage (e.g. in an anonymous namespace)
+        # Symbols that never have linkage (e.g. typedefs and macros) are public outside of functions
+        parent = node.semantic_parent
+        if parent is None or parent.kind in (CursorKind.TRANSLATION_UNIT, CursorKind.NAMESPACE, CursorKind.LINKAGE_SPEC):
+            return True
+        return parent.kind in _RECORD_KINDS and parent.linkage == LinkageKind.EXTERNAL
+
+    @staticmethod
+    def _has_byte_length(code: str, range: Range, byte_length: int) -> bool:
+        # Checks the indices computed from lines and columns without fetching raw_comment
+        return len(code[range.start:range.end].encode("utf-8", "surrogatepass")) == byte_length
+
+    @staticmethod
+    def _find_last_connected(code: str, comment_range: Range, comment_text: str | None) -> Range:
+        # To be safe, check if comment_range matches comment_text
+        comment_text_by_range = code[comment_range.start:comment_range.end]
+        if comment_text_by_range != comment_text:
+            raise RuntimeError(f"The extracted indices do not match the actual indices of a comment:"
+                    f"\n\"{comment_text}\" (getting the comment with libclang directly)"
+                    f"\n!=\n\"{comment_text_by_range}\" (getting the comment with indices: {comment_range}")
+
+        found_comments = tuple(find_comments_connected(code, comment_range.start, comment_range.end))
+        if not found_comments:
+            raise RuntimeError("The comment cannot be parsed")
+        last_comment_range, _ = found_comments[-1]
+        return last_comment_range
+
     @staticmethod
     def _get_comment_range_by_offset(cursor: Cursor) -> Range:
         # Warning: cursor.extent.start/end.offset does/did not always correspond to a start/end index of a string in Python.
@@ -131,3 +248,47 @@ class LibclangExtractor[T](Extractor[T]):
         if not indent.isspace():
             return ""
         return indent
+
+
+class _CommentIndex:
+    """
+    Comment pieces of a whole source file, found with a single scan.
+
+    The pieces are stored in sorted offset arrays, so the comments
+    reported by libclang can be looked up by binary search.
+    """
+
+    def __init__(self, code: str) -> None:
+        starts: list[int] = []
+        ends: list[int] = []
+        group_firsts: list[int] = [] # group_firsts[i] is the index of the first piece connected with piece i
+        for ranges, _ in find_comments_connected_with_ranges(code):
+            first = len(starts)
+            for range in ranges:
+                starts.append(range.start)
+                ends.append(range.end)
+                group_firsts.append(first)
+        self._starts = starts
+        self._ends = ends
+        self._group_firsts = group_firsts
+
+    def find_last_connected(self, comment_range: Range) -> Range | None:
+        """
+        Returns the range of the last connected comment inside of `comment_range`.
+
+        The result is the same as the last result of `find_comments_connected`
+        restricted to `comment_range`.
+
+        Returns
+        -------
+        Range | None
+            The range, or None if `comment_range` does not start and end
+            at the boundaries of scanned comment pieces.
+        """
+        first = bisect_left(self._starts, comment_range.start)
+        if first == len(self._starts) or self._starts[first] != comment_range.start:
+            return None
+        last = bisect_right(self._ends, comment_range.end) - 1
+        if last < first or self._ends[last] != comment_range.end:
+            return None
+        return Range(self._starts[max(first, self._group_firsts[last])], self._ends[last])
@@ -0,0 +1,67 @@
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from clang.cindex import TranslationUnit
+
+# Names of the values of Diagnostic.severity
+_SEVERITY_NAMES: tuple[str, ...] = ("ignored", "note", "warning", "error", "fatal")
+
+_MISSING_INCLUDE_SUFFIX: str = "file not found"
+
+
+@dataclass
+class LibclangStats:
+    """Statistics of a single extraction with libclang."""
+    parse_seconds: float = 0.0 # Wall time to create the translation unit
+    traversal_seconds: float = 0.0 # Wall time to traverse the AST and to attach comments
+    node_count: int = 0 # Number of visited cursors in the main file
+    commented_node_count: int = 0 # Number of visited cursors with a comment
+    diagnostics: dict[str, int] = field(default_factory=dict) # Number of diagnostics by severity name
+    missing_includes: list[str] = field(default_factory=list) # Includes that were not found
+
+    def add_diagnostics(self, tu: TranslationUnit) -> None:
+        """Counts the diagnostics of `tu` by severity and collects missing includes."""
+        for diagnostic in tu.diagnostics:
+            severity: int = diagnostic.severity # type: ignore
+            name = _SEVERITY_NAMES[severity] if 0 <= severity < len(_SEVERITY_NAMES) else str(severity)
+            self.diagnostics[name] = self.diagnostics.get(name, 0) + 1
+            spelling: str = diagnostic.spelling # type: ignore
+            if spelling.endswith(_MISSING_INCLUDE_SUFFIX): # e.g. "'a.h' file not found"
+                self.missing_includes.append(spelling.removesuffix(_MISSING_INCLUDE_SUFFIX).strip().strip("'"))
+
+
+class LibclangStatsReport:
+    """Collects `LibclangStats` per file."""
+
+    def __init__(self) -> None:
+        self.files: dict[str, LibclangStats] = {}
+
+    def add(self, file: Path, stats: LibclangStats) -> None:
+        self.files[str(file)] = stats
+
+    def slowest(self, count: int) -> list[tuple[str, LibclangStats]]:
+        """Returns at most `count` files with the largest parse and traversal time in descending order."""
+        return sorted(
+            self.files.items(),
+            key=lambda e: e[1].parse_seconds + e[1].traversal_seconds,
+            reverse=True
+        )[:count]
+
+    def summary(self, count: int = 10) -> str:
+        """Returns a text with the total times and the slowest files."""
+        parse_seconds = sum(s.parse_seconds for s in self.files.values())
+        traversal_seconds = sum(s.traversal_seconds for s in self.files.values())
+        missing_includes = sum(len(s.missing_includes) for s in self.files.values())
+        lines = [
+            f"libclang: {len(self.files)} files parsed in {parse_seconds:.2f} s, traversed in {traversal_seconds:.2f} s, "
+            f"{missing_includes} missing includes"
+        ]
+        for file, stats in self.slowest(count):
+            lines.append(f"  {stats.parse_seconds + stats.traversal_seconds:8.3f} s  {file}")
+        return "\n".join(lines)
+
+    def write_json(self, path: Path) -> None:
+        """Writes the statistics of every file to `path`."""
+        data = {file: asdict(stats) for file, stats in self.files.items()}
+        path.write_text(json.dumps(data, indent=2))
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import Callable, Iterable, Iterator
 
 from .comment_styler import CommentStyler
+from .document import Document
 from .range import Range
 from .replace import Replace
 
@@ -12,6 +13,7 @@ class CommentReplacement:
     indentation: str
     old_comment: str
     new_comment: str
+    old_parsed: CommentStyler | None = None # Parsed old_comment (e.g. Comment.parsed), parsed again if None
 
 
 @dataclass(frozen=True)
@@ -45,18 +47,35 @@ class Replacer:
         ValueError
             If `comment_replacements` is not in ascending order without overlap by `range`.
         """
-        new_comment_func: Callable[[CommentReplacement], str]
-        match replace:
-            case Replace.REPLACE_OLD_COMMENTS:
-                new_comment_func = cls._new_comment_text
-            case Replace.APPEND_TO_OLD_COMMENTS:
-                new_comment_func = cls._old_new_concatenated
-            case Replace.APPEND_TO_OLD_COMMENTS_INLINE:
-                new_comment_func = cls._old_new_concatenated_same_block
-
+        new_comment_func = cls._get_new_comment_func(replace)
         text_replacements = (TextReplacement(e.range, new_comment_func(e)) for e in comment_replacements)
         return cls.replace_text(code, text_replacements)
 
+    @classmethod
+    def replace_comments_in_document(
+        cls,
+        document: Document,
+        comment_replacements: Iterable[CommentReplacement],
+        replace: Replace
+        ) -> None:
+        """
+        Replaces old comments in `document` with new comments given by `comment_replacements` and `replace`.
+
+        The ranges of `comment_replacements` refer to `document.original`, so the
+        comments of a single extraction can be replaced in several passes. A range
+        that was replaced by a previous pass is replaced again.
+
+        `comment_replacements` must be in ascending order without overlap by `range`.
+
+        Raises
+        ------
+        ValueError
+            If `comment_replacements` is not in ascending order without overlap by `range`,
+            or if a range overlaps with a different range of a previous pass.
+        """
+        new_comment_func = cls._get_new_comment_func(replace)
+        document.replace_all((e.range, new_comment_func(e)) for e in comment_replacements)
+
     @classmethod
     def replace_text(cls, text: str, text_replacements: Iterable[TextReplacement]) -> str:
         """
@@ -104,6 +123,16 @@ class Replacer:
             start = e.range.end
         yield text[start:]
 
+    @classmethod
+    def _get_new_comment_func(cls, replace: Replace) -> Callable[[CommentReplacement], str]:
+        match replace:
+            case Replace.REPLACE_OLD_COMMENTS:
+                return cls._new_comment_text
+            case Replace.APPEND_TO_OLD_COMMENTS:
+                return cls._old_new_concatenated
+            case Replace.APPEND_TO_OLD_COMMENTS_INLINE:
+                return cls._old_new_concatenated_same_block
+
     @classmethod
     def _new_comment_text(cls, replacement: CommentReplacement) -> str:
         return replacement.new_comment
@@ -114,7 +143,10 @@ class Replacer:
 
     @classmethod
     def _old_new_concatenated_same_block(cls, replacement: CommentReplacement) -> str:
-        match CommentStyler.parse_comment(replacement.old_comment):
+        old_parsed = replacement.old_parsed
+        if old_parsed is None:
+            old_parsed = CommentStyler.parse_comment(replacement.old_comment)
+        match old_parsed:
             case CommentStyler(old_content, _):
                 pass
             case None:
@@ -0,0 +1,206 @@
+import json
+import re
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+from .conversions.prompt_budget import estimate_tokens
+from .extractor import Comment
+
+_HEADER_SUFFIXES: frozenset[str] = frozenset((".h", ".hh", ".hpp", ".hxx"))
+
+# Symbol types that have internal linkage if they are declared "static" (unlike static members)
+_LINKAGE_TYPES: frozenset[str] = frozenset(("FUNCTION", "FUNCTION_TEMPLATE", "VARIABLE"))
+
+_STATIC_REGEX: re.Pattern[str] = re.compile(r"\bstatic\b")
+
+
+@dataclass(frozen=True)
+class PriorityWeights:
+    """The weights of the properties of a comment that add up to its priority."""
+    header: float = 100.0 # If the comment is in a header file, which is usually part of the public API
+    non_static: float = 10.0 # If the symbol is not a static function or variable
+    lines: float = 1.0 # Per line of the old comment
+
+    @classmethod
+    def parse(cls, text: str) -> "PriorityWeights":
+        """
+        Parses comma-separated `name=weight` pairs, e.g. "header=100,lines=0.5".
+        Missing weights have their default value.
+
+        Raises
+        ------
+        ValueError
+            If a pair is invalid or a name is unknown.
+        """
+        names = {field.name for field in fields(cls)}
+        weights: dict[str, float] = {}
+        for pair in text.split(","):
+            name, separator, value = pair.partition("=")
+            name = name.strip()
+            if not separator or name not in names:
+                raise ValueError(f"Invalid priority weight \"{pair}\", expected name=weight with a name of {", ".join(sorted(names))}")
+            weights[name] = float(value)
+        return cls(**weights)
+
+
+@dataclass(frozen=True)
+class BacklogItem:
+    """A comment that was not converted within the budget."""
+    file: Path
+    line: int # 1-based line of the comment
+    symbol: str # First line of the symbol text
+    priority: float
+    estimated_tokens: int
+
+
+class ConversionScheduler:
+    """
+    Orders the comments of a run by priority and stops the conversions when
+    a time or token budget is used up.
+
+    The priority of a comment is the sum of the `PriorityWeights` of its
+    properties. Comments are started in descending order of priority (in
+    the order of the files and comments for equal priorities) until the
+    budget is used up. Conversions that were started before are finished,
+    the other comments are added to the backlog.
+    """
+
+    def __init__(
+            self,
+            weights: PriorityWeights = PriorityWeights(),
+            max_seconds: float | None = None,
+            max_tokens: int | None = None,
+            spent_tokens: Callable[[], int] | None = None,
+            clock: Callable[[], float] = time.monotonic
+        ) -> None:
+        """
+        Creates a new object.
+
+        Parameters
+        ----------
+        weights : PriorityWeights, optional
+            The weights of the priority, by default `PriorityWeights()`.
+        max_seconds : float | None, optional
+            No conversion is started after this many seconds since `start`,
+            by default None (no limit).
+        max_tokens : int | None, optional
+            No conversion is started after this many tokens were spent,
+            by default None (no limit).
+        spent_tokens : Callable[[], int] | None, optional
+            Returns the tokens spent so far (e.g. reported by a LLM API).
+            By default None, then the tokens of the text of the started
+            comments and their symbols are estimated.
+        clock : Callable[[], float], optional
+            The clock in seconds, by default `time.monotonic`.
+
+        Raises
+        ------
+        ValueError
+            If a limit is not positive.
+        """
+        if max_seconds is not None and max_seconds <= 0:
+            raise ValueError(f"The time budget must be positive, got {max_seconds}")
+        if max_tokens is not None and max_tokens <= 0:
+            raise ValueError(f"The token budget must be positive, got {max_tokens}")
+        self.weights = weights
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.spent_tokens = spent_tokens
+        self.clock = clock
+        self.started = 0 # Conversions that were started
+        self.estimated_tokens = 0 # Of the started conversions
+        self.stop_reason: str | None = None
+        self.backlog: list[BacklogItem] = []
+        self._start_time: float | None = None
+
+    def start(self) -> None:
+        """Starts the time budget."""
+        self._start_time = self.clock()
+
+    def priority(self, file: Path, comment: Comment[Any]) -> float:
+        priority = comment.comment_text.count("\n") * self.weights.lines + self.weights.lines
+        if file.suffix in _HEADER_SUFFIXES:
+            priority += self.weights.header
+        if not self.is_static(comment):
+            priority += self.weights.non_static
+        return priority
+
+    def order(self, items: Sequence[tuple[Path, Comment[Any]]]) -> list[int]:
+        """Returns the indices of `items` in descending order of priority."""
+        priorities = [self.priority(file, comment) for file, comment in items]
+        return sorted(range(len(items)), key=lambda i: -priorities[i]) # Stable for equal priorities
+
+    def try_start(self, comment: Comment[Any]) -> bool:
+        """
+        Returns True and counts the conversion of `comment` as started if the
+        budget is not used up, otherwise False and sets `stop_reason`.
+        """
+        if self.stop_reason is not None:
+            return False
+        if self.max_seconds is not None and self._start_time is not None:
+            seconds = self.clock() - self._start_time
+            if seconds >= self.max_seconds:
+                self.stop_reason = f"the time budget of {self.max_seconds:g} s is used up"
+                return False
+        if self.max_tokens is not None and self.tokens() >= self.max_tokens:
+            self.stop_reason = f"the token budget of {self.max_tokens} tokens is used up"
+            return False
+        self.started += 1
+        self.estimated_tokens += self.estimate(comment)
+        return True
+
+    def tokens(self) -> int:
+        """Returns the tokens spent so far."""
+        return self.spent_tokens() if self.spent_tokens is not None else self.estimated_tokens
+
+    def add_to_backlog(self, file: Path, code: str, comment: Comment[Any]) -> None:
+        """Adds `comment` of `code` of `file` to the backlog."""
+        line = code.count("\n", 0, comment.comment_range.start) + 1
+        symbol = comment.symbol_text.strip().split("\n", 1)[0]
+        self.backlog.append(BacklogItem(file, line, symbol, self.priority(file, comment), self.estimate(comment)))
+
+    def summary(self) -> str:
+        message = f"Scheduler: {self.started} conversions started, {self.tokens()} tokens spent"
+        if self.stop_reason is None:
+            return message
+        message += f", stopped because {self.stop_reason}, {len(self.backlog)} comments remain"
+        by_file: dict[Path, int] = {}
+        for item in self.backlog:
+            by_file[item.file] = by_file.get(item.file, 0) + 1
+        for file, count in sorted(by_file.items(), key=lambda e: -e[1])[:5]:
+            message += f"\n  {count:>6} comments in \"{file}\""
+        return message
+
+    def write_backlog(self, path: Path) -> None:
+        """Writes the backlog in descending order of priority as JSON to `path`."""
+        data = {
+            "stop_reason": self.stop_reason,
+            "remaining_comments": len(self.backlog),
+            "estimated_tokens": sum(item.estimated_tokens for item in self.backlog),
+            "comments": [
+                {
+                    "file": str(item.file),
+                    "line": item.line,
+                    "symbol": item.symbol,
+                    "priority": item.priority,
+                    "estimated_tokens": item.estimated_tokens,
+                }
+                for item in self.backlog
+            ],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2))
+
+    @classmethod
+    def is_static(cls, comment: Comment[Any]) -> bool:
+        """Returns True if the symbol of `comment` is a static function or variable."""
+        if comment.symbol_type.name not in _LINKAGE_TYPES:
+            return False
+        declaration = comment.symbol_text.split("(", 1)[0].split("=", 1)[0]
+        return _STATIC_REGEX.search(declaration) is not None
+
+    @classmethod
+    def estimate(cls, comment: Comment[Any]) -> int:
+        return estimate_tokens(comment.comment_text) + estimate_tokens(comment.symbol_text)
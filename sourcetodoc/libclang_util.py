@@ -1,9 +1,14 @@
 import ctypes
-from typing import Iterator
+from typing import AbstractSet
 
-from clang.cindex import (Cursor, SourceLocation, SourceRange, conf,
+from clang.cindex import (Cursor, CursorKind, SourceLocation, SourceRange,
+                          TranslationUnit, _CXString, callbacks, conf,
                           register_function)
 
+# Return values of the visitor passed to clang_visitChildren (see CXChildVisitResult)
+_CHILD_VISIT_CONTINUE: int = 1
+_CHILD_VISIT_RECURSE: int = 2
+
 
 def clang_get_comment_range(cursor: Cursor) -> SourceRange:
     return conf.lib.clang_Cursor_getCommentRange(cursor)
@@ -13,12 +18,84 @@ def clang_location_is_from_main_file(location: SourceLocation) -> bool:
     return conf.lib.clang_Location_isFromMainFile(location) != 0
 
 
-def walk_preorder_only_main_file(node: Cursor) -> Iterator[Cursor]:
-    yield node
-    for child in node.get_children():
-        if clang_location_is_from_main_file(child.location):
-            for descendant in walk_preorder_only_main_file(child):
-                yield descendant
+def clang_range_is_null(source_range: SourceRange) -> bool:
+    return conf.lib.clang_Range_isNull(source_range) != 0
+
+
+def clang_get_version() -> str:
+    return conf.lib.clang_getClangVersion()
+
+
+def collect_main_file_cursors(
+        root: Cursor,
+        pruned_kind_ids: AbstractSet[int] | None = None
+    ) -> list[Cursor]:
+    """
+    Collects the descendants of `root` that are located in the main file in preorder.
+
+    The whole subtree is traversed with a single `clang_visitChildren` call.
+    Cursors whose kind is in `pruned_kind_ids` are skipped together with
+    their descendants. If `root` is a translation unit, only its children
+    are tested for being in the main file (one FFI call per top-level
+    cursor), so the subtrees of included files are skipped at once and
+    the descendants of main-file cursors are not tested again; these may
+    still come from a file included in the middle of a declaration. For
+    other roots, every cursor is tested. `root` itself is not part of the
+    result.
+
+    Parameters
+    ----------
+    root : Cursor
+        The cursor to start from, e.g. `TranslationUnit.cursor`.
+    pruned_kind_ids : AbstractSet[int] | None, optional
+        Ids of cursor kinds that are not descended into, by default
+        `PRUNED_KIND_IDS` (kinds that cannot contain declarations, e.g.
+        attributes, references and literals). See `pruned_kind_ids_for`.
+
+    Returns
+    -------
+    list[Cursor]
+        The candidate cursors in preorder.
+    """
+    if pruned_kind_ids is None:
+        pruned_kind_ids = PRUNED_KIND_IDS
+    tu = root._tu  # type: ignore
+    checks_all: bool = root._kind_id != _TRANSLATION_UNIT_KIND_ID  # type: ignore
+
+    def visitor(child: Cursor, parent: Cursor, cursors: list[Cursor]) -> int:
+        # _kind_id is a field of the struct, so no FFI call is necessary
+        if child._kind_id in pruned_kind_ids:  # type: ignore
+            return _CHILD_VISIT_CONTINUE
+        if (checks_all or parent._kind_id == _TRANSLATION_UNIT_KIND_ID) and not clang_location_is_from_main_file(child.location):  # type: ignore
+            return _CHILD_VISIT_CONTINUE
+        child._tu = tu  # type: ignore # Keep the translation unit alive
+        cursors.append(child)
+        return _CHILD_VISIT_RECURSE
+
+    cursors: list[Cursor] = []
+    conf.lib.clang_visitChildren(root, callbacks["cursor_visit"](visitor), cursors)
+    return cursors
+
+
+def pruned_kind_ids_for(parse_options: int) -> frozenset[int]:
+    """
+    Returns the cursor kinds that `collect_main_file_cursors` can prune
+    in a translation unit parsed with `parse_options`.
+
+    Parameters
+    ----------
+    parse_options : int
+        The options passed to `TranslationUnit.from_source`.
+
+    Returns
+    -------
+    frozenset[int]
+        `SKIPPED_BODIES_PRUNED_KIND_IDS` if function bodies are skipped,
+        else `PRUNED_KIND_IDS`.
+    """
+    if parse_options & TranslationUnit.PARSE_SKIP_FUNCTION_BODIES:
+        return SKIPPED_BODIES_PRUNED_KIND_IDS
+    return PRUNED_KIND_IDS
 
 
 def _register_functions() -> None:
@@ -27,6 +104,37 @@ def _register_functions() -> None:
     """
     register_function(conf.lib, ("clang_Cursor_getCommentRange", [Cursor], SourceRange), False)
     register_function(conf.lib, ("clang_Location_isFromMainFile", [SourceLocation], ctypes.c_int), False)
+    register_function(conf.lib, ("clang_Range_isNull", [SourceRange], ctypes.c_int), False)
+    register_function(conf.lib, ("clang_getClangVersion", [], _CXString, _CXString.from_result), False)
 
 
 _register_functions()
+
+_TRANSLATION_UNIT_KIND_ID: int = CursorKind.TRANSLATION_UNIT.value
+
+# Cursors of these kinds are never documented declarations and cannot contain declarations, so they are not
+# descended into. Other statements and expressions are, because they may contain e.g. local structs or lambdas.
+PRUNED_KIND_IDS: frozenset[int] = frozenset(
+    kind.value for kind in CursorKind.get_all_kinds()
+    if kind.is_attribute() or kind.is_reference() or kind in (
+        CursorKind.INTEGER_LITERAL,
+        CursorKind.FLOATING_LITERAL,
+        CursorKind.IMAGINARY_LITERAL,
+        CursorKind.STRING_LITERAL,
+        CursorKind.CHARACTER_LITERAL,
+        CursorKind.CXX_BOOL_LITERAL_EXPR,
+        CursorKind.CXX_NULL_PTR_LITERAL_EXPR,
+        CursorKind.NULL_STMT,
+        CursorKind.BREAK_STMT,
+        CursorKind.CONTINUE_STMT,
+        CursorKind.GOTO_STMT,
+    )
+)
+
+# Without function bodies, statements and expressions only contain declarations in the bodies of lambdas, which
+# are local and never part of the documented interface. Tags defined in expressions (e.g. in sizeof) are children
+# of the enclosing declaration context, so they are still found.
+SKIPPED_BODIES_PRUNED_KIND_IDS: frozenset[int] = PRUNED_KIND_IDS | frozenset(
+    kind.value for kind in CursorKind.get_all_kinds()
+    if kind.is_statement() or kind.is_expression()
+)
@@ -6,7 +6,7 @@ from typing import Callable, Iterable, Iterator
 from clang.cindex import (CompilationDatabase, CompileCommand, Cursor,
                           CursorKind, TranslationUnit, AccessSpecifier)
 
-from ..libclang_util import walk_preorder_only_main_file
+from ..libclang_util import collect_main_file_cursors
 from .function_identifier import FunctionIdentifier
 
 
@@ -54,7 +54,7 @@ def find_functions_with_libclang(compilation_db_dir: Path, find_option: FindOpti
         code = Path(filename).read_text()
         tu: TranslationUnit = TranslationUnit.from_source(None, args=file_args, unsaved_files=[(filename, code)])
         # Iterate over AST
-        for node in walk_preorder_only_main_file(tu.cursor):
+        for node in collect_main_file_cursors(tu.cursor):
             if _is_non_empty_function(node, code):
                 if has_invalid_visibility(node):
                     continue
@@ -0,0 +1,202 @@
+"""
+Differential testing of a reference and a candidate implementation.
+
+Both implementations are run on the same inputs (a corpus and randomly
+generated code), their outputs must be equal and their throughput is
+measured. On a mismatch, the input is minimized to a small counterexample.
+
+Run e.g. `python -m pytest -s -k differential` to see the throughput reports.
+If the environment variable `SOURCETODOC_DIFFERENTIAL_CORPUS` is set to a
+directory, its C and C++ source files are added to the corpus.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from random import Random
+from time import perf_counter
+from typing import Any, Callable, Iterable, Sequence
+
+CORPUS_ENV: str = "SOURCETODOC_DIFFERENTIAL_CORPUS"
+
+_SOURCE_SUFFIXES: frozenset[str] = frozenset((".c", ".h", ".cc", ".cpp", ".cxx", ".hh", ".hpp", ".hxx"))
+
+
+@dataclass
+class Throughput:
+    """The measured work of an implementation."""
+    name: str
+    bytes: int = 0 # UTF-8 size of the inputs
+    items: int = 0 # Number of output items, e.g. comments
+    seconds: float = 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds > 0 else float("inf")
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return (f"{self.name:<24} {self.mb_per_second:10.2f} MB/s {self.items_per_second:12.0f} items/s"
+                f" ({self.bytes} bytes, {self.items} items, {self.seconds:.3f} s)")
+
+
+@dataclass
+class DifferentialReport:
+    """The throughput of the reference and the candidate on inputs with equal outputs."""
+    inputs: int
+    reference: Throughput
+    candidate: Throughput
+
+    def __str__(self) -> str:
+        speedup = self.reference.seconds / self.candidate.seconds if self.candidate.seconds > 0 else float("inf")
+        return f"{self.inputs} inputs, speedup {speedup:.2f}x\n  {self.reference}\n  {self.candidate}"
+
+
+def run_differential(
+        reference: Callable[[str], Sequence[Any]],
+        candidate: Callable[[str], Sequence[Any]],
+        inputs: Iterable[str],
+        names: tuple[str, str] = ("reference", "candidate")
+    ) -> DifferentialReport:
+    """
+    Asserts that `reference` and `candidate` return equal outputs for every input.
+
+    Raising the same exception type counts as an equal output.
+
+    Raises
+    ------
+    AssertionError
+        If the outputs differ for an input. The message contains the
+        minimized input and both outputs for it.
+    """
+    report = DifferentialReport(0, Throughput(names[0]), Throughput(names[1]))
+    for text in inputs:
+        size = len(text.encode("utf-8", "surrogatepass"))
+        expected = _timed_outcome(reference, text, report.reference, size)
+        actual = _timed_outcome(candidate, text, report.candidate, size)
+        if expected != actual:
+            minimized = minimize(text, lambda s: _outcome(reference, s) != _outcome(candidate, s))
+            raise AssertionError(
+                f"{names[1]} differs from {names[0]} (input of {len(text)} characters)\n"
+                f"Minimized counterexample: {minimized!r}\n"
+                f"{names[0]}: {_outcome(reference, minimized)!r}\n"
+                f"{names[1]}: {_outcome(candidate, minimized)!r}"
+            )
+        report.inputs += 1
+    return report
+
+
+def minimize(text: str, fails: Callable[[str], bool], max_calls: int = 5000) -> str:
+    """
+    Returns a substring-deletion of `text` for which `fails` is still True (delta debugging).
+
+    The result is 1-minimal regarding single characters if `max_calls` is not exceeded.
+    """
+    calls = 0
+    granularity = 2
+    while len(text) >= 2 and calls < max_calls:
+        chunk_size = -(-len(text) // granularity)
+        for chunk_start in range(0, len(text), chunk_size):
+            candidate = text[:chunk_start] + text[chunk_start + chunk_size:]
+            calls += 1
+            if fails(candidate):
+                text = candidate
+                granularity = max(granularity - 1, 2)
+                break
+        else:
+            if chunk_size == 1:
+                break
+            granularity = min(granularity * 2, len(text))
+    if len(text) == 1 and fails(""):
+        return ""
+    return text
+
+
+def comment_soup(rng: Random, pieces: int, cxx: bool = False) -> str:
+    """
+    Returns random code of `pieces` fragments that are hard for comment
+    scanners: comments of every style, comment delimiters in literals,
+    escapes, digit separators, line continuations and (if `cxx`) raw strings.
+    """
+    fragments = _CXX_SOUP_FRAGMENTS if cxx else _C_SOUP_FRAGMENTS
+    return "".join(rng.choice(fragments) for _ in range(pieces))
+
+
+def declaration_soup(rng: Random, declarations: int, member_comments: bool = True) -> str:
+    """
+    Returns random valid C code with commented declarations of every `CType`.
+    If `member_comments` is False, there are no comments after declarations.
+    """
+    parts: list[str] = []
+    for i in range(declarations):
+        comment = rng.choice(_DECLARATION_COMMENTS).format(i=i)
+        template = rng.choice(_DECLARATION_TEMPLATES)
+        member_comment = rng.choice(("", " /**< m */", " ///< m", " // m")) if member_comments else ""
+        parts.append(comment + template.format(i=i, member_comment=member_comment) + rng.choice(("\n", "\n\n")))
+    return "".join(parts)
+
+
+def corpus_texts() -> list[str]:
+    """Returns the contents of the source files in `SOURCETODOC_DIFFERENTIAL_CORPUS`, if set."""
+    corpus_dir = os.environ.get(CORPUS_ENV)
+    if not corpus_dir:
+        return []
+    texts: list[str] = []
+    for dirpath, _, filenames in Path(corpus_dir).walk():
+        for filename in sorted(filenames):
+            file = dirpath / filename
+            if file.suffix in _SOURCE_SUFFIXES:
+                texts.append(file.read_text(encoding="utf-8", errors="surrogateescape"))
+    return texts
+
+
+def _outcome(func: Callable[[str], Sequence[Any]], text: str) -> tuple[str, Any]:
+    try:
+        return "result", list(func(text))
+    except Exception as e:
+        return "exception", type(e).__name__
+
+
+def _timed_outcome(func: Callable[[str], Sequence[Any]], text: str, throughput: Throughput, size: int) -> tuple[str, Any]:
+    start = perf_counter()
+    outcome = _outcome(func, text)
+    throughput.seconds += perf_counter() - start
+    throughput.bytes += size
+    if outcome[0] == "result":
+        throughput.items += len(outcome[1])
+    return outcome
+
+
+_C_SOUP_FRAGMENTS: tuple[str, ...] = (
+    "// a", "/// a", "//! a", "///< a", "//!< a", "/* a */", "/** a */", "/*! a */", "/**< a */", "/*!< a */",
+    "/*\n * a\n */", "/**\n * a\n */", "/*!\n a\n*/", "/**/", "/***/", "/* a **/", "*/", "/*", "//", "/", "*",
+    "\n", "\n\n", " ", "\t", "\r\n", "\\\n", "\\",
+    "int a;", "void f(void);", "x", "R", "u", "u8", "L", "1'000", "0x1'F",
+    "\"", "'", "\"//\"", "\"/*\"", "\"a\\\"b\"", "'\\''", "'\"'", "'/'", "u'a'", "L\"/*\"", "\"a\\\nb\"",
+)
+
+_CXX_SOUP_FRAGMENTS: tuple[str, ...] = _C_SOUP_FRAGMENTS + (
+    "R\"(", ")\"", "R\"x(a)\"/*)x\"", "u8R\"(//)\"", "LR\"-(*/)-\"", "R\"", "FOR\"(/*)\"", "uR\"(\n/*\n)\"",
+)
+
+_DECLARATION_COMMENTS: tuple[str, ...] = (
+    "// c{i}\n", "/// c{i}\n", "//! c{i}\n// d\n", "/* c{i} */\n", "/** c{i} */\n", "/*! c{i} */\n",
+    "/**\n * c{i}\n */\n", "/*\n * c{i}\n */\n", "/* c{i} */ ", "", "// c{i}\n\n",
+)
+
+_DECLARATION_TEMPLATES: tuple[str, ...] = (
+    "void f{i}(int a, char *b);",
+    "static int g{i}(void) {{ return \"/*\"[0]; }}",
+    "struct s{i} {{\n    int a;{member_comment}\n    /** b */\n    char b;\n}};",
+    "union u{i} {{ int a; float b; }};",
+    "enum e{i} {{\n    E{i}_A,{member_comment}\n    /// b\n    E{i}_B = 1\n}};",
+    "typedef unsigned long t{i};",
+    "int v{i} = 1;{member_comment}",
+    "extern const char *c{i};",
+    "typedef struct ts{i} {{\n    int a;{member_comment}\n}} ts{i}_t;",
+    "typedef enum {{ TE{i}_A, TE{i}_B }} te{i}_t;",
+    "\nint blank{i}(void);", # The comment is separated by a blank line
+)
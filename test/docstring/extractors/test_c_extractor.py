@@ -1,13 +1,23 @@
+from pathlib import Path
+from random import Random
+
 import pytest
+from clang.cindex import Cursor
 
 from sourcetodoc.docstring.extractor import Extractor
 from sourcetodoc.docstring.extractors.c_type import CType
 from sourcetodoc.docstring.extractors.c_libclang_extractor import CLibclangExtractor
+from sourcetodoc.docstring.extractors.cxx_libclang_extractor import CXXLibclangExtractor
+from sourcetodoc.docstring.extractors.doc_coverage import DocCoverage, DocCoverageReport
+from sourcetodoc.docstring.extractors.libclang_extractor import LibclangExtractor
+from sourcetodoc.docstring.range import Range
+
+from ..differential import comment_soup, corpus_texts, declaration_soup, run_differential
 
 
-@pytest.fixture
-def extractor() -> Extractor[CType]:
-    return CLibclangExtractor()
+@pytest.fixture(params=[True, False], ids=["bulk", "per_node"])
+def extractor(request: pytest.FixtureRequest) -> Extractor[CType]:
+    return CLibclangExtractor(request.param)
 
 
 _single_line_line_comment = """\
@@ -79,3 +89,102 @@ def test_complex(extractor: Extractor[CType]):
     comments = list(extractor.extract_comments(_complex))
     assert len(comments) == 1
     assert "/* comment */" == comments[0].comment_text
+
+
+_string_with_slashes = """\
+const char *url = "http://x";
+/* comment */
+int v;
+"""
+
+def test_string_with_slashes(extractor: Extractor[CType]):
+    comments = list(extractor.extract_comments(_string_with_slashes))
+    assert len(comments) == 1
+    assert "/* comment */" == comments[0].comment_text
+
+
+def test_last_stats():
+    extractor = CLibclangExtractor()
+    extractor.extract_comments("#include \"missing.h\"\n/* a */\nint a;\nint b;")
+    stats = extractor.last_stats
+    assert stats is not None
+    assert 2 == stats.node_count
+    assert 1 == stats.commented_node_count
+    assert ["missing.h"] == stats.missing_includes
+    assert 1 == stats.diagnostics["fatal"]
+
+
+@pytest.mark.parametrize("extractor_class,cxx", [(CLibclangExtractor, False), (CXXLibclangExtractor, True)])
+def test_bulk_differential(extractor_class: type[CLibclangExtractor] | type[CXXLibclangExtractor], cxx: bool):
+    # Bulk mode must find the same comments as fetching the comment of every cursor separately
+    rng = Random(3)
+    inputs = corpus_texts() + [
+        comment_soup(rng, rng.randint(0, 8), cxx) + "\n" + declaration_soup(rng, rng.randint(1, 4))
+        for _ in range(60)
+    ]
+    report = run_differential(
+        extractor_class(False).extract_comments,
+        extractor_class(True).extract_comments,
+        inputs,
+        ("per_node", "bulk")
+    )
+    assert len(inputs) == report.inputs and report.reference.items == report.candidate.items
+
+
+def test_last_coverage():
+    code = "/** a */\nint a(void);\nint b(void);\nstatic int c(void);\n/// S\nstruct S {\n  int x; ///< x\n  int y;\n};"
+    extractor = CLibclangExtractor(coverage=True)
+    comments = extractor.extract_comments(code)
+    assert comments == CLibclangExtractor().extract_comments(code)
+    coverage = extractor.last_coverage
+    assert coverage is not None
+    assert {"FUNCTION": 1, "STRUCT": 1, "FIELD": 1} == coverage.documented
+    assert {"FUNCTION": 1, "FIELD": 1} == coverage.undocumented # The static function is not counted
+    assert 3 / 5 == coverage.ratio
+
+    report = DocCoverageReport()
+    report.add(Path("src/a.c"), coverage)
+    report.add(Path("src/b.c"), DocCoverage())
+    assert {"src": coverage} == report.by_directory()
+    assert 3 == report.to_dict()["total"]["documented"]
+
+
+
+def test_coverage_excludes_protected_members():
+    code = "/// S\nclass S {\npublic:\n  int a;\nprotected:\n  int b;\nprivate:\n  int c;\n};"
+    extractor = CXXLibclangExtractor(coverage=True)
+    extractor.extract_comments(code)
+    coverage = extractor.last_coverage
+    assert coverage is not None
+    assert {"CLASS": 1} == coverage.documented
+    assert {"FIELD": 1} == coverage.undocumented # Only the public field a
+
+
+def test_coverage_excludes_symbols_without_external_linkage():
+    code = (
+        "int v;\n"
+        "namespace { int hidden; }\n"
+        "int f(void) {\n  int local;\n  class L { public: int x; };\n  return 0;\n}"
+    )
+    extractor = CXXLibclangExtractor(coverage=True)
+    extractor.extract_comments(code)
+    coverage = extractor.last_coverage
+    assert coverage is not None
+    assert {"VARIABLE": 1, "FUNCTION": 1} == coverage.undocumented # v and f
+
+    extractor = CLibclangExtractor(coverage=True)
+    extractor.extract_comments("typedef int T;\nint f(void) {\n  typedef int Local;\n  return 0;\n}")
+    coverage = extractor.last_coverage
+    assert coverage is not None
+    assert {"TYPEDEF": 1, "FUNCTION": 1} == coverage.undocumented # Typedefs have no linkage, but T is public
+
+
+def test_bulk_mode_checks_comments_without_raw_comment(monkeypatch: pytest.MonkeyPatch):
+    code = "/* a */\nint a(void);\n/// b\nint b;\n"
+    expected = CLibclangExtractor(False).extract_comments(code)
+    raw_comments: list[Cursor] = []
+    raw_comment = Cursor.raw_comment
+    monkeypatch.setattr(Cursor, "raw_comment", property(lambda cursor: raw_comments.append(cursor) or raw_comment.fget(cursor))) # type: ignore
+    assert expected == CLibclangExtractor(True).extract_comments(code)
+    assert [] == raw_comments
+    assert not LibclangExtractor._has_byte_length("/* ä */", Range(0, 7), 7) # type: ignore # "ä" has 2 bytes
@@ -0,0 +1,159 @@
+from pathlib import Path
+from random import Random
+
+import pytest
+
+from sourcetodoc.docstring.extraction_cache import CachedExtractor, ExtractionCache
+from sourcetodoc.docstring.extractor import Extractor
+from sourcetodoc.docstring.extractors.c_lexer import TokenKind, tokenize
+from sourcetodoc.docstring.extractors.c_lexer_extractor import CLexerExtractor
+from sourcetodoc.docstring.extractors.c_libclang_extractor import CLibclangExtractor
+from sourcetodoc.docstring.extractors.c_type import CType
+
+from ..differential import comment_soup, corpus_texts, declaration_soup, run_differential
+
+
+@pytest.fixture
+def extractor() -> Extractor[CType]:
+    return CLexerExtractor()
+
+
+_struct = """\
+/* struct */
+struct S {
+  /// field a
+  int a;
+  int b; /**< field b */
+};"""
+
+_function_definition = """\
+// func
+// more
+static int f(int x) { /* inner */ return x; }"""
+
+_enum = """\
+/* enum */
+enum E { A = 1, B /**< b */ };"""
+
+_string_with_comment_delimiters = """\
+const char *url = "http:// /*"; /**< url */
+/** after url */
+int w;"""
+
+_preprocessor = """\
+/* macro */
+#define X 1 /* in directive */
+int x;"""
+
+
+@pytest.mark.parametrize(
+    "input,expected",
+    [
+        (_struct, [
+            ("/* struct */", _struct[len("/* struct */\n"):-1], CType.STRUCT),
+            ("/// field a", "int a", CType.FIELD),
+            ("/**< field b */", "int b", CType.FIELD),
+        ]),
+        (_function_definition, [("// func\n// more", "static int f(int x)", CType.FUNCTION)]),
+        (_enum, [("/* enum */", "enum E { A = 1, B /**< b */ }", CType.ENUM), ("/**< b */", "B", CType.ENUM_CONSTANT)]),
+        (_string_with_comment_delimiters, [
+            ("/**< url */", "const char *url = \"http:// /*\"", CType.VARIABLE),
+            ("/** after url */", "int w", CType.VARIABLE),
+        ]),
+        (_preprocessor, []),
+    ],
+)
+def test_extract_comments(extractor: Extractor[CType], input: str, expected: list[tuple[str, str, CType]]):
+    comments = extractor.extract_comments(input)
+    assert expected == [(c.comment_text, c.symbol_text, c.symbol_type) for c in comments]
+    for c in comments:
+        assert c.comment_text == input[c.comment_range.start:c.comment_range.end]
+        assert c.symbol_text == input[c.symbol_range.start:c.symbol_range.end]
+
+
+def test_extract_comment_with_indent(extractor: Extractor[CType]):
+    comments = extractor.extract_comments("    /* text\n     */\n    void f(void) {}")
+    assert 1 == len(comments)
+    assert "    " == comments[0].symbol_indentation
+    assert "/* text\n     */" == comments[0].comment_text
+
+
+def test_iter_comments_yields_in_ascending_order(extractor: Extractor[CType]):
+    code = "/* t */\ntypedef struct {\n  /* a */\n  int a;\n} T;\n/* f */\nvoid f(void);"
+    comments = extractor.iter_comments(code)
+    # The comment of the typedef is found after the comment of its field
+    assert ["/* t */", "/* a */", "/* f */"] == [c.comment_text for c in comments]
+    assert extractor.extract_comments(code) == list(extractor.iter_comments(code))
+
+
+def test_initializers_are_part_of_the_symbol_like_libclang(extractor: Extractor[CType]):
+    code = (
+        "struct P { int x[1]; };\n"
+        "/// a\nint arr[] = { 1, 2 };\n"
+        "/// x\nint x = 5;\n"
+        "/// p\nstruct P p = { .x = { 1 } };\n"
+    )
+    expected = [(c.comment_text, c.symbol_text, c.symbol_type) for c in CLibclangExtractor().extract_comments(code)]
+    assert expected == [(c.comment_text, c.symbol_text, c.symbol_type) for c in extractor.extract_comments(code)]
+    assert ("/// a", "int arr[] = { 1, 2 }", CType.VARIABLE) in expected
+
+    # Nested braces in a function body do not close the enclosing scope
+    code = "extern \"C\" {\nvoid f(void) { if (1) { } }\n/// y\nint y;\n}\n"
+    assert [("/// y", "int y")] == [(c.comment_text, c.symbol_text) for c in extractor.extract_comments(code)]
+
+
+def test_records_and_blank_lines_like_libclang(extractor: Extractor[CType]):
+    code = (
+        "/// S\ntypedef struct S {\n  int a;\n} S_t;\n"
+        "/// E\nenum E { A, B };\n"
+        "/// f\n\nint f(void);\n"
+        "/// empty\n;\nint g;\n"
+    )
+    expected = [("/// S", "struct S {\n  int a;\n}", CType.STRUCT), ("/// E", "enum E { A, B }", CType.ENUM), ("/// f", "int f(void)", CType.FUNCTION)]
+    assert expected == [(c.comment_text, c.symbol_text, c.symbol_type) for c in extractor.extract_comments(code)]
+    # libclang associates the comment before ";" with an empty declaration instead
+    assert expected == [(c.comment_text, c.symbol_text, c.symbol_type) for c in CLibclangExtractor().extract_comments(code)][:3]
+
+
+def test_libclang_differential():
+    # Comments after declarations are associated differently, see doc/AboutExtractor.md
+    rng = Random(5)
+    inputs = [declaration_soup(rng, rng.randint(1, 8), member_comments=False) for _ in range(100)]
+    report = run_differential(CLibclangExtractor().extract_comments, CLexerExtractor().extract_comments, inputs, ("libclang", "lexer"))
+    assert len(inputs) == report.inputs and report.reference.items == report.candidate.items
+
+
+def test_tokenize_literals_and_comments():
+    code = "#include <a.h>\nchar c = '\"'; // x \"\ns = \"/* \\\" */\";"
+    kinds = [kind for kind, _, _ in tokenize(code)]
+    assert kinds == [
+        TokenKind.PREPROCESSOR,
+        TokenKind.IDENTIFIER, TokenKind.IDENTIFIER, TokenKind.PUNCTUATOR, TokenKind.CHAR, TokenKind.PUNCTUATOR,
+        TokenKind.LINE_COMMENT,
+        TokenKind.IDENTIFIER, TokenKind.PUNCTUATOR, TokenKind.STRING, TokenKind.PUNCTUATOR,
+    ]
+
+
+def test_streaming_and_cached_differential(tmp_path: Path):
+    # Comments streamed by iter_comments and restored from the extraction cache must equal extract_comments
+    rng = Random(4)
+    inputs = corpus_texts() + [
+        comment_soup(rng, rng.randint(0, 8)) + "\n" + declaration_soup(rng, rng.randint(1, 8))
+        for _ in range(300)
+    ]
+    reference = CLexerExtractor()
+    streaming = CLexerExtractor()
+    report = run_differential(
+        reference.extract_comments,
+        lambda code: list(streaming.iter_comments(code)),
+        inputs,
+        ("extract_comments", "iter_comments")
+    )
+    assert len(inputs) == report.inputs and report.reference.items == report.candidate.items
+
+    cached = CachedExtractor(CLexerExtractor(), CType, ExtractionCache(tmp_path))
+    for code in inputs:
+        cached.extract_comments(code)
+    report = run_differential(reference.extract_comments, cached.extract_comments, inputs, ("lexer", "cached lexer"))
+    assert len(inputs) == cached.cache.hits
+    assert len(inputs) == report.inputs and report.reference.items == report.candidate.items
@@ -0,0 +1,193 @@
+"""
+End-to-end throughput benchmark of `LLMConversion` against a `MockLLMServer`.
+
+A generated project of C files with commented functions is converted with
+every combination of the given concurrency, batch size, cache and stream
+settings ("cold" converts with an empty cache, "warm" converts again with
+the cache of the cold run). The converted files must be equal for every
+setting.
+
+Run e.g. `python -m test.docstring.llm_benchmark --concurrency 1,8,32 --batch_size 1,8 --cache off,warm`.
+"""
+
+import contextlib
+import io
+import itertools
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Sequence
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from sourcetodoc.docstring.conversions.llm import LLM
+from sourcetodoc.docstring.conversions.llm_cache import LLMResponseCache
+from sourcetodoc.docstring.conversions.llm_conversion import LLMConversion
+from sourcetodoc.docstring.conversions.llm_rate_limit import LLMRateLimiter
+from sourcetodoc.docstring.converter import Converter
+from sourcetodoc.docstring.extractors.c_lexer_extractor import CLexerExtractor
+from sourcetodoc.docstring.replace import Replace
+
+from .mock_llm_server import MockLLMConfig, MockLLMServer
+
+CACHE_SETTINGS: tuple[str, ...] = ("off", "cold", "warm")
+
+
+@dataclass
+class BenchmarkResult:
+    concurrency: int
+    batch_size: int
+    cache: str
+    stream: bool
+    comments: int # Converted comments
+    requests: int # Requests received by the server, including failed ones
+    seconds: float
+
+    @property
+    def comments_per_second(self) -> float:
+        return self.comments / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return (f"concurrency {self.concurrency:>3}  batch {self.batch_size:>3}  cache {self.cache:<4}"
+                f"  stream {"on " if self.stream else "off"}"
+                f" {self.comments_per_second:10.1f} comments/s ({self.comments} comments, {self.requests} requests,"
+                f" {self.seconds:.2f} s)")
+
+
+def generate_project(directory: Path, files: int, functions_per_file: int) -> None:
+    """Writes `files` C files with `functions_per_file` commented functions and some other comments."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(files):
+        parts = [f"#include \"f{i}.h\"\n\nint v{i}; // Not converted\n\n"]
+        for j in range(functions_per_file):
+            parts.append(f"/*\n * Computes value {i}.{j}\n * from a and b.\n */\nint f{i}_{j}(int a, int b)\n{{\n    return a + {j} * b;\n}}\n\n")
+        (directory / f"f{i}.c").write_text("".join(parts))
+
+
+def create_llm(base_url: str, concurrency: int, max_retries: int = 5) -> LLM:
+    """Creates a `LLM` for `base_url` with enough connections for `concurrency` and retries with short delays."""
+    limits = httpx.Limits(max_connections=max(concurrency, 1), max_keepalive_connections=max(concurrency, 1))
+    return LLM(
+        OpenAI(base_url=base_url, api_key="mock", max_retries=0, http_client=httpx.Client(limits=limits)),
+        "mock",
+        AsyncOpenAI(base_url=base_url, api_key="mock", max_retries=0, http_client=httpx.AsyncClient(limits=limits)),
+        rate_limiter=LLMRateLimiter(max_retries=max_retries, base_delay=0.01, max_delay=1.0)
+    )
+
+
+def run_benchmark(
+        server: MockLLMServer,
+        project: Path,
+        work_dir: Path,
+        concurrency: int,
+        batch_size: int,
+        cache_path: Path | None = None,
+        cache: str = "off",
+        stream: bool = False
+    ) -> tuple[BenchmarkResult, dict[str, str]]:
+    """
+    Converts a copy of `project` in `work_dir` and returns the result and
+    the converted files by name.
+    """
+    shutil.rmtree(work_dir, ignore_errors=True)
+    shutil.copytree(project, work_dir)
+    llm_cache = LLMResponseCache(cache_path) if cache_path is not None else None
+    conversion = LLMConversion(create_llm(server.base_url, concurrency), cache=llm_cache, batch_size=batch_size, stream=stream)
+    converter = Converter(conversion, Replace.REPLACE_OLD_COMMENTS, c_extractor=CLexerExtractor(), concurrency=concurrency)
+
+    requests = server.stats.requests
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter.convert_files(work_dir)
+    seconds = perf_counter() - start
+    if llm_cache is not None:
+        llm_cache.close()
+
+    outputs = {file.name: file.read_text() for file in sorted(work_dir.iterdir())}
+    comments = sum(text.count("AI_GENERATED") for text in outputs.values())
+    result = BenchmarkResult(concurrency, batch_size, cache, stream, comments, server.stats.requests - requests, seconds)
+    return result, outputs
+
+
+def run_benchmarks(
+        server: MockLLMServer,
+        project: Path,
+        work_dir: Path,
+        concurrencies: Sequence[int],
+        batch_sizes: Sequence[int],
+        caches: Sequence[str],
+        streams: Sequence[bool] = (False,)
+    ) -> list[BenchmarkResult]:
+    """
+    Runs `run_benchmark` for every combination of the settings.
+
+    Raises
+    ------
+    AssertionError
+        If the converted files differ between two settings.
+    """
+    results: list[BenchmarkResult] = []
+    expected: dict[str, str] | None = None
+    for concurrency, batch_size, stream in itertools.product(concurrencies, batch_sizes, streams):
+        cache_path = work_dir / f"cache_{concurrency}_{batch_size}_{stream}.sqlite"
+        for cache in caches:
+            if cache == "warm" and not cache_path.exists():
+                run_benchmark(server, project, work_dir / "output", concurrency, batch_size, cache_path, "cold", stream)
+            result, outputs = run_benchmark(
+                server, project, work_dir / "output", concurrency, batch_size,
+                cache_path if cache != "off" else None, cache, stream
+            )
+            if expected is None:
+                expected = outputs
+            elif outputs != expected:
+                raise AssertionError(f"The converted files differ for {result}")
+            results.append(result)
+    return results
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = ArgumentParser(description="Throughput benchmark of the LLM converter against a local mock server")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--functions", type=int, default=10, help="Commented functions per file")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated values of --cc_llm_concurrency")
+    parser.add_argument("--batch_size", default="1,8", help="Comma-separated values of --cc_llm_batch_size")
+    parser.add_argument("--cache", default="off,warm", help=f"Comma-separated cache settings of {CACHE_SETTINGS}")
+    parser.add_argument("--stream", default="off", help="Comma-separated values of --cc_llm_stream (off or on)")
+    parser.add_argument("--latency", default="lognormal", choices=("constant", "uniform", "lognormal"))
+    parser.add_argument("--mean_latency", type=float, default=0.05)
+    parser.add_argument("--latency_spread", type=float, default=0.5)
+    parser.add_argument("--rate_limit_rate", type=float, default=0.0)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0, help="Sentences of explanation after every comment")
+    parser.add_argument("--token_latency", type=float, default=0.0, help="Seconds per streamed chunk")
+    args = parser.parse_args(argv)
+
+    caches = args.cache.split(",")
+    for cache in caches:
+        if cache not in CACHE_SETTINGS:
+            parser.error(f"Unknown cache setting {cache}, choices: {", ".join(CACHE_SETTINGS)}")
+    streams = [stream == "on" for stream in args.stream.split(",")]
+    config = MockLLMConfig(
+        args.latency, args.mean_latency, args.latency_spread, args.rate_limit_rate, args.error_rate,
+        padding=args.padding, token_latency=args.token_latency
+    )
+
+    with tempfile.TemporaryDirectory() as tmp, MockLLMServer(config) as server:
+        project = Path(tmp) / "project"
+        generate_project(project, args.files, args.functions)
+        print(f"{args.files} files with {args.files * args.functions} commented functions, {config}")
+        for result in run_benchmarks(
+                server, project, Path(tmp) / "work",
+                [int(c) for c in args.concurrency.split(",")],
+                [int(b) for b in args.batch_size.split(",")],
+                caches,
+                streams):
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
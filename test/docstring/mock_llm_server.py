@@ -0,0 +1,271 @@
+"""
+A local stand-in for an OpenAI-compatible chat completions endpoint.
+
+The server answers `POST /v1/chat/completions` after a random latency
+with a deterministic Javadoc comment made from the first text line of
+every comment in the user prompt (also for batched prompts with
+"=== COMMENT n ===" sections), optionally followed by padding text.
+Streamed requests are answered with server-sent events. A configurable
+fraction of the requests fails with 429 (with Retry-After) or 500.
+
+Run `python -m test.docstring.mock_llm_server --port 8000` to start it for
+manual tests, e.g. with `--cc_openai_base_url http://127.0.0.1:8000/v1`.
+"""
+
+import json
+import re
+import threading
+import time
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from math import log
+from random import Random
+from typing import Any, Sequence
+
+_SECTION_REGEX = re.compile(r"^=== COMMENT (\d+) ===$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class MockLLMConfig:
+    """The behavior of a `MockLLMServer`."""
+    latency: str = "constant" # "constant", "uniform" (mean ± spread) or "lognormal" (sigma = spread)
+    mean_latency: float = 0.05 # Seconds
+    latency_spread: float = 0.0
+    rate_limit_rate: float = 0.0 # Fraction of the requests that are answered with 429
+    error_rate: float = 0.0 # Fraction of the requests that are answered with 500
+    retry_after: float = 0.01 # Seconds, sent in the "retry-after-ms" header of 429 responses
+    seed: int = 0
+    padding: int = 0 # Sentences of explanation after the comment, like a chatty model
+    token_latency: float = 0.0 # Seconds per streamed chunk of 4 characters
+
+    def sample_latency(self, rng: Random) -> float:
+        match self.latency:
+            case "constant":
+                return self.mean_latency
+            case "uniform":
+                return max(0.0, rng.uniform(self.mean_latency - self.latency_spread, self.mean_latency + self.latency_spread))
+            case "lognormal":
+                # The mean of lognormvariate(mu, sigma) is exp(mu + sigma**2 / 2)
+                mu = log(self.mean_latency) - self.latency_spread ** 2 / 2
+                return rng.lognormvariate(mu, self.latency_spread)
+            case _:
+                raise ValueError(f"Unknown latency distribution: {self.latency}")
+
+
+@dataclass
+class MockLLMStats:
+    requests: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    prompt_tokens: int = 0
+    closed_streams: int = 0 # Streams that the client closed before their end
+
+
+class MockLLMServer:
+    """A `ThreadingHTTPServer` with the chat completions endpoint in a background thread."""
+
+    def __init__(self, config: MockLLMConfig = MockLLMConfig(), host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config
+        self.stats = MockLLMStats()
+        self._rng = Random(config.seed)
+        self._lock = threading.Lock()
+        self._server = _HTTPServer((host, port), _make_handler(self))
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serves requests in the current thread until `KeyboardInterrupt`."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def _answer(self, request: dict[str, Any]) -> tuple[int, dict[str, str], dict[str, Any] | list[str]]:
+        # Returns the status code, the headers and the body of the response (the content chunks if it is streamed)
+        with self._lock:
+            self.stats.requests += 1
+            latency = self.config.sample_latency(self._rng)
+            outcome = self._rng.random()
+        time.sleep(latency)
+        if outcome < self.config.rate_limit_rate:
+            with self._lock:
+                self.stats.rate_limited += 1
+            headers = {"retry-after-ms": str(round(self.config.retry_after * 1000))}
+            return 429, headers, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}}
+        if outcome < self.config.rate_limit_rate + self.config.error_rate:
+            with self._lock:
+                self.stats.errors += 1
+            return 500, {}, {"error": {"message": "Internal server error", "type": "server_error"}}
+
+        user_prompt = "".join(m["content"] for m in request["messages"] if m["role"] == "user")
+        prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4 + 1
+        with self._lock:
+            self.stats.prompt_tokens += prompt_tokens
+        content = canned_response(user_prompt, self.config.padding)
+        pieces = re.findall(r".{1,4}", content, re.DOTALL)
+        if request.get("stream"):
+            return 200, {}, pieces
+        time.sleep(self.config.token_latency * len(pieces)) # The whole response is generated before it is sent
+        completion_tokens = len(content) // 4 + 1
+        return 200, {}, {
+            "id": f"chatcmpl-{self.stats.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+def canned_response(user_prompt: str, padding: int = 0) -> str:
+    """
+    Returns the deterministic answer to `user_prompt`: a Javadoc comment
+    with the first non-empty line of the prompt (without comment delimiters)
+    followed by `padding` sentences, or one such comment per
+    "=== COMMENT n ===" section.
+    """
+    headers = list(_SECTION_REGEX.finditer(user_prompt))
+    if not headers:
+        explanation = "The comment describes the function in the Javadoc style. " * padding
+        return f"Here is the comment:\n/** {_first_line(user_prompt)} */\n{explanation}\n"
+    parts: list[str] = []
+    for header, next_header in zip(headers, headers[1:] + [None]):
+        end = next_header.start() if next_header is not None else len(user_prompt)
+        parts.append(f"{header[0]}\n/** {_first_line(user_prompt[header.end():end])} */\n")
+    return "".join(parts)
+
+
+def _first_line(prompt: str) -> str:
+    # The first line of the comment at the start of prompt without comment delimiters
+    for line in prompt.splitlines():
+        text = line.strip("/*!< \t")
+        if text:
+            return text
+    return ""
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    request_queue_size = 1024 # Many clients connect at once, the default of 5 delays connections by SYN retries
+    daemon_threads = True
+
+
+def _make_handler(server: MockLLMServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive, like a real endpoint
+        disable_nagle_algorithm = True # Otherwise the body waits for the ACK of the headers
+
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path.rstrip("/") != "/v1/chat/completions":
+                self._send(404, {}, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            try:
+                request = json.loads(body)
+            except ValueError:
+                self._send(400, {}, {"error": {"message": "Invalid JSON"}})
+                return
+            status, headers, response = server._answer(request) # type: ignore
+            if isinstance(response, list):
+                self._send_stream(request.get("model", "mock"), response)
+            else:
+                self._send(status, headers, response)
+
+        def _send_stream(self, model: str, pieces: list[str]) -> None:
+            # Server-sent events in chunked transfer encoding, like the streamed chat completions
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            deltas: list[tuple[dict[str, str], str | None]] = [({"content": piece}, None) for piece in pieces]
+            try:
+                for delta, finish_reason in [({"role": "assistant"}, None)] + deltas + [({}, "stop")]:
+                    time.sleep(server.config.token_latency)
+                    event = {
+                        "id": "chatcmpl-stream",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+            except OSError: # The client closed the stream
+                with server._lock:
+                    server.stats.closed_streams += 1
+                self.close_connection = True
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        def _send(self, status: int, headers: dict[str, str], body: dict[str, Any]) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = ArgumentParser(description="Local OpenAI-compatible chat completions endpoint for tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="constant", choices=("constant", "uniform", "lognormal"))
+    parser.add_argument("--mean_latency", type=float, default=0.05)
+    parser.add_argument("--latency_spread", type=float, default=0.0)
+    parser.add_argument("--rate_limit_rate", type=float, default=0.0)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0, help="Sentences of explanation after the comment")
+    parser.add_argument("--token_latency", type=float, default=0.0, help="Seconds per streamed chunk")
+    args = parser.parse_args(argv)
+    config = MockLLMConfig(
+        args.latency, args.mean_latency, args.latency_spread, args.rate_limit_rate, args.error_rate,
+        padding=args.padding, token_latency=args.token_latency
+    )
+    server = MockLLMServer(config, args.host, args.port)
+    print(f"Serving {server.base_url}/chat/completions")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
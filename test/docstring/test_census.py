@@ -0,0 +1,66 @@
+import re
+from pathlib import Path
+
+from sourcetodoc.docstring.census import CensusOptions, CommentCensus, run_census, scan_code
+from sourcetodoc.docstring.conversions.find_and_replace_rules_conversion import (FindAndReplaceRule,
+                                                                                 FindAndReplaceRulesConversion)
+from sourcetodoc.docstring.conversions.prompt_budget import estimate_tokens
+
+_code = """\
+/* f */
+int f(int x);
+/** @brief g */
+int g;
+int h; // h
+/* s */
+struct S {
+  int a;
+};
+"""
+
+
+def test_scan_code() -> None:
+    census = scan_code(_code, False, CensusOptions(find_pattern=re.compile("s")))
+    assert 4 == census.comments
+    assert 1 == census.doxygen_comments
+    assert 3 == census.above_declaration # The comment after "int h;" is not above a declaration
+    assert {"C_BLOCK_INLINE": 2, "JAVADOC_BLOCK_INLINE": 1, "C_LINE": 1} == census.styles
+    assert 2 == census.conversions["default"]
+    assert 1 == census.conversions["function_comment_llm"]
+    assert 1 == census.conversions["command_style"]
+    assert 1 == census.conversions["find_and_replace"]
+    assert 0 < census.llm_prompt_tokens
+
+
+def test_scan_code_estimates_like_converters() -> None:
+    rules = FindAndReplaceRulesConversion([FindAndReplaceRule("h", "H", True), FindAndReplaceRule("g", "G", True)])
+    options = CensusOptions("System", "Convert:\n{}", find_pattern=re.compile("h"), find_rules_pattern=rules.combined_pattern)
+    census = scan_code(_code, False, options)
+    # "// h" is not above a declaration, so it is not converted
+    assert 0 == census.conversions["find_and_replace"]
+    assert 1 == census.conversions["find_and_replace_rules"]
+    assert estimate_tokens("System Convert:\n/* f */\nint f(int x)") == census.llm_prompt_tokens
+
+
+def test_run_census(tmp_path: Path) -> None:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "x.c").write_text(_code)
+    (tmp_path / "y.cpp").write_text(_code)
+    (tmp_path / "z.txt").write_text(_code)
+    (tmp_path / "latin1.c").write_bytes(_code.replace("/* f */", "/* f\xe9 */").replace("\n", "\r\n").encode("ISO-8859-1"))
+    census = run_census(tmp_path, re.compile(r".*\.[ch]"), re.compile(r".*\.cpp"), CensusOptions(), 2)
+    assert 3 == census.files
+    assert 12 == census.comments
+    assert {"a", "."} == set(census.directory_bytes)
+
+    census.write(tmp_path / "out")
+    assert (tmp_path / "out" / "census.json").is_file()
+    assert (tmp_path / "out" / "census.txt").is_file()
+
+
+def test_merge() -> None:
+    census = CommentCensus()
+    census.merge(scan_code(_code, False, CensusOptions()))
+    census.merge(scan_code(_code, True, CensusOptions()))
+    assert 2 == census.files
+    assert 4 == census.styles["C_BLOCK_INLINE"]
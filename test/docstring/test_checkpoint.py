@@ -0,0 +1,93 @@
+import shutil
+from pathlib import Path
+from typing import Any
+
+from sourcetodoc.docstring.checkpoint import ConversionCheckpoint
+from sourcetodoc.docstring.conversion import AsyncConversion, ConvResult
+from sourcetodoc.docstring.conversions.default_comment_conversion import DefaultCommentStyleConversion
+from sourcetodoc.docstring.converter import Converter
+from sourcetodoc.docstring.extractor import Comment
+from sourcetodoc.docstring.extractors.c_lexer_extractor import CLexerExtractor
+from sourcetodoc.docstring.replace import Replace
+
+
+class _CountingConversion(AsyncConversion[Any]):
+    """Converts like DefaultCommentStyleConversion, counts the conversions and fails on "fail"."""
+
+    def __init__(self) -> None:
+        self.conversion = DefaultCommentStyleConversion()
+        self.count = 0
+
+    def calc_conversion(self, comment: Comment[Any]) -> ConvResult:
+        self.count += 1
+        if "fail" in comment.comment_text:
+            raise RuntimeError
+        return self.conversion.calc_conversion(comment)
+
+    async def calc_conversion_async(self, comment: Comment[Any]) -> ConvResult:
+        return self.calc_conversion(comment)
+
+
+def _write_project(directory: Path) -> None:
+    (directory / "sub").mkdir(parents=True)
+    (directory / "a.c").write_text("// Adds\nint add(int a, int b);\n/* Keeps */\nint x;\n")
+    (directory / "sub" / "b.c").write_text("// Subtracts\nint sub(int a, int b);\n")
+    (directory / "sub" / "c.c").write_text("int y;\n")
+
+
+def _convert(directory: Path, checkpoint_path: Path, concurrency: int, resume: bool, config: Any = None) -> tuple[int, ConversionCheckpoint]:
+    conversion = _CountingConversion()
+    checkpoint = ConversionCheckpoint(checkpoint_path, directory, config or {"converter": "default"}, resume)
+    converter = Converter(conversion, Replace.REPLACE_OLD_COMMENTS, c_extractor=CLexerExtractor(), concurrency=concurrency, checkpoint=checkpoint)
+    converter.convert_files(directory)
+    checkpoint.close()
+    return conversion.count, checkpoint
+
+
+def test_resume_skips_and_reapplies(tmp_path: Path) -> None:
+    for concurrency in (1, 2):
+        checkpoint_path = tmp_path / f"checkpoint_{concurrency}.jsonl"
+        original = tmp_path / f"original_{concurrency}"
+        _write_project(original)
+        converted = tmp_path / f"converted_{concurrency}"
+        shutil.copytree(original, converted)
+
+        count, checkpoint = _convert(converted, checkpoint_path, concurrency, resume=False)
+        assert 3 == count and 3 == checkpoint.recorded
+        assert "/// Adds\nint add(int a, int b);\n/** Keeps */\nint x;\n" == (converted / "a.c").read_text()
+
+        # The converted files are skipped
+        count, checkpoint = _convert(converted, checkpoint_path, concurrency, resume=True)
+        assert 0 == count and 3 == checkpoint.skipped and 0 == checkpoint.recorded
+
+        # Unchanged files in another directory get the recorded results, c.c has no comments and is skipped
+        count, checkpoint = _convert(original, checkpoint_path, concurrency, resume=True)
+        assert 0 == count and 2 == checkpoint.reapplied and 1 == checkpoint.skipped
+        for file in ("a.c", "sub/b.c", "sub/c.c"):
+            assert (converted / file).read_text() == (original / file).read_text()
+
+
+def test_records_of_other_configurations_are_ignored(tmp_path: Path) -> None:
+    checkpoint_path = tmp_path / "checkpoint.jsonl"
+    _write_project(tmp_path / "a")
+    _write_project(tmp_path / "b")
+    _convert(tmp_path / "a", checkpoint_path, 1, resume=False)
+    with open(checkpoint_path, "a") as f:
+        f.write('{"version": 1, "conf') # Killed while writing
+
+    count, checkpoint = _convert(tmp_path / "b", checkpoint_path, 1, resume=True, config={"converter": "other"})
+    assert 3 == count and 4 == checkpoint.ignored and 3 == checkpoint.recorded
+    _, checkpoint = _convert(tmp_path / "b", checkpoint_path, 1, resume=True, config={"converter": "other"})
+    assert 3 == checkpoint.skipped and 4 == checkpoint.ignored
+
+
+def test_failed_conversions_are_not_recorded(tmp_path: Path) -> None:
+    for concurrency in (1, 2):
+        directory = tmp_path / str(concurrency)
+        _write_project(directory)
+        (directory / "a.c").write_text("/* fail */\nint f(void);\n// Adds\nint add(int a, int b);\n")
+        checkpoint_path = tmp_path / f"checkpoint_{concurrency}.jsonl"
+        _, checkpoint = _convert(directory, checkpoint_path, concurrency, resume=False)
+        assert 2 == checkpoint.recorded
+        count, checkpoint = _convert(directory, checkpoint_path, concurrency, resume=True)
+        assert 2 == count and 2 == checkpoint.skipped # Only a.c is converted again
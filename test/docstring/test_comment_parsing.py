@@ -1,12 +1,16 @@
+from random import Random
 from typing import Sequence
 
 import pytest
 
 from sourcetodoc.docstring.comment_parsing import (find_comments,
                                                    find_comments_connected_with_ranges)
-from sourcetodoc.docstring.comment_style import CommentStyle
+from sourcetodoc.docstring.comment_style import (BLOCK_INLINE_STYLES, BLOCK_STYLES,
+                                                 LINE_STYLES, CommentStyle)
 from sourcetodoc.docstring.range import Range
 
+from .differential import comment_soup, corpus_texts, run_differential
+
 _c_line = """\
 // a
 // b"""
@@ -143,3 +147,106 @@ def test_find_comments_composed() -> None:
     assert ([Range(16, 27)], CommentStyle.C_BLOCK) == block1
     assert ([Range(28, 36), Range(37, 45)], CommentStyle.C_BLOCK_INLINE) == inline1
     assert ([Range(47, 54)], CommentStyle.C_BLOCK_INLINE) == inline2
+
+
+@pytest.mark.parametrize("expected,text", [
+    ([(Range(11, 15), CommentStyle.C_LINE)], 's = "//x"; // a'),
+    ([(Range(10, 17), CommentStyle.C_BLOCK_INLINE)], "c = '\\''; /* a */"),
+    ([(Range(20, 27), CommentStyle.C_BLOCK_INLINE)], 's = u8R"x(")/* )x"; /* a */'),
+    ([(Range(9, 13), CommentStyle.C_LINE)], "n = 1'0; // a"),
+    ([(Range(0, 9), CommentStyle.C_LINE)], "// a \\\n b\nc"),
+    ([(Range(0, 12), CommentStyle.C_BLOCK)], "/*\n * a/b */"),
+    ([(Range(0, 8), CommentStyle.C_BLOCK_INLINE)], "/* a **/"),
+])
+def test_find_comments_skips_literals(expected: Sequence[tuple[Range,CommentStyle]], text: str) -> None:
+    assert expected == list(find_comments(text))
+
+
+def test_find_comments_without_skipping_literals() -> None:
+    text = "Here's the comment: /** a */"
+    assert [(Range(20, 28), CommentStyle.JAVADOC_BLOCK_INLINE)] == list(find_comments(text, skip_literals=False))
+
+
+def _reference_find_comments(code: str, skip_literals: bool = True) -> list[tuple[Range, CommentStyle]]:
+    # Straightforward scanner with one step per character, the reference for find_comments
+    def style_of(start: int, candidates: Sequence[CommentStyle]) -> CommentStyle:
+        return max((s for s in candidates if code.startswith(s.value.start_delimiter, start)),
+                   key=lambda s: len(s.value.start_delimiter))
+
+    def has_prefix(i: int) -> bool: # A literal may start at i: no identifier or an encoding prefix before it
+        for prefix in ("", "u", "U", "L", "u8"):
+            before = i - len(prefix)
+            if before >= 0 and code.startswith(prefix, before) and (before == 0 or not _is_word(code[before - 1])):
+                return True
+        return False
+
+    result: list[tuple[Range, CommentStyle]] = []
+    i = 0
+    n = len(code)
+    while i < n:
+        if code.startswith("//", i):
+            j = i + 2
+            while j < n and code[j] != "\n":
+                if code.startswith("\\\r\n", j): # Line continuation with CRLF
+                    j += 3
+                else:
+                    j += 2 if code[j] == "\\" else 1
+            j = min(j, n)
+            result.append((Range(i, j), style_of(i, LINE_STYLES)))
+            i = j
+        elif code.startswith("/*", i):
+            j = code.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+            styles = BLOCK_STYLES if "\n" in code[i:j] else BLOCK_INLINE_STYLES
+            result.append((Range(i, j), style_of(i, styles)))
+            i = j
+        elif skip_literals and code.startswith("R\"", i) and has_prefix(i):
+            open_paren = code.find("(", i + 2, i + 19)
+            delimiter = code[i + 2:open_paren] if open_paren != -1 else None
+            if delimiter is None or any(c.isspace() or c in "()\\" for c in delimiter):
+                i += 1 # Not a raw string, continue with the quote
+                continue
+            j = code.find(")" + delimiter + "\"", open_paren + 1)
+            i = n if j == -1 else j + len(delimiter) + 2
+        elif skip_literals and (code[i] == "\"" or (code[i] == "'" and has_prefix(i))):
+            quote = code[i]
+            j = i + 1
+            while j < n and code[j] != quote and code[j] != "\n":
+                j += 2 if code[j] == "\\" else 1
+            i = j + 1 if j < n and code[j] == quote else min(j, n)
+        else:
+            i += 1
+    return result
+
+
+def _is_word(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+_differential_texts = [
+    _c_line, _c_block, _c_block_inline, _javadoc_block, _javadoc_block_inline, _javadoc_block_member_inline,
+    _qt_line, _qt_line_member, _qt_block, _qt_block_inline, _qt_block_member_inline, _triple_slash_line,
+    _triple_slash_line_member, _triple_slash_line_and_c_line, _qt_block_inline_and_c_block_inline,
+    _javadoc_block_and_c_block_inline, _multi_line,
+]
+
+
+@pytest.mark.parametrize("skip_literals", [True, False])
+def test_find_comments_differential(skip_literals: bool) -> None:
+    rng = Random(1)
+    inputs = _differential_texts + corpus_texts() + [comment_soup(rng, rng.randint(0, 40), cxx=i % 2 == 1) for i in range(3000)]
+    report = run_differential(
+        lambda code: _reference_find_comments(code, skip_literals),
+        lambda code: list(find_comments(code, skip_literals=skip_literals)),
+        inputs,
+        ("reference scanner", "find_comments")
+    )
+    assert len(inputs) == report.inputs and report.reference.items == report.candidate.items
+
+
+def test_differential_minimizes_counterexample() -> None:
+    def candidate(code: str) -> list[tuple[Range, CommentStyle]]: # Ignores literals, so "//" in a string is wrong
+        return list(find_comments(code, skip_literals=False))
+
+    with pytest.raises(AssertionError, match=r"Minimized counterexample: '\"//'"):
+        run_differential(_reference_find_comments, candidate, ['int a; /* b */ s = "a // b"; // c'])
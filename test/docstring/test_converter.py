@@ -0,0 +1,178 @@
+import asyncio
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterator
+
+import pytest
+
+from sourcetodoc.docstring.conversion import AsyncConversion, ConvResult
+from sourcetodoc.docstring.conversions.default_comment_conversion import DefaultCommentStyleConversion
+from sourcetodoc.docstring.converter import Converter
+from sourcetodoc.docstring.extractor import Comment
+from sourcetodoc.docstring.extractors.c_lexer_extractor import CLexerExtractor
+from sourcetodoc.docstring.extractors.c_type import CType
+from sourcetodoc.docstring.replace import Replace
+
+
+def test_read_code_like_read_text(tmp_path: Path) -> None:
+    file = tmp_path / "a.c"
+    for content in (b"", b"int a;\r\nint b;\rint c;\n", "/* ä */".encode(), "/* ä */".encode("latin-1")):
+        file.write_bytes(content)
+        try:
+            expected = file.read_text()
+        except UnicodeDecodeError:
+            expected = file.read_text(encoding="ISO-8859-1")
+        assert expected == Converter._read_code(file) # type: ignore
+
+
+def test_write_chunks_replaces_file(tmp_path: Path) -> None:
+    file = tmp_path / "a.c"
+    file.write_text("old")
+    file.chmod(0o640)
+    Converter._write_chunks(file, iter(["a", "", "bc"])) # type: ignore
+    assert "abc" == file.read_text()
+    assert 0o640 == file.stat().st_mode & 0o777
+    assert [file] == list(tmp_path.iterdir())
+
+
+def test_write_chunks_keeps_links(tmp_path: Path) -> None:
+    file = tmp_path / "a.c"
+    file.write_text("old")
+    symlink = tmp_path / "link.c"
+    symlink.symlink_to(file)
+    Converter._write_chunks(symlink, iter(["new"])) # type: ignore
+    assert symlink.is_symlink() and "new" == file.read_text()
+
+    hardlink = tmp_path / "hard.c"
+    hardlink.hardlink_to(file)
+    Converter._write_chunks(file, iter(["newer"])) # type: ignore
+    assert "newer" == hardlink.read_text() and 2 == file.stat().st_nlink
+
+
+@pytest.mark.skipif(not hasattr(os, "setxattr"), reason="No extended attributes")
+def test_write_chunks_copies_xattrs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file = tmp_path / "a.c"
+    file.write_text("old")
+    try:
+        os.setxattr(file, "user.test", b"value")
+    except OSError:
+        pytest.skip("The file system does not support user attributes")
+    inode = file.stat().st_ino
+    Converter._write_chunks(file, iter(["new"])) # type: ignore
+    assert "new" == file.read_text() and b"value" == os.getxattr(file, "user.test")
+    assert inode != file.stat().st_ino and [file] == list(tmp_path.iterdir())
+
+    def fail(*_: Any) -> None:
+        raise PermissionError
+    monkeypatch.setattr(os, "setxattr", fail)
+    inode = file.stat().st_ino
+    Converter._write_chunks(file, iter(["newer"])) # type: ignore
+    assert "newer" == file.read_text() and b"value" == os.getxattr(file, "user.test")
+    assert inode == file.stat().st_ino and [file] == list(tmp_path.iterdir()) # Written in place
+
+
+def test_read_code_of_unmappable_file() -> None:
+    assert "" == Converter._read_code(Path("/dev/null")) # type: ignore
+
+
+def test_convert_file(tmp_path: Path) -> None:
+    file = tmp_path / "a.c"
+    file.write_text("// Adds\nint add(int a, int b);\nint x; // Not converted\n")
+    converter = Converter(DefaultCommentStyleConversion(), Replace.REPLACE_OLD_COMMENTS, c_extractor=CLexerExtractor())
+    converter.convert_file(file)
+    assert "/// Adds\nint add(int a, int b);\nint x; // Not converted\n" == file.read_text()
+
+
+class _FailingExtractor(CLexerExtractor):
+    """Yields the first comment of the code and raises like a C extractor on C++ code."""
+
+    def iter_comments(self, code: str) -> Iterator[Comment[CType]]:
+        yield next(super().iter_comments(code))
+        raise RuntimeError
+
+
+class _CountingConversion(DefaultCommentStyleConversion):
+    def __init__(self) -> None:
+        self.count = 0
+
+    def calc_conversion(self, comment: Comment[Any]) -> ConvResult:
+        self.count += 1
+        return super().calc_conversion(comment)
+
+
+def test_cxx_fallback_does_not_convert_again(tmp_path: Path) -> None:
+    file = tmp_path / "a.c"
+    file.write_text("// Adds\nint add(int a, int b);\n// Subtracts\nint sub(int a, int b);\n")
+    conversion = _CountingConversion()
+    converter = Converter(conversion, Replace.REPLACE_OLD_COMMENTS, c_extractor=_FailingExtractor(), cxx_extractor=CLexerExtractor()) # type: ignore
+    converter.convert_file(file)
+    assert 2 == conversion.count
+    assert "/// Adds\nint add(int a, int b);\n/// Subtracts\nint sub(int a, int b);\n" == file.read_text()
+
+
+class _CountingExtractor(CLexerExtractor):
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def iter_comments(self, code: str) -> Iterator[Comment[CType]]:
+        self.count += 1
+        return super().iter_comments(code)
+
+
+def test_outdated_checkpoint_results_do_not_extract_again(tmp_path: Path) -> None:
+    file = tmp_path / "a.c"
+    file.write_text("// Adds\nint add(int a, int b);\n")
+    extractor = _CountingExtractor()
+    converter = Converter(DefaultCommentStyleConversion(), Replace.REPLACE_OLD_COMMENTS, c_extractor=extractor)
+    # The checkpoint has results for the file, but they do not match its comments
+    converter.checkpoint = SimpleNamespace( # type: ignore
+        is_converted=lambda *_: False, has_results=lambda *_: True, get_results=lambda *_: None, add=lambda *_: None
+    )
+    converter.convert_file(file)
+    assert 1 == extractor.count
+    assert "/// Adds\nint add(int a, int b);\n" == file.read_text()
+
+
+class _ConcurrentConversion(AsyncConversion[Any]):
+    """Converts like DefaultCommentStyleConversion and records the maximum number of concurrent conversions."""
+
+    def __init__(self) -> None:
+        self.conversion = DefaultCommentStyleConversion()
+        self.running = 0
+        self.max_running = 0
+
+    def calc_conversion(self, comment: Comment[Any]) -> ConvResult:
+        if "fail" in comment.comment_text:
+            raise RuntimeError # Only this comment is not converted
+        return self.conversion.calc_conversion(comment)
+
+    async def calc_conversion_async(self, comment: Comment[Any]) -> ConvResult:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.001 * (comment.comment_range.start % 3)) # Finish out of order
+        self.running -= 1
+        if "fail" in comment.comment_text:
+            raise RuntimeError # Only this comment is not converted
+        return self.conversion.calc_conversion(comment)
+
+
+def test_convert_files_async_equals_sequential(tmp_path: Path) -> None:
+    code = "".join(f"// f{i}\nint f{i}(void);\n/* fail */\nint g{i};\n" for i in range(5))
+    for directory in (tmp_path / "sequential", tmp_path / "concurrent"):
+        directory.mkdir()
+        for i in range(4):
+            (directory / f"{i}.c").write_text(code)
+
+    conversion = _ConcurrentConversion()
+    extractor = CLexerExtractor()
+    Converter(conversion, Replace.REPLACE_OLD_COMMENTS, c_extractor=extractor, concurrency=1).convert_files(tmp_path / "sequential")
+    assert 0 == conversion.max_running # Sequential conversions use calc_conversion
+    Converter(conversion, Replace.REPLACE_OLD_COMMENTS, c_extractor=extractor, concurrency=3).convert_files(tmp_path / "concurrent")
+    assert 3 == conversion.max_running
+
+    for i in range(4):
+        expected = (tmp_path / "sequential" / f"{i}.c").read_text()
+        assert "/* fail */" in expected
+        assert expected == (tmp_path / "concurrent" / f"{i}.c").read_text()
@@ -0,0 +1,73 @@
+from typing import Iterable
+import pytest
+from sourcetodoc.docstring.document import Document
+from sourcetodoc.docstring.range import Range
+from sourcetodoc.docstring.replacer import Replacer, TextReplacement
+
+
+text = "0123456789"
+
+
+@pytest.mark.parametrize("replacements", [
+    (TextReplacement(Range(0, 1), "X"),),
+    (TextReplacement(Range(4, 5), "X"),),
+    (TextReplacement(Range(1, 9), "ABC"),),
+    (TextReplacement(Range(0, 10), "X"),),
+    (TextReplacement(Range(1, 2), "X"), TextReplacement(Range(4, 7), "X")),
+    (TextReplacement(Range(3, 3), "XY"), TextReplacement(Range(5, 6), ""), TextReplacement(Range(10, 10), "Z")),
+])
+def test_text_equals_replace_text(replacements: Iterable[TextReplacement]) -> None:
+    document = Document(text)
+    document.replace_all((e.range, e.new_text) for e in replacements)
+    expected = Replacer.replace_text(text, replacements)
+    assert expected == document.text()
+    assert len(expected) == len(document)
+
+
+def test_successive_passes() -> None:
+    document = Document(text)
+    document.replace_all([(Range(4, 7), "X")])
+    document.replace_all([(Range(1, 2), "AB"), (Range(8, 9), "C")])
+    assert "0AB23X7C9" == document.text()
+
+    document.replace(Range(4, 7), "YYYY") # Same range replaces the previous text
+    assert "0AB23YYYY7C9" == document.text()
+
+
+@pytest.mark.parametrize("first,second", [
+    (Range(1, 3), Range(2, 4)),
+    (Range(2, 4), Range(1, 3)),
+    (Range(1, 5), Range(2, 3)),
+    (Range(2, 3), Range(1, 5)),
+    (Range(2, 2), Range(2, 3)),
+])
+def test_replace_overlap(first: Range, second: Range) -> None:
+    document = Document(text)
+    document.replace(first, "X")
+    with pytest.raises(ValueError):
+        document.replace(second, "X")
+
+
+def test_replace_all_not_ascending() -> None:
+    document = Document(text)
+    with pytest.raises(ValueError):
+        document.replace_all([(Range(4, 5), "X"), (Range(1, 2), "X")])
+
+
+def test_map_position_and_get_text() -> None:
+    document = Document(text)
+    document.replace_all([(Range(1, 2), "AB"), (Range(4, 7), "X")])
+    # Current text: "0AB23X789"
+    assert 0 == document.map_position(0)
+    assert 1 == document.map_position(1)
+    assert 3 == document.map_position(2)
+    assert 5 == document.map_position(4)
+    assert 6 == document.map_position(7)
+    assert 9 == document.map_position(10)
+    assert Range(5, 6) == document.map_range(Range(4, 7))
+    assert "AB23X7" == document.get_text(Range(1, 8))
+    assert "3" == document.get_text(Range(3, 4))
+    with pytest.raises(ValueError):
+        document.map_position(5)
+    with pytest.raises(ValueError):
+        document.get_text(Range(0, 5))
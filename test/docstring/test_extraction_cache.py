@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+from sourcetodoc.docstring import extraction_cache
+from sourcetodoc.docstring.extraction_cache import CachedExtractor, ExtractionCache
+from sourcetodoc.docstring.extractor import Comment
+from sourcetodoc.docstring.extractors.c_lexer_extractor import CLexerExtractor
+from sourcetodoc.docstring.extractors.c_type import CType
+
+_code = """\
+/* a */
+void f(void);
+struct S {
+    int x; ///< x
+};
+"""
+
+
+class _CountingExtractor(CLexerExtractor):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def extract_comments(self, code: str) -> list[Comment[CType]]:
+        self.calls += 1
+        return super().extract_comments(code)
+
+
+def test_cached_extractor_returns_same_comments(tmp_path: Path) -> None:
+    extractor = _CountingExtractor()
+    expected = extractor.extract_comments(_code)
+
+    cache = ExtractionCache(tmp_path)
+    assert expected == CachedExtractor(extractor, CType, cache).extract_comments(_code)
+    # A new cache object with the same directory (e.g. a later run) uses the stored entry
+    cache = ExtractionCache(tmp_path)
+    assert expected == CachedExtractor(extractor, CType, cache).extract_comments(_code)
+    assert 2 == extractor.calls
+    assert (1, 0) == (cache.hits, cache.misses)
+
+
+def test_changed_code_is_extracted_again(tmp_path: Path) -> None:
+    extractor = _CountingExtractor()
+    cached_extractor = CachedExtractor(extractor, CType, ExtractionCache(tmp_path))
+    cached_extractor.extract_comments(_code)
+    cached_extractor.extract_comments(_code + "\n")
+    assert 2 == extractor.calls
+
+
+def test_entries_of_other_extractor_versions_are_not_used(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    extractor = _CountingExtractor()
+    CachedExtractor(extractor, CType, ExtractionCache(tmp_path)).extract_comments(_code)
+    monkeypatch.setattr(extraction_cache, "EXTRACTOR_VERSION", extraction_cache.EXTRACTOR_VERSION + 1)
+    CachedExtractor(extractor, CType, ExtractionCache(tmp_path)).extract_comments(_code)
+    assert 2 == extractor.calls
+    assert all(path.suffix == ".bin" for path in tmp_path.iterdir()) # No temporary files are left
+
+
+def test_eviction_limits_size(tmp_path: Path) -> None:
+    cache = ExtractionCache(tmp_path, max_bytes=1000)
+    cached_extractor = CachedExtractor(CLexerExtractor(), CType, cache)
+    for i in range(50):
+        cached_extractor.extract_comments(_code + f"int v{i};\n")
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 1000
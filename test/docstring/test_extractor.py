@@ -0,0 +1,55 @@
+import copy
+import pickle
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+from sourcetodoc.docstring.comment_style import CommentStyle
+from sourcetodoc.docstring.comment_styler import CommentStyler
+from sourcetodoc.docstring.extractor import Comment
+from sourcetodoc.docstring.extractors.c_type import CType
+from sourcetodoc.docstring.range import Range
+
+_code = "/* a */\nvoid f(void);\n"
+
+
+def test_from_source_slices_texts() -> None:
+    comment = Comment.from_source(_code, Range(0, 7), Range(8, 20), CType.FUNCTION, "")
+    assert "/* a */" == comment.comment_text
+    assert "void f(void)" == comment.symbol_text
+
+
+def test_from_source_equals_comment_with_texts() -> None:
+    comment = Comment.from_source(_code, Range(0, 7), Range(8, 20), CType.FUNCTION, "")
+    expected = Comment("/* a */", Range(0, 7), "void f(void)", Range(8, 20), CType.FUNCTION, "")
+    assert expected == comment
+    assert hash(expected) == hash(comment)
+    assert repr(expected) == repr(comment)
+
+
+def test_comment_is_frozen() -> None:
+    comment = Comment.from_source(_code, Range(0, 7), Range(8, 20), CType.FUNCTION, "")
+    with pytest.raises(FrozenInstanceError):
+        comment.symbol_indentation = "  " # type: ignore
+    assert not hasattr(comment, "__dict__")
+
+
+def test_copy_and_pickle() -> None:
+    comments = [
+        Comment.from_source(_code, Range(0, 7), Range(8, 20), CType.FUNCTION, ""),
+        Comment("/* a */", Range(0, 7), "void f(void)", Range(8, 20), CType.FUNCTION, ""),
+    ]
+    for comment in comments:
+        for other in (copy.copy(comment), copy.deepcopy(comment), pickle.loads(pickle.dumps(comment))):
+            assert comment == other and hash(comment) == hash(other)
+            assert "void f(void)" == other.symbol_text
+
+
+def test_parsed_is_cached() -> None:
+    comment = Comment.from_source("// a\n// b\nint x;", Range(0, 9), Range(10, 15), CType.VARIABLE, "")
+    parsed = comment.parsed
+    assert parsed is not None
+    assert parsed is comment.parsed
+    assert CommentStyle.C_LINE is parsed.style
+    assert (Range(0, 4), Range(5, 9)) == parsed.piece_ranges
+    assert CommentStyler.parse_comment(comment.comment_text) == CommentStyler(parsed.content, parsed.style)
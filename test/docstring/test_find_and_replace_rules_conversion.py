@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from sourcetodoc.docstring.conversion import ConvEmpty, ConvPresent
+from sourcetodoc.docstring.conversions.find_and_replace_rules_conversion import (
+    FindAndReplaceRule, FindAndReplaceRulesConversion)
+from sourcetodoc.docstring.extractor import Comment
+from sourcetodoc.docstring.extractors.c_type import CType
+from sourcetodoc.docstring.range import Range
+
+
+def _comment(comment_text: str) -> Comment[CType]:
+    return Comment(comment_text, Range(0, len(comment_text)), "void f(void)", Range(0, 0), CType.FUNCTION, "")
+
+
+def test_rules_are_applied_in_single_scan() -> None:
+    conversion = FindAndReplaceRulesConversion([
+        FindAndReplaceRule(r"@returns?\b", r"\\return"),
+        FindAndReplaceRule("TODO:", "\\todo", literal=True),
+        FindAndReplaceRule(r"@param\s+(\w+)", r"\\param \1"),
+        FindAndReplaceRule(r"\\todo", "NOT MATCHED AGAIN"),
+    ])
+    result = conversion.calc_conversion(_comment("/** @returns x\n * @param  a b\n * TODO: y @return */"))
+    assert ConvPresent("/** \\return x\n * \\param a b\n * \\todo y \\return */") == result
+    assert [2, 1, 1, 0] == conversion.hits
+    assert ConvEmpty() == conversion.calc_conversion(_comment("/** nothing */"))
+
+
+def test_first_rule_has_priority() -> None:
+    conversion = FindAndReplaceRulesConversion([
+        FindAndReplaceRule("ab", "1", literal=True),
+        FindAndReplaceRule("abc", "2", literal=True),
+    ])
+    assert ConvPresent("/* 1c */") == conversion.calc_conversion(_comment("/* abc */"))
+
+
+@pytest.mark.parametrize("rules", [
+    [],
+    [FindAndReplaceRule("(a)\\1", "b")],
+    [FindAndReplaceRule("(", "b")],
+    [FindAndReplaceRule("(?P<x>a)(?P=x)", "b")],
+    [FindAndReplaceRule("(a)?(?(1)b|c)", "d")],
+])
+def test_invalid_rules(rules: list[FindAndReplaceRule]) -> None:
+    with pytest.raises(ValueError):
+        FindAndReplaceRulesConversion(rules)
+
+
+def test_escaped_backslashes_and_group_names() -> None:
+    conversion = FindAndReplaceRulesConversion([
+        FindAndReplaceRule(r"\\1", "one"), # A backslash followed by "1", not a backreference
+        FindAndReplaceRule(r"(?P<x>a)(?P<y>[(?P<z>])", r"\g<y>\g<x>"),
+        FindAndReplaceRule(r"(?P<x>c)", r"\g<x>\g<x>"), # The same group name as in another rule
+    ])
+    assert ConvPresent("/* one <a cc */") == conversion.calc_conversion(_comment("/* \\1 a< c */"))
+
+
+def test_from_yaml(tmp_path: Path) -> None:
+    path = tmp_path / "rules.yaml"
+    path.write_text("- find: '@returns?\\b'\n  replace: '\\\\return'\n- find: 'TODO:'\n  replace: '\\todo'\n  literal: true\n")
+    conversion = FindAndReplaceRulesConversion.from_yaml(path)
+    assert [FindAndReplaceRule(r"@returns?\b", r"\\return"), FindAndReplaceRule("TODO:", "\\todo", True)] == conversion.rules
+    assert ConvPresent("/** \\return \\todo */") == conversion.calc_conversion(_comment("/** @return TODO: */"))
+
+    path.write_text("- find: a\n")
+    with pytest.raises(ValueError):
+        FindAndReplaceRulesConversion.from_yaml(path)
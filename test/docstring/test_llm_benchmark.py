@@ -0,0 +1,39 @@
+import time
+from itertools import product
+from pathlib import Path
+
+from .llm_benchmark import generate_project, run_benchmarks
+from .mock_llm_server import MockLLMConfig, MockLLMServer
+
+
+def test_llm_conversion_against_mock_server(tmp_path: Path) -> None:
+    project = tmp_path / "project"
+    generate_project(project, files=3, functions_per_file=4)
+    config = MockLLMConfig("uniform", 0.002, 0.002, rate_limit_rate=0.05, error_rate=0.05, retry_after=0.001)
+    with MockLLMServer(config) as server:
+        # Raises if the converted files differ between the settings, failed requests are retried
+        results = run_benchmarks(server, project, tmp_path / "work", [1, 4], [1, 3], ["off", "warm"])
+        assert set(product([1, 4], [1, 3], ["off", "warm"])) == {(r.concurrency, r.batch_size, r.cache) for r in results}
+        assert 8 == len(results)
+        assert all(0 < result.seconds and 0 < result.comments_per_second for result in results)
+        assert all(12 == result.comments for result in results)
+        assert all(0 == result.requests for result in results if result.cache == "warm")
+
+    converted = (tmp_path / "work" / "output" / "f0.c").read_text()
+    assert "/**\n * AI_GENERATED\n * Computes value 0.0\n */\nint f0_0(int a, int b)" in converted
+    assert "int v0; // Not converted" in converted
+
+
+def test_streamed_responses_are_closed_after_the_comment(tmp_path: Path) -> None:
+    project = tmp_path / "project"
+    generate_project(project, files=2, functions_per_file=3)
+    config = MockLLMConfig(mean_latency=0.001, padding=20, token_latency=0.0005)
+    with MockLLMServer(config) as server:
+        results = run_benchmarks(server, project, tmp_path / "work", [1, 4], [1], ["off"], [False, True])
+        assert all(6 == result.comments for result in results)
+        # Only the streamed requests of the second and fourth run are closed early,
+        # the server notices it at its next write
+        deadline = time.monotonic() + 5
+        while server.stats.closed_streams < 12 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert 12 == server.stats.closed_streams
@@ -0,0 +1,228 @@
+import asyncio
+import re
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from sourcetodoc.docstring.comment_parsing import find_comments_connected
+from sourcetodoc.docstring.conversion import ConvPresent, ConvUnsupported
+from sourcetodoc.docstring.conversions.llm import LLM
+from sourcetodoc.docstring.conversions.llm_cache import LLMResponseCache
+from sourcetodoc.docstring.conversions.llm_conversion import LLMConversion
+from sourcetodoc.docstring.conversions.llm_conversion_helper import LLMConversionHelper, _CommentCompletion # type: ignore
+from sourcetodoc.docstring.conversions.llm_rate_limit import LLMRateLimiter
+from sourcetodoc.docstring.conversions.prompt_budget import PromptBudget, estimate_tokens
+from sourcetodoc.docstring.converter import Converter
+from sourcetodoc.docstring.extractor import Comment
+from sourcetodoc.docstring.extractors.c_lexer_extractor import CLexerExtractor
+from sourcetodoc.docstring.extractors.c_type import CType
+from sourcetodoc.docstring.range import Range
+from sourcetodoc.docstring.replace import Replace
+
+
+def _response(content: str) -> Any:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class _FakeCompletions:
+    """Stands in for `client.chat.completions` and answers with the first line of the user prompt as Javadoc comment."""
+
+    def __init__(self) -> None:
+        self.requests: list[dict[str, Any]] = []
+
+    def create(self, **kwargs: Any) -> Any:
+        self.requests.append(kwargs)
+        first_line = kwargs["messages"][1]["content"].splitlines()[0]
+        return _response(f"Sure!\n/** {first_line.strip("/* ")} */\nvoid f(void);")
+
+
+class _FakeBatchCompletions(_FakeCompletions):
+    """Answers batch prompts section by section, but omits the sections in `omitted`."""
+
+    def __init__(self, omitted: set[int]) -> None:
+        super().__init__()
+        self.omitted = omitted
+
+    def create(self, **kwargs: Any) -> Any:
+        sections = re.findall(r"^=== COMMENT (\d+) ===\n(.*)$", kwargs["messages"][1]["content"], re.MULTILINE)
+        if not sections:
+            return super().create(**kwargs)
+        self.requests.append(kwargs)
+        answer = "".join(f"**=== COMMENT {n} ===**\n/** {line.strip("/* ")} */\n" for n, line in sections if int(n) not in self.omitted)
+        return _response(answer)
+
+
+class _FakeAsyncCompletions(_FakeCompletions):
+    async def create(self, **kwargs: Any) -> Any: # type: ignore
+        await asyncio.sleep(0)
+        return super().create(**kwargs)
+
+
+def _fake_llm() -> LLM:
+    client = SimpleNamespace(base_url="http://localhost/v1/", chat=SimpleNamespace(completions=_FakeCompletions()))
+    async_client = SimpleNamespace(base_url="http://localhost/v1/", chat=SimpleNamespace(completions=_FakeAsyncCompletions()))
+    return LLM(client, "model", async_client) # type: ignore
+
+
+def _comment(comment_text: str, symbol_type: CType = CType.FUNCTION) -> Comment[CType | Any]:
+    return Comment(comment_text, Range(0, len(comment_text)), "void f(void)", Range(0, 0), symbol_type, "")
+
+
+def test_calc_conversion_async_equals_calc_conversion() -> None:
+    llm = _fake_llm()
+    conversion = LLMConversion(llm)
+    comment = _comment("// Adds two numbers")
+    expected = conversion.calc_conversion(comment)
+    assert ConvPresent("/**\n * AI_GENERATED\n * Adds two numbers\n */") == expected
+    assert expected == asyncio.run(conversion.calc_conversion_async(comment))
+    assert llm.client.chat.completions.requests == llm.async_client.chat.completions.requests # type: ignore
+
+    unsupported = _comment("// a", CType.VARIABLE)
+    assert isinstance(asyncio.run(conversion.calc_conversion_async(unsupported)), ConvUnsupported)
+
+
+def test_call_llm_async_without_async_client() -> None:
+    llm = _fake_llm()
+    llm.async_client = None
+    assert "Sure!\n/** a */\nvoid f(void);" == asyncio.run(llm.call_llm_async("system", "// a"))
+
+
+def test_cached_responses_are_reused(tmp_path: Path) -> None:
+    llm = _fake_llm()
+    comment = _comment("// Adds two numbers")
+    expected = LLMConversion(llm).calc_conversion(comment)
+
+    cache = LLMResponseCache(tmp_path / "cache.sqlite")
+    assert expected == LLMConversion(llm, cache=cache).calc_conversion(comment)
+    # A new cache object with the same file (e.g. a later run) uses the stored response
+    cache = LLMResponseCache(tmp_path / "cache.sqlite")
+    assert expected == LLMConversion(llm, cache=cache).calc_conversion(comment)
+    assert expected == asyncio.run(LLMConversion(llm, cache=cache).calc_conversion_async(comment))
+    assert 2 == len(llm.client.chat.completions.requests) # type: ignore
+    assert 0 == len(llm.async_client.chat.completions.requests) # type: ignore
+    assert (2, 0) == (cache.hits, cache.misses)
+
+    llm.seed = 1 # Another key
+    LLMConversion(llm, cache=cache).calc_conversion(comment)
+    assert (2, 1) == (cache.hits, cache.misses)
+
+
+def test_llm_cache_eviction_limits_size(tmp_path: Path) -> None:
+    cache = LLMResponseCache(tmp_path / "cache.sqlite", max_bytes=1000)
+    for i in range(50):
+        cache.put(str(i), "x" * 100, 0.5)
+    assert cache.get("49") is not None
+    assert cache.get("0") is None
+    cache.close()
+    cache = LLMResponseCache(tmp_path / "cache.sqlite", max_bytes=1000)
+    cache.put("50", "x" * 100, 0.5)
+    assert sum(cache.get(str(i)) is not None for i in range(51)) <= 10
+    assert 0.5 * cache.hits == cache.saved_seconds
+
+
+def test_batched_conversions_equal_single_conversions() -> None:
+    comments = [_comment("// a"), _comment("// b", CType.VARIABLE), _comment("/** c */"), _comment("// d"), _comment("// e"), _comment("// f")]
+    expected = [LLMConversion(_fake_llm()).calc_conversion(c) for c in comments]
+
+    completions = _FakeBatchCompletions(omitted={2})
+    llm = LLM(SimpleNamespace(base_url="", chat=SimpleNamespace(completions=completions)), "model") # type: ignore
+    conversion = LLMConversion(llm, batch_size=3)
+    assert expected == conversion.calc_conversions(comments)
+    # One batch of "a", "d" and "e", a single request for "d" (omitted in the answer) and one for "f"
+    assert 3 == len(completions.requests)
+    assert expected == asyncio.run(conversion.calc_conversions_async(comments))
+
+
+def test_converter_with_batches(tmp_path: Path) -> None:
+    code = "".join(f"// f{i}\nint f{i}(void);\n// v{i}\nint v{i};\n" for i in range(5))
+    for name in ("single", "batch", "batch_concurrent"):
+        (tmp_path / name).mkdir()
+        for i in range(3):
+            (tmp_path / name / f"{i}.c").write_text(code)
+
+    single = LLMConversion(_fake_llm())
+    Converter(single, Replace.REPLACE_OLD_COMMENTS, c_extractor=CLexerExtractor()).convert_files(tmp_path / "single")
+    for name, concurrency in (("batch", 1), ("batch_concurrent", 2)):
+        completions = _FakeBatchCompletions(omitted={1})
+        llm = LLM(SimpleNamespace(base_url="", chat=SimpleNamespace(completions=completions)), "model") # type: ignore
+        batch = LLMConversion(llm, batch_size=4)
+        Converter(batch, Replace.REPLACE_OLD_COMMENTS, c_extractor=CLexerExtractor(), concurrency=concurrency).convert_files(tmp_path / name)
+        # Per file: a batch of 4 comments, a single request for the omitted one and one for the fifth comment
+        assert 3 * 3 == len(completions.requests)
+        for i in range(3):
+            assert (tmp_path / "single" / f"{i}.c").read_text() == (tmp_path / name / f"{i}.c").read_text()
+
+
+def test_prompt_budget_trims_symbol_text() -> None:
+    llm = _fake_llm()
+    budget = PromptBudget(max_prompt_tokens=20)
+    comment = Comment("// Adds", Range(0, 7), "int f(void) {\n" + "    x++;\n" * 50 + "}", Range(0, 0), CType.FUNCTION, "")
+    assert ConvPresent("/**\n * AI_GENERATED\n * Adds\n */") == LLMConversion(llm, budget=budget).calc_conversion(comment)
+    assert "// Adds\nint f(void) { ... }" == llm.client.chat.completions.requests[0]["messages"][1]["content"] # type: ignore
+    assert 0 < budget.tokens_saved
+
+
+def test_batches_are_closed_at_the_prompt_budget() -> None:
+    comments = [_comment(f"// {c * 40}") for c in "abcd"]
+    helper = LLMConversionHelper(_fake_llm())
+    _, batches = helper._prepare_batches(comments, "{}", 8) # type: ignore
+    assert [[0, 1, 2, 3]] == [[i for i, _ in batch] for batch in batches]
+
+    helper = LLMConversionHelper(_fake_llm(), budget=PromptBudget(max_prompt_tokens=110))
+    _, batches = helper._prepare_batches(comments, "{}", 8) # type: ignore
+    assert [[0, 1], [2, 3]] == [[i for i, _ in batch] for batch in batches]
+    for batch in batches:
+        assert estimate_tokens(helper._get_batch_prompt(batch)) <= 110 # type: ignore
+
+
+class _FakeStream:
+    """Stands in for a streamed response with one chunk per part."""
+
+    def __init__(self, parts: list[str]) -> None:
+        self.chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))]) for part in parts]
+
+    def __iter__(self) -> Any:
+        return iter(self.chunks)
+
+    def close(self) -> None:
+        pass
+
+
+def _first_complete_comment_end(llm_output: str) -> int | None:
+    # Scans the whole output like the streamed check, returns the end of the first comment if it is complete
+    for range, _ in find_comments_connected(llm_output, skip_literals=False):
+        following = re.match(r"\s*(\S)", llm_output[range.end:])
+        return range.end if following is not None and following[1] != "/" else None
+    return None
+
+
+def test_streamed_comment_completion_equals_full_scan() -> None:
+    outputs = [
+        "Sure!\n/** Adds\n * two numbers.\n */\nint add(int a, int b);",
+        "/// Adds\n/// two numbers.\n\nint add(int a, int b);",
+        "/* a */ /* b */ x",
+        "// a\n   \n// b\n/ x",
+        "Here: /**/",
+        "Prose\nover\nlines /\n/* split\n * block\n */\n\n x",
+        "Text\n// a\n// b\n// c\n\n\n// d\nint x;",
+    ]
+    for llm_output in outputs:
+        for size in range(1, 6):
+            chunks = [llm_output[i:i + size] for i in range(0, len(llm_output), size)]
+            is_complete = _CommentCompletion()
+            received = ""
+            for chunk in chunks:
+                received += chunk
+                expected = _first_complete_comment_end(received) is not None
+                assert expected == is_complete(received), (llm_output, size, received)
+                if expected:
+                    break
+
+
+def test_streamed_completion_tokens_are_counted() -> None:
+    parts = ["/// Adds two ", "numbers.\n", "int add(int a, int b);"]
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **_: _FakeStream(parts))))
+    llm: Any = LLM(client, "fake") # type: ignore
+    llm.rate_limiter = LLMRateLimiter(tokens_per_minute=1000)
+    assert "".join(parts) == llm.call_llm("system", "user", _CommentCompletion())
+    assert estimate_tokens("systemuser") + estimate_tokens("".join(parts)) == llm.rate_limiter.stats.tokens
@@ -0,0 +1,118 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import httpx
+import pytest
+from openai import APIConnectionError, OpenAI
+
+from sourcetodoc.docstring.conversions.llm import LLM
+from sourcetodoc.docstring.conversions.llm_conversion import LLMConversion
+from sourcetodoc.docstring.conversions.llm_endpoints import LLMEndpoint, LLMEndpointPool
+from sourcetodoc.docstring.conversions.llm_rate_limit import LLMRateLimiter
+from sourcetodoc.docstring.converter import Converter
+from sourcetodoc.docstring.extractors.c_lexer_extractor import CLexerExtractor
+from sourcetodoc.docstring.replace import Replace
+
+from .llm_benchmark import generate_project
+from .mock_llm_server import MockLLMConfig, MockLLMServer
+
+
+def _endpoint(name: str, weight: float = 1.0) -> LLMEndpoint:
+    return LLMEndpoint(SimpleNamespace(base_url=f"http://{name}/v1/"), weight=weight) # type: ignore
+
+
+def _connection_error() -> APIConnectionError:
+    return APIConnectionError(request=httpx.Request("POST", "http://a/v1/chat/completions"))
+
+
+def test_least_outstanding_requests_by_weight() -> None:
+    a, b = _endpoint("a", 2.0), _endpoint("b")
+    pool = LLMEndpointPool([a, b])
+    assert [a, a, b, a, a, b] == [pool.acquire() for _ in range(6)] # Ties go to the first endpoint
+    pool.release(a, 0.5)
+    pool.release(a, 0.5)
+    pool.release(a, 0.5)
+    assert a is pool.acquire() # a has 1 of 2 outstanding requests, b has 2 of 1
+    assert 2 == a.outstanding and 2 == b.outstanding
+    assert "http://a/v1/: 5 requests, 0 errors, 0.500 s mean latency" in pool.summary()
+
+
+def test_failing_endpoint_is_ejected() -> None:
+    now = [0.0]
+    a, b = _endpoint("a"), _endpoint("b")
+    pool = LLMEndpointPool([a, b], max_failures=2, eject_seconds=10, clock=lambda: now[0])
+    for _ in range(2):
+        a.outstanding += 1
+        pool.release(a, 0.1, _connection_error())
+    assert 10.0 == a.ejected_until and 1 == a.ejections
+    assert all(b is pool.acquire() for _ in range(3))
+
+    now[0] = 10.0 # The health check fails, a is ejected for twice the time
+    assert a is pool.acquire()
+    assert b is pool.acquire() # Only one request at a time until the health check succeeds
+    pool.release(a, 0.1, _connection_error())
+    assert 30.0 == a.ejected_until
+
+    now[0] = 30.0 # The health check succeeds
+    assert a is pool.acquire()
+    pool.release(a, 0.1)
+    assert a.ejected_until is None and 0 == a.consecutive_failures
+
+
+def test_rate_limits_do_not_eject() -> None:
+    request = httpx.Request("POST", "http://a/v1/chat/completions")
+    client = OpenAI(base_url="http://a/v1", api_key="x", http_client=httpx.Client())
+    assert not LLMEndpointPool.is_unhealthy(client._make_status_error_from_response(httpx.Response(429, request=request))) # type: ignore
+    assert LLMEndpointPool.is_unhealthy(client._make_status_error_from_response(httpx.Response(503, request=request))) # type: ignore
+    assert LLMEndpointPool.is_unhealthy(_connection_error())
+
+
+def test_conversion_with_a_failing_endpoint(tmp_path: Path) -> None:
+    generate_project(tmp_path, files=2, functions_per_file=5)
+    with (MockLLMServer(MockLLMConfig(mean_latency=0.001)) as healthy,
+          MockLLMServer(MockLLMConfig(mean_latency=0.001, error_rate=1.0)) as failing):
+        endpoints = [LLMEndpoint(OpenAI(base_url=server.base_url, api_key="mock", max_retries=0, http_client=httpx.Client()))
+                     for server in (failing, healthy)]
+        pool = LLMEndpointPool(endpoints, max_failures=3, eject_seconds=60)
+        llm: Any = LLM.create_balanced_LLM(pool, "mock")
+        llm.rate_limiter = LLMRateLimiter(max_retries=5, base_delay=0.001, max_delay=0.01)
+        converter = Converter(LLMConversion(llm), Replace.REPLACE_OLD_COMMENTS, c_extractor=CLexerExtractor())
+        converter.convert_files(tmp_path)
+
+        assert 3 == failing.stats.requests and 10 == healthy.stats.requests
+        assert 1 == endpoints[0].ejections and 3 == endpoints[0].errors
+        assert 10 == sum(file.read_text().count("AI_GENERATED") for file in tmp_path.iterdir())
+
+
+class _HangingStream:
+    """Stands in for a streamed async response that never sends a chunk."""
+
+    def __aiter__(self) -> "_HangingStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        await asyncio.Event().wait()
+
+    async def close(self) -> None:
+        pass
+
+
+def test_cancelled_stream_is_released_as_error() -> None:
+    async def create(**_: Any) -> Any:
+        return _HangingStream()
+
+    async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    endpoint = LLMEndpoint(SimpleNamespace(base_url="http://a/v1/"), async_client) # type: ignore
+    llm = LLM.create_balanced_LLM(LLMEndpointPool([endpoint]), "fake")
+
+    async def cancel() -> None:
+        task = asyncio.create_task(llm.call_llm_async("system", "user", lambda _: False))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert 0 == endpoint.outstanding and 1 == endpoint.errors and 0.0 == endpoint.total_seconds
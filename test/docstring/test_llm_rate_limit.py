@@ -0,0 +1,91 @@
+import asyncio
+from random import Random
+from typing import Any
+
+import httpx
+import pytest
+from openai import APIStatusError, BadRequestError, RateLimitError
+
+from sourcetodoc.docstring.conversions.llm_rate_limit import LLMRateLimiter, TokenBucket
+
+
+def _status_error(error_type: type[APIStatusError], status_code: int, headers: dict[str, str] | None = None) -> APIStatusError:
+    request = httpx.Request("POST", "http://localhost/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return error_type("error", response=response, body=None)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(60, clock) # One token per second
+    assert 0 == bucket.reserve(60)
+    assert 1 == bucket.reserve(1)
+    assert 2 == bucket.reserve(1)
+    clock.now = 2.0
+    assert 0 == bucket.reserve(0)
+    clock.now = 1000.0 # Refilled up to the capacity
+    assert 0 == bucket.reserve(60)
+    assert 10 == bucket.reserve(10)
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_retries_honour_retry_after() -> None:
+    limiter = LLMRateLimiter(max_retries=3, base_delay=0.001, max_delay=0.1, rng=Random(0))
+    errors = [
+        _status_error(RateLimitError, 429, {"retry-after-ms": "20"}),
+        _status_error(APIStatusError, 503),
+    ]
+
+    def request() -> Any:
+        if errors:
+            raise errors.pop(0)
+        return "response"
+
+    assert "response" == limiter.call(request, 10)
+    assert (3, 2, 1, 0, 10) == (limiter.stats.requests, limiter.stats.retries, limiter.stats.rate_limited,
+                                limiter.stats.failed, limiter.stats.tokens)
+    assert 0.02 <= limiter.stats.backoff_seconds < 0.03
+
+
+def test_longer_retry_after_than_max_delay_fails() -> None:
+    limiter = LLMRateLimiter(max_retries=3, base_delay=0.001, max_delay=0.1)
+    calls = 0
+
+    def request() -> Any:
+        nonlocal calls
+        calls += 1
+        raise _status_error(RateLimitError, 429, {"retry-after": "120"})
+
+    with pytest.raises(RateLimitError):
+        limiter.call(request, 1)
+    assert (1, 0, 1, 0.0) == (calls, limiter.stats.retries, limiter.stats.failed, limiter.stats.backoff_seconds)
+
+
+def test_failed_requests_are_raised() -> None:
+    limiter = LLMRateLimiter(max_retries=2, base_delay=0.001)
+    calls = 0
+
+    async def request() -> Any:
+        nonlocal calls
+        calls += 1
+        raise _status_error(RateLimitError, 429)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(limiter.call_async(request, 1))
+    assert (3, 1) == (calls, limiter.stats.failed)
+
+    def bad_request() -> Any:
+        raise _status_error(BadRequestError, 400)
+
+    with pytest.raises(BadRequestError): # Not retried
+        limiter.call(bad_request, 1)
+    assert (4, 2) == (limiter.stats.requests, limiter.stats.failed)
@@ -0,0 +1,36 @@
+from sourcetodoc.docstring.conversions.prompt_budget import (
+    BODY_MARKER, COMMENT_MARKER, PromptBudget, estimate_tokens)
+
+
+def test_estimate_tokens() -> None:
+    assert 0 == estimate_tokens(" \n")
+    assert 1 == estimate_tokens("int")
+    assert 3 == estimate_tokens("counter") + estimate_tokens("(")
+    assert 8 == estimate_tokens("a->b[0];")
+
+
+def test_fit_symbol_trims_to_signature() -> None:
+    budget = PromptBudget()
+    symbol = "static int f(int a, struct s b = {1})\n{\n" + "    x++;\n" * 100 + "}"
+    assert symbol == budget.fit_symbol(symbol, 1000)
+    assert 0 == budget.trimmed_symbols
+
+    signature = budget.fit_symbol(symbol, 50)
+    assert "static int f(int a, struct s b = {1}) " + BODY_MARKER == signature
+    assert 1 == budget.trimmed_symbols
+    assert estimate_tokens(symbol) - estimate_tokens(signature) == budget.tokens_saved
+
+    cut = budget.fit_symbol(symbol, 7)
+    assert "static int f ..." == cut
+    assert estimate_tokens(cut) <= 7
+
+
+def test_fit_comment() -> None:
+    budget = PromptBudget(max_comment_tokens=20)
+    assert "short" == budget.fit_comment("short")
+    content = "\n".join(f"line {i}" for i in range(20))
+    fitted = budget.fit_comment(content)
+    assert fitted.startswith("line 0\nline 1\n") and fitted.endswith("\n" + COMMENT_MARKER)
+    assert estimate_tokens(fitted) <= 20
+    assert budget.fit_comment("x" * 1000).endswith(COMMENT_MARKER)
+    assert 2 == budget.truncated_comments
@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sourcetodoc.docstring.conversion import AsyncConversion, ConvResult
+from sourcetodoc.docstring.conversions.default_comment_conversion import DefaultCommentStyleConversion
+from sourcetodoc.docstring.converter import Converter
+from sourcetodoc.docstring.extractor import Comment
+from sourcetodoc.docstring.extractors.c_lexer_extractor import CLexerExtractor
+from sourcetodoc.docstring.extractors.c_type import CType
+from sourcetodoc.docstring.range import Range
+from sourcetodoc.docstring.replace import Replace
+from sourcetodoc.docstring.scheduler import ConversionScheduler, PriorityWeights
+
+
+class _RecordingConversion(AsyncConversion[Any]):
+    """Converts like DefaultCommentStyleConversion and records the order of the converted comments."""
+
+    def __init__(self) -> None:
+        self.conversion = DefaultCommentStyleConversion()
+        self.converted: list[str] = []
+
+    def calc_conversion(self, comment: Comment[Any]) -> ConvResult:
+        self.converted.append(comment.comment_text)
+        return self.conversion.calc_conversion(comment)
+
+    async def calc_conversion_async(self, comment: Comment[Any]) -> ConvResult:
+        return self.calc_conversion(comment)
+
+
+def _write_project(directory: Path) -> None:
+    directory.mkdir()
+    (directory / "a.c").write_text(
+        "// static\nstatic int s(void);\n"
+        "// long\n// comment\nint l(void);\n"
+        "// short\nint f(void);\n"
+    )
+    (directory / "a.h").write_text("// header\nint h(void);\n")
+
+
+def test_parse_weights() -> None:
+    assert PriorityWeights(header=5.0, non_static=10.0, lines=0.5) == PriorityWeights.parse("header=5, lines=0.5")
+    with pytest.raises(ValueError):
+        PriorityWeights.parse("public=1")
+    with pytest.raises(ValueError):
+        ConversionScheduler(max_tokens=0)
+
+
+def test_comments_are_converted_in_the_order_of_priority(tmp_path: Path) -> None:
+    for concurrency in (1, 2):
+        directory = tmp_path / str(concurrency)
+        _write_project(directory)
+        conversion = _RecordingConversion()
+        converter = Converter(
+            conversion, Replace.REPLACE_OLD_COMMENTS, c_extractor=CLexerExtractor(),
+            concurrency=concurrency, scheduler=ConversionScheduler()
+        )
+        converter.convert_files(directory)
+        assert ["// header", "// long\n// comment", "// short", "// static"] == conversion.converted
+        assert "/// short\nint f(void);\n" in (directory / "a.c").read_text()
+
+
+def test_conversion_stops_at_the_budget(tmp_path: Path) -> None:
+    for concurrency in (1, 2):
+        directory = tmp_path / str(concurrency)
+        _write_project(directory)
+        conversion = _RecordingConversion()
+        scheduler = ConversionScheduler(max_tokens=1)
+        converter = Converter(
+            conversion, Replace.REPLACE_OLD_COMMENTS, c_extractor=CLexerExtractor(),
+            concurrency=concurrency, scheduler=scheduler
+        )
+        converter.convert_files(directory)
+        assert ["// header"] == conversion.converted
+        assert "/// header\nint h(void);\n" == (directory / "a.h").read_text()
+        assert "// long\n// comment\n" in (directory / "a.c").read_text()
+        assert 3 == len(scheduler.backlog)
+        assert "token budget" in scheduler.summary()
+
+        scheduler.write_backlog(tmp_path / "backlog.json")
+        backlog = json.loads((tmp_path / "backlog.json").read_text())
+        assert 3 == backlog["remaining_comments"]
+        assert {"file": str(directory / "a.c"), "line": 3, "symbol": "int l(void)", "priority": 12.0} \
+            .items() <= backlog["comments"][0].items()
+
+
+def test_time_budget() -> None:
+    now = [0.0]
+    scheduler = ConversionScheduler(max_seconds=10, clock=lambda: now[0])
+    scheduler.start()
+    comment = Comment("// a", Range(0, 4), "int a;", Range(5, 11), CType.VARIABLE, "")
+    assert scheduler.try_start(comment)
+    now[0] = 10.0
+    assert not scheduler.try_start(comment)
+    assert 1 == scheduler.started and scheduler.stop_reason is not None
@@ -0,0 +1,110 @@
+from typing import Iterator
+
+import pytest
+from clang.cindex import Cursor, CursorKind, SourceLocation, TranslationUnit
+
+from sourcetodoc import libclang_util
+from sourcetodoc.libclang_util import (SKIPPED_BODIES_PRUNED_KIND_IDS,
+                                       clang_location_is_from_main_file,
+                                       collect_main_file_cursors,
+                                       pruned_kind_ids_for)
+
+_code = """\
+namespace n {
+struct S {
+    int a;
+    int f(int x) { return x + 1; }
+};
+}
+"""
+
+_local_declarations_code = """\
+#include <stddef.h>
+int f(int x) {
+    /// Local struct
+    struct Local { int y; } local = { x };
+    if (x > 0) {
+        /// Local function declaration
+        int g(int);
+    }
+    /// Lambda
+    auto l = [](int z) { struct InLambda { int w; }; return z; };
+    return l(local.y) + (int)sizeof(size_t);
+}
+"""
+
+_skipped_bodies_code = """\
+#include "header.h"
+/// Initialized with expressions
+static const int limit = 1 + 2 * (3 - 4);
+/// Lambda
+auto l = [](int z) { struct InLambda { int w; }; return z + limit; };
+struct S {
+    /// Array field
+    int values[sizeof(int) * 4];
+    int f(int x) { return x + 1; }
+};
+"""
+
+_header_code = """\
+struct H { int a; int b; };
+int h(int, int);
+"""
+
+
+def _walk_preorder_only_main_file(node: Cursor) -> Iterator[Cursor]:
+    # Visits every cursor in the main file without pruning
+    for child in node.get_children():
+        if clang_location_is_from_main_file(child.location):
+            yield child
+            yield from _walk_preorder_only_main_file(child)
+
+
+def test_collect_main_file_cursors_preorder_and_pruned() -> None:
+    tu = TranslationUnit.from_source("unsaved.cpp", unsaved_files=[("unsaved.cpp", _code)])
+    kinds = [cursor.kind for cursor in collect_main_file_cursors(tu.cursor)]
+    assert kinds == [
+        CursorKind.NAMESPACE,
+        CursorKind.STRUCT_DECL,
+        CursorKind.FIELD_DECL,
+        CursorKind.CXX_METHOD,
+        CursorKind.PARM_DECL,
+        CursorKind.COMPOUND_STMT,
+        CursorKind.RETURN_STMT,
+        CursorKind.BINARY_OPERATOR,
+        CursorKind.UNEXPOSED_EXPR,
+        CursorKind.DECL_REF_EXPR, # The literal is pruned
+    ]
+
+
+def test_collect_main_file_cursors_keeps_nested_declarations() -> None:
+    tu = TranslationUnit.from_source("unsaved.cpp", args=["-std=c++17"], unsaved_files=[("unsaved.cpp", _local_declarations_code)])
+    expected = [(c.kind, c.spelling, c.extent.start.offset) for c in _walk_preorder_only_main_file(tu.cursor) if c.kind.is_declaration()]
+    actual = [(c.kind, c.spelling, c.extent.start.offset) for c in collect_main_file_cursors(tu.cursor) if c.kind.is_declaration()]
+    assert expected == actual
+    assert {"Local", "g", "InLambda", "w"} <= {spelling for _, spelling, _ in actual}
+
+
+def test_collect_main_file_cursors_counts_visited_nodes(monkeypatch: pytest.MonkeyPatch) -> None:
+    options = TranslationUnit.PARSE_SKIP_FUNCTION_BODIES | TranslationUnit.PARSE_INCOMPLETE
+    assert SKIPPED_BODIES_PRUNED_KIND_IDS == pruned_kind_ids_for(options)
+    tu = TranslationUnit.from_source(
+        "unsaved.cpp", args=["-std=c++17"],
+        unsaved_files=[("unsaved.cpp", _skipped_bodies_code), ("header.h", _header_code)],
+        options=options
+    )
+    tested: list[SourceLocation] = []
+    monkeypatch.setattr(libclang_util, "clang_location_is_from_main_file", lambda location: tested.append(location) or clang_location_is_from_main_file(location))
+    cursors = collect_main_file_cursors(tu.cursor, pruned_kind_ids_for(options))
+    # Only the children of the translation unit are tested
+    assert len(tested) == len(list(tu.cursor.get_children()))
+    assert [(cursor.kind, cursor.spelling) for cursor in cursors] == [
+        (CursorKind.VAR_DECL, "limit"),
+        (CursorKind.VAR_DECL, "l"),
+        (CursorKind.STRUCT_DECL, "S"),
+        (CursorKind.FIELD_DECL, "values"),
+        (CursorKind.CXX_METHOD, "f"),
+        (CursorKind.PARM_DECL, "x"),
+    ]
+    # The expressions and the lambda body are visited without pruning them
+    assert len(collect_main_file_cursors(tu.cursor)) > len(cursors)